@@ -1,3 +1,5 @@
+import os
+import sys
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
@@ -6,8 +8,12 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from donnees import charger_donnees
+
 # Charger les données
-df = pd.read_csv('DATA/donnees_immobilieres.csv')
+df = charger_donnees()
 df = df.dropna(subset=['latitude', 'longitude', 'valeur_fonciere', 'score_transport', 'prix_m_carrez_arr'])
 
 colonnes_a_exclure = ['valeur_fonciere', 'prix_m_carrez']
@@ -0,0 +1,91 @@
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, RACINE)
+
+# Démarrage d'un worker : joblib.load(best_model.pkl) vs artefact compilé projeté en mémoire
+NB_WORKERS = [1, 2, 4, 8]
+LIGNE = [[2.37, 48.86, 75011, 2, 50.0, 2]]
+
+
+def memoire_processus():
+    """RSS et PSS (pages partagées réparties entre les processus) en Mo"""
+    valeurs = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for ligne in f:
+            nom, _, reste = ligne.partition(':')
+            if nom in ('Rss', 'Pss'):
+                valeurs[nom] = int(reste.split()[0]) / 1024
+    return valeurs['Rss'], valeurs['Pss']
+
+
+def charger(mode):
+    if mode == 'joblib':
+        import joblib
+        import pandas as pd
+
+        model = joblib.load(os.path.join(RACINE, 'Training_set', 'best_model.pkl'))
+        features = joblib.load(os.path.join(RACINE, 'Training_set', 'model_features.pkl'))
+        return lambda X: model.predict(pd.DataFrame(X, columns=features))
+
+    from inference import charger_modele_compile
+
+    modele_compile, _ = charger_modele_compile(os.path.join(RACINE, 'Training_set', 'modele_compile'))
+    return modele_compile.predict
+
+
+def worker(mode, depart, file):
+    debut = time.perf_counter()
+    predire = charger(mode)
+    predire(LIGNE)
+    duree_chargement = time.perf_counter() - debut
+    rss, pss = memoire_processus()
+    file.put((time.time() - depart, duree_chargement, rss, pss))
+
+
+def lancer_workers(mode, n):
+    """Démarre n processus (spawn, comme les workers uvicorn) et attend qu'ils soient prêts"""
+    contexte = mp.get_context('spawn')
+    file = contexte.Queue()
+    depart = time.time()
+    processus = [contexte.Process(target=worker, args=(mode, depart, file)) for _ in range(n)]
+    for p in processus:
+        p.start()
+    resultats = [file.get() for _ in range(n)]
+    for p in processus:
+        p.join()
+    return resultats
+
+
+if __name__ == "__main__":
+    if not os.path.exists(os.path.join(RACINE, 'Training_set', 'modele_compile', 'manifest.json')):
+        print("⚠️ Artefact compilé absent : lancer d'abord python inference.py --exporter")
+        sys.exit(1)
+
+    print("=" * 72)
+    print("BENCHMARK chargement du modèle")
+    print("=" * 72)
+
+    # Chargement dans le processus courant (imports déjà faits)
+    for mode in ['joblib', 'mmap']:
+        mesures = []
+        for _ in range(5):
+            debut = time.perf_counter()
+            charger(mode)
+            mesures.append(time.perf_counter() - debut)
+        print(f"Chargement {mode:<7}: {np.median(mesures) * 1000:8.2f} ms")
+
+    print("-" * 72)
+    print(f"{'Mode':<8} {'Workers':>7} {'Tous prêts (s)':>15} {'Chargement (s)':>15} "
+          f"{'RSS/worker':>11} {'PSS/worker':>11}")
+    for mode in ['joblib', 'mmap']:
+        for n in NB_WORKERS:
+            resultats = np.array(lancer_workers(mode, n))
+            print(f"{mode:<8} {n:>7} {resultats[:, 0].max():>15.2f} {resultats[:, 1].mean():>15.2f} "
+                  f"{resultats[:, 2].mean():>9.0f}Mo {resultats[:, 3].mean():>9.0f}Mo")
+    print("=" * 72)
@@ -0,0 +1,105 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, RACINE)
+os.chdir(RACINE)
+
+# Démarrage de l'API (uvicorn api_server:app dans un processus neuf) :
+# - immediat : modèle et index chargés à l'import, port ouvert ensuite
+#   (API_DEMARRAGE_DIFFERE=0)
+# - differe : port ouvert tout de suite, chargement dans un thread
+# Mesures : délai avant la première réponse de /api/health/live (vivacité)
+# et avant le premier 200 de /api/health/ready (disponibilité)
+MODES = {'immediat': '0', 'differe': '1'}
+NB_ESSAIS = 3
+NB_MODULES_PROFIL = 15
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def mesurer_demarrage(differe):
+    """Délais (s) avant la vivacité et la disponibilité de l'API"""
+    port = port_libre()
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, 'API_DEMARRAGE_DIFFERE': differe}
+    debut = time.perf_counter()
+    processus = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api_server:app', '--port', str(port), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    vivant = None
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - debut < 120:
+                try:
+                    if vivant is None:
+                        client.get(url + "/api/health/live")
+                        vivant = time.perf_counter() - debut
+                    if client.get(url + "/api/health/ready").status_code == 200:
+                        return vivant, time.perf_counter() - debut
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError("API non disponible après 120 s")
+    finally:
+        processus.terminate()
+        processus.wait()
+
+
+def profil_imports(module='api_server'):
+    """
+    Temps d'import cumulé par module (python -X importtime), en ms.
+
+    Returns:
+    --------
+    (float, list[tuple[str, float]]) : durée totale et modules importés
+    directement par le module, triés par durée décroissante
+    """
+    resultat = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env={**os.environ, 'API_DEMARRAGE_DIFFERE': '1'}
+    )
+    # Chaque module est listé après ses dépendances, indenté de 2 espaces par niveau
+    modules, total = [], 0.0
+    for ligne in resultat.stderr.splitlines():
+        if not ligne.startswith('import time:') or 'cumulative' in ligne:
+            continue
+        _, cumul, nom = ligne[len('import time:'):].split('|')
+        niveau = (len(nom) - len(nom.lstrip()) - 1) // 2
+        if niveau == 0:
+            if nom.strip() == module:
+                total = int(cumul) / 1000
+                break
+            modules = []  # imports du démarrage de Python (site, encodings...)
+        elif niveau == 1:
+            modules.append((nom.strip(), int(cumul) / 1000))
+    return total, sorted(modules, key=lambda m: m[1], reverse=True)
+
+
+if __name__ == "__main__":
+    total, modules = profil_imports()
+    print("=" * 60)
+    print(f"PROFIL D'IMPORT de api_server ({total:.0f} ms, python -X importtime)")
+    print("=" * 60)
+    for nom, duree in modules[:NB_MODULES_PROFIL]:
+        print(f"{nom:<40} {duree:>10.1f} ms")
+
+    print("=" * 60)
+    print(f"BENCHMARK démarrage de l'API ({NB_ESSAIS} essais, médiane)")
+    print("=" * 60)
+    print(f"{'Mode':<10} {'Vivacité (s)':>14} {'Disponibilité (s)':>19}")
+    for mode, differe in MODES.items():
+        vivant, pret = np.median([mesurer_demarrage(differe) for _ in range(NB_ESSAIS)], axis=0)
+        print(f"{mode:<10} {vivant:>14.2f} {pret:>19.2f}")
+    print("=" * 60)
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, RACINE)
+
+from inference import SEUIL_LOT_ESTIMATEUR, compiler_modele
+
+# Latence du modèle : model.predict (sklearn) vs modèle compilé (inference.py).
+# Pour les lots, le parcours compilé seul (predire_arbres) et predict, qui
+# passe par sklearn au-delà de SEUIL_LOT_ESTIMATEUR lignes
+N_REPETITIONS = 2_000
+N_LOT = 10_000
+TAILLES_LOT = [SEUIL_LOT_ESTIMATEUR, 5_000, N_LOT, 100_000]
+
+model = joblib.load(os.path.join(RACINE, 'Training_set', 'best_model.pkl'))
+features_list = joblib.load(os.path.join(RACINE, 'Training_set', 'model_features.pkl'))
+modele_compile = compiler_modele(model, features_list)
+modele_compile.chemin_estimateur = os.path.join(RACINE, 'Training_set', 'best_model.pkl')
+
+rng = np.random.default_rng(42)
+X = pd.DataFrame({
+    'longitude': rng.uniform(2.25, 2.42, N_LOT),
+    'latitude': rng.uniform(48.81, 48.90, N_LOT),
+    'code_postal': rng.integers(75001, 75021, N_LOT),
+    'code_type_local': 2,
+    'lot1_surface_carrez': rng.uniform(8, 250, N_LOT),
+    'nombre_pieces_principales': rng.integers(1, 8, N_LOT),
+})[features_list]
+ligne = X.iloc[[0]]
+
+
+def latences(predire, entree, n):
+    mesures = np.empty(n)
+    for i in range(n):
+        debut = time.perf_counter()
+        predire(entree)
+        mesures[i] = time.perf_counter() - debut
+    return mesures * 1e6
+
+
+print("=" * 60)
+print(f"BENCHMARK inférence ({type(model).__name__}, {modele_compile.n_arbres} arbres)")
+print("=" * 60)
+
+print("Une ligne (µs)      p50        p99")
+for nom, predire in [("sklearn", model.predict), ("compilé", modele_compile.predict)]:
+    mesures = latences(predire, ligne, N_REPETITIONS)
+    print(f"{nom:<12} {np.percentile(mesures, 50):>10.1f} {np.percentile(mesures, 99):>10.1f}")
+
+print("Lots (ms)  sklearn  compilé (parcours)  compilé (predict)  pic mémoire parcours")
+for n in TAILLES_LOT:
+    lot = pd.concat([X] * (n // N_LOT + 1), ignore_index=True).iloc[:n]
+    n_mesures = 20 if n <= N_LOT else 3
+    durees = [np.median(latences(predire, lot, n_mesures)) / 1000
+              for predire in (model.predict, modele_compile.predire_arbres, modele_compile.predict)]
+    tracemalloc.start()
+    modele_compile.predire_arbres(lot)
+    pic_mo = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    print(f"{n:>9,} {durees[0]:>8.1f} {durees[1]:>19.1f} {durees[2]:>18.1f} {pic_mo:>17.1f} Mo")
+
+print(f"Résultats identiques: {np.array_equal(model.predict(X), modele_compile.predire_arbres(X))} (parcours), "
+      f"{np.array_equal(model.predict(X), modele_compile.predict(X))} (predict)")
+print("=" * 60)
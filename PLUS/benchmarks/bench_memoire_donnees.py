@@ -0,0 +1,69 @@
+import importlib
+import multiprocessing as mp
+import os
+import sys
+import time
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, RACINE)
+
+# Mémoire du jeu de données dans un worker de l'API :
+# chargement complet (types par défaut) vs colonnes utiles en types compacts
+MODES = ['complet', 'compact']
+
+
+def rss_mo():
+    with open('/proc/self/status') as f:
+        for ligne in f:
+            if ligne.startswith('VmRSS:'):
+                return int(ligne.split()[1]) / 1024
+
+
+def charger(mode):
+    from donnees import charger_donnees, compacter
+
+    if mode == 'complet':
+        return charger_donnees()
+
+    from comparables import COLONNES_COMPARABLES
+    from historique_prix import COLONNES_HISTORIQUE
+
+    return compacter(charger_donnees(colonnes=list(dict.fromkeys(COLONNES_HISTORIQUE + COLONNES_COMPARABLES))))
+
+
+def worker(mode, file):
+    """Mesure dans un processus neuf (spawn), comme un worker uvicorn"""
+    from donnees import memoire_mo
+
+    # Modules importés avant la mesure, volontairement : leur mémoire
+    # (pyarrow, pandas, NumPy, joblib...) fait partie de la référence
+    # rss_avant et n'est pas comptée comme mémoire du jeu de données
+    for module in ('pyarrow.dataset', 'comparables', 'historique_prix'):
+        importlib.import_module(module)
+
+    rss_avant = rss_mo()
+    debut = time.perf_counter()
+    df = charger(mode)
+    duree = time.perf_counter() - debut
+    file.put((mode, len(df), len(df.columns), memoire_mo(df), rss_mo() - rss_avant, duree,
+              dict(df.dtypes.astype(str))))
+
+
+if __name__ == "__main__":
+    contexte = mp.get_context('spawn')
+    print("=" * 72)
+    print("BENCHMARK mémoire du jeu de données (API)")
+    print("=" * 72)
+    print(f"{'Mode':<9} {'Lignes':>9} {'Colonnes':>9} {'DataFrame':>11} {'RSS +':>10} {'Chargement':>11}")
+    types = {}
+    for mode in MODES:
+        file = contexte.Queue()
+        processus = contexte.Process(target=worker, args=(mode, file))
+        processus.start()
+        mode, lignes, nb_colonnes, memoire, rss, duree, types[mode] = file.get()
+        processus.join()
+        print(f"{mode:<9} {lignes:>9,} {nb_colonnes:>9} {memoire:>9.1f}Mo {rss:>8.1f}Mo {duree:>10.2f}s")
+    print("-" * 72)
+    for colonne, type_compact in types['compact'].items():
+        print(f"{colonne:<28} {types['complet'][colonne]:>16} -> {type_compact}")
+    print("=" * 72)
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, RACINE)
+os.chdir(RACINE)
+
+import api_server
+
+# Test de charge de /api/predict : N clients concurrents, sans regroupement
+# (taille_max=1 : un appel au modèle par requête) puis avec micro-lots
+N_REQUETES = 4_000
+CLIENTS = [1, 16, 64, 256]
+CONFIGURATIONS = [("sans lots", 0.0, 1), ("lots 1 ms", 0.001, 64), ("lots 2 ms", 0.002, 64)]
+
+rng = np.random.default_rng(42)
+REQUETES = [
+    {
+        "longitude": float(rng.uniform(2.25, 2.42)),
+        "latitude": float(rng.uniform(48.81, 48.90)),
+        "code_postal": int(rng.integers(75001, 75021)),
+        "code_type_local": 2,
+        "lot1_surface_carrez": float(rng.uniform(8, 250)),
+        "nombre_pieces_principales": int(rng.integers(1, 8)),
+    }
+    for _ in range(N_REQUETES)
+]
+
+
+async def charge(nb_clients):
+    """Envoie N_REQUETES réparties entre nb_clients boucles concurrentes"""
+    latences = []
+    transport = httpx.ASGITransport(app=api_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def client_charge(indices):
+            for i in indices:
+                debut = time.perf_counter()
+                reponse = await client.post("/api/predict", json=REQUETES[i])
+                latences.append(time.perf_counter() - debut)
+                reponse.raise_for_status()
+
+        debut = time.perf_counter()
+        await asyncio.gather(*[
+            client_charge(range(k, N_REQUETES, nb_clients)) for k in range(nb_clients)
+        ])
+        duree = time.perf_counter() - debut
+    return N_REQUETES / duree, np.array(latences) * 1000
+
+
+if __name__ == "__main__":
+    # ASGITransport n'exécute pas le lifespan : chargement explicite
+    api_server.charger_ressources()
+    if api_server.modele_actif.courant() is None:
+        print("⚠️ Modèle absent : entraîner d'abord le modèle (cd model && python model.py)")
+        sys.exit(1)
+
+    print("=" * 72)
+    print(f"TEST DE CHARGE /api/predict ({N_REQUETES:,} requêtes)")
+    print("=" * 72)
+    print(f"{'Configuration':<12} {'Clients':>7} {'Débit (req/s)':>14} {'p50 (ms)':>9} "
+          f"{'p99 (ms)':>9} {'Lot moyen':>10}")
+    for nom, fenetre_s, taille_max in CONFIGURATIONS:
+        for nb_clients in CLIENTS:
+            micro_lots = api_server.micro_lots = api_server.MicroLots(
+                api_server.predire_lignes, fenetre_s=fenetre_s, taille_max=taille_max
+            )
+            debit, latences = asyncio.run(charge(nb_clients))
+            print(f"{nom:<12} {nb_clients:>7} {debit:>14,.0f} {np.percentile(latences, 50):>9.2f} "
+                  f"{np.percentile(latences, 99):>9.2f} {micro_lots.statistiques()['taille_moyenne_lot']:>10.1f}")
+    print("=" * 72)
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from pricing_adjustments import (
+    adjust_price, adjust_price_array, codes_renovation, TOLERANCE_ULP, VALID_RENOVATION_STATES
+)
+
+# Micro-benchmark : corrections scalaires (boucle Python) vs vectorisées (NumPy)
+N = 1_000_000
+
+rng = np.random.default_rng(42)
+prices = rng.uniform(50_000, 3_000_000, size=N)
+ascenseurs = rng.random(N) < 0.7
+etats = rng.choice(VALID_RENOVATION_STATES, size=N)
+codes = codes_renovation(etats)
+
+print("=" * 60)
+print(f"BENCHMARK pricing_adjustments ({N:,} lignes)")
+print("=" * 60)
+
+debut = time.perf_counter()
+resultats_scalaires = np.array([
+    adjust_price(price, asc, etat)
+    for price, asc, etat in zip(prices.tolist(), ascenseurs.tolist(), etats.tolist())
+])
+duree_scalaire = time.perf_counter() - debut
+print(f"Scalaire   : {duree_scalaire:8.3f} s ({N / duree_scalaire:>14,.0f} lignes/s)")
+
+debut = time.perf_counter()
+resultats_vectorises = adjust_price_array(prices, ascenseurs, codes)
+duree_vectorisee = time.perf_counter() - debut
+print(f"Vectorisé  : {duree_vectorisee:8.3f} s ({N / duree_vectorisee:>14,.0f} lignes/s)")
+
+print(f"Accélération: x{duree_scalaire / duree_vectorisee:,.0f}")
+ecarts_ulp = np.abs(resultats_vectorises - resultats_scalaires) / np.spacing(resultats_scalaires)
+print(f"Résultats identiques: {np.mean(ecarts_ulp == 0):.2%} des lignes, "
+      f"écart max {ecarts_ulp.max():.0f} ulp (tolérance {TOLERANCE_ULP})")
+print("=" * 60)
@@ -0,0 +1,109 @@
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, RACINE)
+os.chdir(RACINE)
+
+# Démarrage de n workers de l'API (spawn, comme uvicorn --workers) :
+# - independant : chaque worker charge best_model.pkl, relit le jeu de données
+#   et reconstruit ses index (comportement sans préchargement)
+# - partage : le processus parent prépare une fois l'artefact du modèle et les
+#   index ; les workers les projettent en mémoire (mmap) et partagent leurs pages
+NB_WORKERS = [1, 2, 4, 8, 16]
+MODES = ['independant', 'partage']
+
+
+def memoire_processus():
+    """RSS et PSS (pages partagées réparties entre les processus) en Mo"""
+    valeurs = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for ligne in f:
+            nom, _, reste = ligne.partition(':')
+            if nom in ('Rss', 'Pss'):
+                valeurs[nom] = int(reste.split()[0]) / 1024
+    return valeurs['Rss'], valeurs['Pss']
+
+
+def demarrer_worker(mode):
+    """Ce que fait un worker de l'API à l'import d'api_server (modèle + index)"""
+    from comparables import COLONNES_COMPARABLES, IndexComparables
+    from historique_prix import COLONNES_HISTORIQUE, IndexHistoriquePrix, construire_index
+
+    if mode == 'independant':
+        import joblib
+        import pandas as pd
+        from donnees import charger_donnees, compacter
+
+        model = joblib.load(os.path.join('Training_set', 'best_model.pkl'))
+        features = joblib.load(os.path.join('Training_set', 'model_features.pkl'))
+        model.predict(pd.DataFrame(np.zeros((1, len(features))), columns=features))
+        df = compacter(charger_donnees(colonnes=list(dict.fromkeys(COLONNES_HISTORIQUE + COLONNES_COMPARABLES))))
+        construire_index(df)
+        IndexComparables().construire(df)
+        return
+
+    from registre import ModeleActif
+
+    ModeleActif().charger()
+    IndexHistoriquePrix().charger()
+    IndexComparables().charger()
+
+
+def worker(mode, depart, pret, mesurer, fin, file):
+    debut = time.perf_counter()
+    demarrer_worker(mode)
+    duree = time.perf_counter() - debut
+    pret.put((time.time() - depart, duree))
+    # Mémoire mesurée quand tous les workers sont prêts (partage effectif des pages)
+    mesurer.wait()
+    file.put(memoire_processus())
+    fin.wait()
+
+
+def lancer_workers(mode, n):
+    contexte = mp.get_context('spawn')
+    pret, file = contexte.Queue(), contexte.Queue()
+    mesurer, fin = contexte.Event(), contexte.Event()
+    depart = time.time()
+    processus = [
+        contexte.Process(target=worker, args=(mode, depart, pret, mesurer, fin, file)) for _ in range(n)
+    ]
+    for p in processus:
+        p.start()
+    demarrages = np.array([pret.get() for _ in range(n)])
+    mesurer.set()
+    memoires = np.array([file.get() for _ in range(n)])
+    fin.set()
+    for p in processus:
+        p.join()
+    return demarrages, memoires
+
+
+if __name__ == "__main__":
+    from comparables import IndexComparables
+    from historique_prix import IndexHistoriquePrix
+    from registre import charger_modele_courant
+
+    # Préchargement (parent) : artefact du modèle et index à jour sur disque
+    debut = time.perf_counter()
+    charger_modele_courant()
+    IndexHistoriquePrix().charger()
+    IndexComparables().charger()
+    print(f"Préchargement (parent): {time.perf_counter() - debut:.2f}s")
+
+    print("=" * 80)
+    print("BENCHMARK démarrage des workers de l'API")
+    print("=" * 80)
+    print(f"{'Mode':<12} {'Workers':>7} {'Tous prêts (s)':>15} {'Démarrage (s)':>14} "
+          f"{'RSS total':>11} {'PSS total':>11}")
+    for mode in MODES:
+        for n in NB_WORKERS:
+            demarrages, memoires = lancer_workers(mode, n)
+            print(f"{mode:<12} {n:>7} {demarrages[:, 0].max():>15.2f} {demarrages[:, 1].mean():>14.2f} "
+                  f"{memoires[:, 0].sum():>9.0f}Mo {memoires[:, 1].sum():>9.0f}Mo")
+    print("=" * 80)
@@ -1,48 +1,16 @@
-import pandas as pd
-import numpy as np
-from sklearn.neighbors import BallTree
+import os
+import sys
 
-df_metro = pd.read_csv('DATA/metro-france.csv',encoding='utf-8')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-df_metro = df_metro[df_metro['Commune nom'].str.contains("Paris")]
+from donnees import charger_donnees, enregistrer_donnees
+from transport import charger_stations, construire_arbre, scores_transport
 
-df_metro_clean = df_metro.rename(columns={
-    "Libelle Line": "ligne",
-    "Libelle station": "station",
-    "Commune nom": "commune"
-})[["ligne", "station", "Longitude", "Latitude", "commune"]]
+tree = construire_arbre(charger_stations())
 
 
-coords = np.radians(df_metro_clean[["Latitude", "Longitude"]].to_numpy())
-tree = BallTree(coords, metric="haversine")
-
-def score_transport(lat, lon):
-    """Score basé sur la station la plus proche (rapide avec BallTree)"""
-    point = np.radians([[lat, lon]])
-    dist, _ = tree.query(point, k=1)  
-    d_km = dist[0][0] * 6371 
-
-    if d_km < 0.150:
-        return 5
-    if d_km < 0.400:
-        return 4
-    if d_km < 0.800:
-        return 3
-    if d_km < 1.500:
-        return 2
-    return 1
-
-
-# Charger le dataset principal
-df = pd.read_csv('DATA/donnees_immobilieres.csv')
-
-df['score_transport'] = np.nan
-
-mask = df['latitude'].notna() & df['longitude'].notna()
-df.loc[mask, 'score_transport'] = df[mask].apply(
-    lambda row: score_transport(row['latitude'], row['longitude']), 
-    axis=1
-)
-df.to_csv('DATA/donnees_immobilieres.csv', index=False, encoding='utf-8')
-
+# Charger le dataset principal (Parquet s'il existe, sinon CSV)
+df = charger_donnees(trier=False)
 
+df['score_transport'] = scores_transport(tree, df['latitude'], df['longitude'])
+enregistrer_donnees(df)
@@ -1,8 +1,12 @@
-import pandas as pd
-import numpy as np
+import os
+import sys
 
-# Charger le dataset
-df = pd.read_csv('DATA/donnees_immobilieres.csv')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from donnees import charger_donnees, enregistrer_donnees
+
+# Charger le dataset (Parquet s'il existe, sinon CSV)
+df = charger_donnees(trier=False)
 
 # Calculer le prix_m_carrez moyen par code postal
 prix_moyen_par_arrondissement = df.groupby('code_postal')['prix_m_carrez'].mean().to_dict()
@@ -11,6 +15,4 @@ prix_moyen_par_arrondissement = df.groupby('code_postal')['prix_m_carrez'].mean(
 df['prix_m_carrez_arr'] = df['code_postal'].map(prix_moyen_par_arrondissement)
 
 # Sauvegarder le dataset mis à jour
-df.to_csv('DATA/donnees_immobilieres.csv', index=False, encoding='utf-8')
-
-
+enregistrer_donnees(df)
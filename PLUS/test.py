@@ -1,7 +1,13 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 
-df = pd.read_csv('DATA/donnees_immobilieres.csv',encoding='utf-8')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from donnees import charger_donnees
+
+df = charger_donnees()
 
 print(df.dtypes)
\ No newline at end of file
@@ -1,108 +1,494 @@
 import requests
+import httpx
 from typing import Tuple, Optional
+import asyncio
+import os
+import re
+import sqlite3
+import threading
 import time
+import unicodedata
+
+from cache_lru import CacheLRU
+from donnees import RACINE
+from metriques import APPELS_GEOCODEUR, DUREE_GEOCODEUR
+
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {
+    'User-Agent': 'RealEstate_Price_App/1.0'
+}
+CHEMIN_CACHE_GEOCODAGE = os.path.join(RACINE, 'DATA', 'geocodage_cache.sqlite')
+TTL_GEOCODAGE = 30 * 24 * 3600  # 30 jours
+
+
+def normaliser_texte(texte: str) -> str:
+    texte = unicodedata.normalize('NFKD', str(texte or ""))
+    texte = "".join(c for c in texte if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^\w]+", " ", texte).strip()
+
+
+def normaliser_adresse(numero: str = "", rue: str = "", ville: str = "", pays: str = "France") -> str:
+    """
+    Normalise une adresse pour servir de clé de cache :
+    minuscules, sans accents, ponctuation et espaces multiples supprimés.
+
+    Exemple:
+        >>> normaliser_adresse("13", "Rue  Lasson", "PARIS")
+        '13 rue lasson, paris, france'
+    """
+    numero_rue = " ".join(p for p in [normaliser_texte(numero), normaliser_texte(rue)] if p)
+    parties = [numero_rue, normaliser_texte(ville), normaliser_texte(pays)]
+    return ", ".join(p for p in parties if p)
+
+
+class LimiteurDebit:
+    """
+    Limiteur de débit à seau de jetons (token bucket), partagé par tout le processus.
+
+    reserver() réserve un jeton et retourne le temps d'attente (en secondes)
+    avant de pouvoir l'utiliser, sans bloquer : l'appelant synchrone fait un
+    time.sleep, l'appelant asynchrone un asyncio.sleep.
+    """
+
+    def __init__(self, debit: float = 1.0, capacite: float = 1.0):
+        self.debit = debit
+        self.capacite = capacite
+        self._jetons = capacite
+        self._derniere_maj = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def reserver(self) -> float:
+        with self._verrou:
+            maintenant = time.monotonic()
+            self._jetons = min(self.capacite, self._jetons + (maintenant - self._derniere_maj) * self.debit)
+            self._derniere_maj = maintenant
+            # Le solde peut devenir négatif : il représente les jetons déjà réservés
+            self._jetons -= 1
+            return max(0.0, -self._jetons / self.debit)
+
+
+# Limite d'usage de Nominatim : 1 requête par seconde pour tout le processus
+limiteur_nominatim = LimiteurDebit(debit=1.0, capacite=1.0)
+
+
+class BackendNominatim:
+    """
+    Backend de géocodage utilisant l'API Nominatim d'OpenStreetMap.
+    Respecte la limite d'une requête par seconde imposée par Nominatim.
+    """
+
+    def __init__(self, base_url: str = NOMINATIM_URL, limiteur: Optional[LimiteurDebit] = None):
+        self.base_url = base_url
+        self.headers = NOMINATIM_HEADERS
+        self.limiteur = limiteur if limiteur is not None else limiteur_nominatim
+
+    def rechercher(self, numero: str = "", rue: str = "", ville: str = "",
+                   pays: str = "France") -> Optional[Tuple[float, float]]:
+        adresse_parts = [p for p in [numero, rue, ville, pays] if p]
+        adresse_complete = ", ".join(adresse_parts)
+
+        # Paramètres de la requête
+        params = {
+            'q': adresse_complete,
+            'format': 'json',
+            'limit': 1
+        }
+
+        try:
+            # Respect du rate limit (1 requête par seconde max pour Nominatim)
+            time.sleep(self.limiteur.reserver())
+
+            with DUREE_GEOCODEUR.mesurer(backend="nominatim"):
+                response = requests.get(self.base_url, params=params, headers=self.headers)
+            response.raise_for_status()
+
+            data = response.json()
+
+            if data and len(data) > 0:
+                longitude = float(data[0]['lon'])
+                latitude = float(data[0]['lat'])
+                APPELS_GEOCODEUR.inc(backend="nominatim", resultat="trouve")
+                return (longitude, latitude)
+            else:
+                APPELS_GEOCODEUR.inc(backend="nominatim", resultat="non_trouve")
+                print(f"Aucune coordonnée trouvée pour l'adresse: {adresse_complete}")
+                return None
+
+        except requests.RequestException as e:
+            APPELS_GEOCODEUR.inc(backend="nominatim", resultat="erreur")
+            print(f"Erreur lors de la requête: {e}")
+            return None
+        except (KeyError, ValueError, IndexError) as e:
+            APPELS_GEOCODEUR.inc(backend="nominatim", resultat="erreur")
+            print(f"Erreur lors du traitement de la réponse: {e}")
+            return None
+
+
+class BackendChaine:
+    """
+    Essaie plusieurs backends dans l'ordre et retourne le premier résultat trouvé
+    (par exemple l'index local, puis Nominatim en secours).
+    """
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+
+    def rechercher(self, numero: str = "", rue: str = "", ville: str = "",
+                   pays: str = "France") -> Optional[Tuple[float, float]]:
+        for backend in self.backends:
+            coords = backend.rechercher(numero, rue, ville, pays)
+            if coords is not None:
+                return coords
+        return None
+
+
+def backend_local_depuis_config():
+    """
+    Index d'adresses local configuré par variables d'environnement, ou None :
+    - GEOCODEUR_BACKEND : "nominatim" (défaut) ou "local"
+    - GEOCODEUR_ADRESSES_CSV : fichier d'adresses (défaut DATA/adresses.csv)
+    """
+    if os.environ.get('GEOCODEUR_BACKEND', 'nominatim').lower() != 'local':
+        return None
+
+    from adresse_locale import BackendLocal, CHEMIN_ADRESSES
+    return BackendLocal(os.environ.get('GEOCODEUR_ADRESSES_CSV', CHEMIN_ADRESSES))
+
+
+def backend_depuis_config():
+    """
+    Backend de géocodage sélectionné par la configuration.
+    Avec GEOCODEUR_BACKEND=local, Nominatim reste utilisé en secours sauf si
+    GEOCODEUR_FALLBACK_NOMINATIM=0.
+    """
+    backend_local = backend_local_depuis_config()
+    if backend_local is None:
+        return BackendNominatim()
+    if os.environ.get('GEOCODEUR_FALLBACK_NOMINATIM', '1') == '0':
+        return backend_local
+    return BackendChaine([backend_local, BackendNominatim()])
+
+
+class CacheGeocodage:
+    """
+    Cache de géocodage à deux niveaux, indexé par l'adresse normalisée :
+    - un LRU en mémoire borné (niveau 1)
+    - une base SQLite sur disque qui survit aux redémarrages (niveau 2)
+
+    Seules les adresses trouvées sont mises en cache.
+    """
+
+    def __init__(self, chemin_sqlite: Optional[str] = CHEMIN_CACHE_GEOCODAGE,
+                 taille_memoire: int = 4096, ttl: float = TTL_GEOCODAGE):
+        self.ttl = ttl
+        self.memoire = CacheLRU(taille_max=taille_memoire, ttl=ttl)
+        self.hits_disque = 0
+        self.misses = 0
+        self._verrou = threading.Lock()
+        self._connexion = None
+
+        if chemin_sqlite:
+            try:
+                self._connexion = sqlite3.connect(chemin_sqlite, check_same_thread=False)
+                self._connexion.execute(
+                    "CREATE TABLE IF NOT EXISTS geocodage ("
+                    "cle TEXT PRIMARY KEY, longitude REAL, latitude REAL, date_ajout REAL)"
+                )
+                self._connexion.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache de géocodage sur disque indisponible ({chemin_sqlite}): {e}")
+                self._connexion = None
+
+    def obtenir(self, cle: str) -> Optional[Tuple[float, float]]:
+        coords = self.obtenir_memoire(cle)
+        if coords is not None:
+            return coords
+        return self.obtenir_disque(cle)
+
+    def obtenir_memoire(self, cle: str) -> Optional[Tuple[float, float]]:
+        return self.memoire.obtenir(cle)
+
+    def obtenir_disque(self, cle: str) -> Optional[Tuple[float, float]]:
+        if self._connexion is not None:
+            with self._verrou:
+                ligne = self._connexion.execute(
+                    "SELECT longitude, latitude, date_ajout FROM geocodage WHERE cle = ?", (cle,)
+                ).fetchone()
+            if ligne is not None and time.time() - ligne[2] < self.ttl:
+                coords = (ligne[0], ligne[1])
+                self.memoire.ajouter(cle, coords)
+                self.hits_disque += 1
+                return coords
+
+        self.misses += 1
+        return None
+
+    def ajouter(self, cle: str, coords: Tuple[float, float]) -> None:
+        self.memoire.ajouter(cle, coords)
+        if self._connexion is not None:
+            with self._verrou:
+                self._connexion.execute(
+                    "INSERT OR REPLACE INTO geocodage (cle, longitude, latitude, date_ajout) "
+                    "VALUES (?, ?, ?, ?)",
+                    (cle, coords[0], coords[1], time.time())
+                )
+                self._connexion.commit()
+
+    def statistiques(self) -> dict:
+        return {
+            "hits_memoire": self.memoire.hits,
+            "hits_disque": self.hits_disque,
+            "misses": self.misses,
+            "taille_memoire": len(self.memoire),
+            "disque_actif": self._connexion is not None
+        }
 
 
 class GeocodeurAdresse:
     """
     Classe pour convertir une adresse en coordonnées GPS (longitude, latitude).
-    Utilise l'API Nominatim d'OpenStreetMap.
+    Utilise l'API Nominatim d'OpenStreetMap par défaut, avec un cache à deux niveaux.
+
+    Le backend (tout objet ayant une méthode rechercher(numero, rue, ville, pays))
+    et le cache peuvent être injectés, par exemple pour tester hors ligne.
     """
-    
-    def __init__(self):
-        self.base_url = "https://nominatim.openstreetmap.org/search"
-        self.headers = {
-            'User-Agent': 'RealEstate_Price_App/1.0'
-        }
-    
-    def obtenir_coordonnees(self, numero: str = "", rue: str = "", ville: str = "", 
+
+    def __init__(self, backend=None, cache: Optional[CacheGeocodage] = None):
+        self.backend = backend if backend is not None else backend_depuis_config()
+        self.cache = cache if cache is not None else cache_par_defaut()
+
+    def obtenir_coordonnees(self, numero: str = "", rue: str = "", ville: str = "",
                            pays: str = "France") -> Optional[Tuple[float, float]]:
         """
         Convertit une adresse en coordonnées GPS.
-        
+
         Args:
             numero: Numéro de rue
             rue: Nom de la rue
             ville: Nom de la ville
             pays: Pays (par défaut "France")
-        
+
         Returns:
             Tuple (longitude, latitude) ou None si l'adresse n'est pas trouvée
-        
+
         Exemple:
             >>> geocodeur = GeocodeurAdresse()
             >>> coords = geocodeur.obtenir_coordonnees("1", "Avenue des Champs-Élysées", "Paris")
             >>> print(coords)
             (2.3069, 48.8698)
         """
-        # Construction de l'adresse complète
-        adresse_parts = [p for p in [numero, rue, ville, pays] if p]
-        adresse_complete = ", ".join(adresse_parts)
-        
-        if not adresse_complete:
+        cle = normaliser_adresse(numero, rue, ville, pays)
+
+        if not cle:
             raise ValueError("Au moins un élément d'adresse doit être fourni")
-        
-        # Paramètres de la requête
+
+        coords = self.cache.obtenir(cle)
+        if coords is not None:
+            return coords
+
+        coords = self.backend.rechercher(numero, rue, ville, pays)
+        if coords is not None:
+            self.cache.ajouter(cle, coords)
+        return coords
+
+
+class GeocodeurAdresseAsync:
+    """
+    Géocodeur asynchrone (asyncio) pour l'API Nominatim.
+
+    - client HTTP poolé (httpx.AsyncClient), réutilisé entre les requêtes
+    - limiteur de débit partagé avec le géocodeur synchrone
+    - les appels concurrents pour une même adresse sont regroupés en un seul appel
+    - partage le cache à deux niveaux de GeocodeurAdresse
+    - interroge d'abord l'index d'adresses local s'il est fourni (backend_local)
+
+    base_url peut pointer vers un serveur local (stub) pour les tests.
+    """
+
+    def __init__(self, base_url: str = NOMINATIM_URL, cache: Optional[CacheGeocodage] = None,
+                 limiteur: Optional[LimiteurDebit] = None, timeout: float = 10.0,
+                 client: Optional[httpx.AsyncClient] = None, backend_local=None,
+                 fallback_nominatim: bool = True):
+        self.base_url = base_url
+        self.backend_local = backend_local
+        self.fallback_nominatim = fallback_nominatim
+        self.cache = cache if cache is not None else cache_par_defaut()
+        self.limiteur = limiteur if limiteur is not None else limiteur_nominatim
+        self.timeout = timeout
+        self.appels_amont = 0
+        self._client = client
+        self._en_cours = {}
+
+    def _obtenir_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=NOMINATIM_HEADERS,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        return self._client
+
+    async def fermer(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def obtenir_coordonnees(self, numero: str = "", rue: str = "", ville: str = "",
+                                  pays: str = "France") -> Optional[Tuple[float, float]]:
+        """
+        Version asynchrone de GeocodeurAdresse.obtenir_coordonnees.
+        Ne bloque jamais la boucle d'événements.
+        """
+        cle = normaliser_adresse(numero, rue, ville, pays)
+
+        if not cle:
+            raise ValueError("Au moins un élément d'adresse doit être fourni")
+
+        coords = self.cache.obtenir_memoire(cle)
+        if coords is not None:
+            return coords
+
+        # L'index local répond en mémoire, sans appel réseau
+        if self.backend_local is not None:
+            coords = self.backend_local.rechercher(numero, rue, ville, pays)
+            if coords is not None or not self.fallback_nominatim:
+                return coords
+
+        # Regroupe les appelants qui attendent la même adresse
+        tache = self._en_cours.get(cle)
+        if tache is None:
+            tache = asyncio.ensure_future(self._resoudre(cle, numero, rue, ville, pays))
+            self._en_cours[cle] = tache
+            tache.add_done_callback(lambda _: self._en_cours.pop(cle, None))
+
+        # shield : l'annulation d'un appelant n'annule pas l'appel partagé
+        return await asyncio.shield(tache)
+
+    async def _resoudre(self, cle: str, numero: str, rue: str, ville: str,
+                        pays: str) -> Optional[Tuple[float, float]]:
+        coords = await asyncio.to_thread(self.cache.obtenir_disque, cle)
+        if coords is not None:
+            return coords
+
+        coords = await self._rechercher(numero, rue, ville, pays)
+        if coords is not None:
+            await asyncio.to_thread(self.cache.ajouter, cle, coords)
+        return coords
+
+    async def _rechercher(self, numero: str, rue: str, ville: str,
+                          pays: str) -> Optional[Tuple[float, float]]:
+        adresse_complete = ", ".join(p for p in [numero, rue, ville, pays] if p)
         params = {
             'q': adresse_complete,
             'format': 'json',
             'limit': 1
         }
-        
+
         try:
             # Respect du rate limit (1 requête par seconde max pour Nominatim)
-            time.sleep(1)
-            
-            response = requests.get(self.base_url, params=params, headers=self.headers)
+            await asyncio.sleep(self.limiteur.reserver())
+
+            self.appels_amont += 1
+            with DUREE_GEOCODEUR.mesurer(backend="nominatim"):
+                response = await self._obtenir_client().get(self.base_url, params=params)
             response.raise_for_status()
-            
+
             data = response.json()
-            
+
             if data and len(data) > 0:
-                longitude = float(data[0]['lon'])
-                latitude = float(data[0]['lat'])
-                return (longitude, latitude)
+                APPELS_GEOCODEUR.inc(backend="nominatim", resultat="trouve")
+                return (float(data[0]['lon']), float(data[0]['lat']))
             else:
+                APPELS_GEOCODEUR.inc(backend="nominatim", resultat="non_trouve")
                 print(f"Aucune coordonnée trouvée pour l'adresse: {adresse_complete}")
                 return None
-                
-        except requests.RequestException as e:
+
+        except httpx.HTTPError as e:
+            APPELS_GEOCODEUR.inc(backend="nominatim", resultat="erreur")
             print(f"Erreur lors de la requête: {e}")
             return None
         except (KeyError, ValueError, IndexError) as e:
+            APPELS_GEOCODEUR.inc(backend="nominatim", resultat="erreur")
             print(f"Erreur lors du traitement de la réponse: {e}")
             return None
 
 
-def adresse_vers_coordonnees(numero: str = "", rue: str = "", ville: str = "", 
+_cache_par_defaut = None
+_geocodeur_par_defaut = None
+_geocodeur_async_par_defaut = None
+_verrou_geocodeur_async = threading.Lock()
+
+
+def cache_par_defaut() -> CacheGeocodage:
+    """Cache de géocodage partagé par le processus."""
+    global _cache_par_defaut
+    if _cache_par_defaut is None:
+        _cache_par_defaut = CacheGeocodage()
+    return _cache_par_defaut
+
+
+def geocodeur_par_defaut() -> GeocodeurAdresse:
+    """Géocodeur partagé par le processus (et donc son cache)."""
+    global _geocodeur_par_defaut
+    if _geocodeur_par_defaut is None:
+        _geocodeur_par_defaut = GeocodeurAdresse()
+    return _geocodeur_par_defaut
+
+
+def geocodeur_async_par_defaut(creer: bool = True) -> Optional[GeocodeurAdresseAsync]:
+    """
+    Géocodeur asynchrone partagé par le processus.
+
+    Sa création lit l'index d'adresses local (GEOCODEUR_BACKEND=local), ce
+    qui peut prendre plusieurs secondes : à appeler hors de la boucle
+    d'événements (thread de chargement, asyncio.to_thread). Les appels
+    concurrents attendent la fin de la création en cours.
+
+    Parameters:
+    -----------
+    creer : bool
+        Si False, renvoie None au lieu de créer le géocodeur
+    """
+    global _geocodeur_async_par_defaut
+    if _geocodeur_async_par_defaut is None and creer:
+        with _verrou_geocodeur_async:
+            if _geocodeur_async_par_defaut is None:
+                _geocodeur_async_par_defaut = GeocodeurAdresseAsync(
+                    backend_local=backend_local_depuis_config(),
+                    fallback_nominatim=os.environ.get('GEOCODEUR_FALLBACK_NOMINATIM', '1') != '0'
+                )
+    return _geocodeur_async_par_defaut
+
+
+def adresse_vers_coordonnees(numero: str = "", rue: str = "", ville: str = "",
                              pays: str = "France") -> Optional[Tuple[float, float]]:
     """
     Fonction simple pour convertir une adresse en coordonnées GPS.
-    
+
     Args:
         numero: Numéro de rue
         rue: Nom de la rue
         ville: Nom de la ville
         pays: Pays (par défaut "France")
-    
+
     Returns:
         Tuple (longitude, latitude) ou None si l'adresse n'est pas trouvée
-    
+
     Exemple:
         >>> coords = adresse_vers_coordonnees("10", "Rue de Rivoli", "Paris")
         >>> print(coords)
         (2.3522, 48.8566)
     """
-    geocodeur = GeocodeurAdresse()
-    return geocodeur.obtenir_coordonnees(numero, rue, ville, pays)
+    return geocodeur_par_defaut().obtenir_coordonnees(numero, rue, ville, pays)
 
 
 # Exemple d'utilisation
 if __name__ == "__main__":
     # Test avec la classe
     geocodeur = GeocodeurAdresse()
-    
+
     # Exemple 1: Adresse complète
     coords = geocodeur.obtenir_coordonnees("13", "rue lasson", "Paris")
     print(f"Coordonnées Champs-Élysées: {coords}")
-   
+
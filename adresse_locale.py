@@ -0,0 +1,210 @@
+import os
+import re
+from collections import defaultdict
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from adresse import normaliser_texte
+from donnees import RACINE
+
+
+CHEMIN_ADRESSES = os.path.join(RACINE, 'DATA', 'adresses.csv')
+
+# Correspondance entre les noms de colonnes acceptés et les colonnes de la BAN
+ALIAS_COLONNES = {
+    'numero': 'numero',
+    'rep': 'rep',
+    'nom_voie': 'nom_voie',
+    'rue': 'nom_voie',
+    'voie': 'nom_voie',
+    'code_postal': 'code_postal',
+    'nom_commune': 'nom_commune',
+    'commune': 'nom_commune',
+    'ville': 'nom_commune',
+    'lon': 'lon',
+    'longitude': 'lon',
+    'lat': 'lat',
+    'latitude': 'lat',
+}
+
+# Abréviations courantes des types de voie
+ABREVIATIONS_VOIES = {
+    'av': 'avenue', 'ave': 'avenue',
+    'bd': 'boulevard', 'bld': 'boulevard', 'boul': 'boulevard',
+    'r': 'rue',
+    'pl': 'place',
+    'fg': 'faubourg', 'fbg': 'faubourg',
+    'imp': 'impasse',
+    'sq': 'square',
+    'all': 'allee',
+    'che': 'chemin', 'ch': 'chemin',
+    'rte': 'route',
+    'st': 'saint', 'ste': 'sainte',
+}
+
+SEUIL_SIMILARITE = 0.45
+
+
+def normaliser_voie(rue: str) -> str:
+    """Normalise un nom de voie et développe les abréviations (av -> avenue)."""
+    mots = normaliser_texte(rue).split()
+    return " ".join(ABREVIATIONS_VOIES.get(mot, mot) for mot in mots)
+
+
+def trigrammes(texte: str) -> set:
+    texte = f"  {texte} "
+    return {texte[i:i + 3] for i in range(len(texte) - 2)}
+
+
+class BackendLocal:
+    """
+    Backend de géocodage hors ligne à partir d'un fichier d'adresses local
+    (format BAN : numero, rep, nom_voie, code_postal, nom_commune, lon, lat).
+
+    Deux index sont construits au chargement :
+    - un index exact (dictionnaire) sur le nom de voie normalisé
+    - un index de trigrammes pour retrouver les voies mal orthographiées
+
+    Se branche sur GeocodeurAdresse comme n'importe quel backend.
+    """
+
+    def __init__(self, chemin: str = CHEMIN_ADRESSES, seuil_similarite: float = SEUIL_SIMILARITE):
+        self.chemin = chemin
+        self.seuil_similarite = seuil_similarite
+        self._charger()
+
+    def _lire_csv(self) -> pd.DataFrame:
+        with open(self.chemin, encoding='utf-8') as f:
+            entete = f.readline()
+        sep = ';' if entete.count(';') > entete.count(',') else ','
+
+        colonnes = {
+            colonne: ALIAS_COLONNES[colonne.strip().lower()]
+            for colonne in entete.strip().split(sep)
+            if colonne.strip().lower() in ALIAS_COLONNES
+        }
+        df = pd.read_csv(
+            self.chemin, sep=sep, usecols=list(colonnes),
+            dtype={colonne: str for colonne, nom in colonnes.items() if nom not in ('lon', 'lat')},
+            encoding='utf-8'
+        ).rename(columns=colonnes)
+
+        manquantes = {'numero', 'nom_voie', 'lon', 'lat'} - set(df.columns)
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans {self.chemin}: {sorted(manquantes)}")
+
+        for colonne in ['rep', 'code_postal', 'nom_commune']:
+            if colonne not in df.columns:
+                df[colonne] = ""
+        return df.dropna(subset=['nom_voie', 'lon', 'lat']).fillna("")
+
+    def _charger(self):
+        df = self._lire_csv()
+
+        # Une voie = un nom de voie normalisé dans une commune (et un code postal)
+        self._voies = []                       # voie_id -> (commune normalisée, code postal)
+        self._numeros = []                     # voie_id -> {numéro normalisé: (lon, lat)}
+        self._voies_par_nom = defaultdict(list)  # nom normalisé -> [voie_id]
+        ids_voies = {}
+
+        for numero, rep, voie, code_postal, commune, lon, lat in zip(
+                df['numero'], df['rep'], df['nom_voie'], df['code_postal'],
+                df['nom_commune'], df['lon'].to_numpy(), df['lat'].to_numpy()):
+            nom = normaliser_voie(voie)
+            cle_voie = (nom, normaliser_texte(commune), code_postal)
+            voie_id = ids_voies.get(cle_voie)
+            if voie_id is None:
+                voie_id = len(self._voies)
+                ids_voies[cle_voie] = voie_id
+                self._voies.append(cle_voie[1:])
+                self._numeros.append({})
+                self._voies_par_nom[nom].append(voie_id)
+
+            cle_numero = normaliser_texte(f"{numero} {rep}")
+            self._numeros[voie_id][cle_numero] = (float(lon), float(lat))
+
+        # Index de trigrammes sur les noms de voie distincts
+        self._noms = list(self._voies_par_nom)
+        self._nb_trigrammes = np.array([len(trigrammes(nom)) for nom in self._noms])
+        index = defaultdict(list)
+        for nom_id, nom in enumerate(self._noms):
+            for trigramme in trigrammes(nom):
+                index[trigramme].append(nom_id)
+        self._index_trigrammes = {t: np.array(ids, dtype=np.int32) for t, ids in index.items()}
+
+    def __len__(self) -> int:
+        return sum(len(numeros) for numeros in self._numeros)
+
+    def _voies_approchees(self, nom: str, ville: str) -> list:
+        """
+        Voies de la ville dont le nom est le plus proche au sens de la
+        similarité de Jaccard sur les trigrammes. Les noms candidats (au-dessus
+        du seuil) sont parcourus du plus proche au moins proche : une voie
+        mieux notée dans une autre commune ne masque pas celle de la ville.
+        """
+        trigrammes_requete = trigrammes(nom)
+        postings = [self._index_trigrammes[t] for t in trigrammes_requete if t in self._index_trigrammes]
+        if not postings:
+            return []
+
+        communs = np.bincount(np.concatenate(postings), minlength=len(self._noms))
+        similarites = communs / (len(trigrammes_requete) + self._nb_trigrammes - communs)
+        candidats = np.flatnonzero(similarites >= self.seuil_similarite)
+        for nom_id in candidats[np.argsort(-similarites[candidats], kind='stable')]:
+            voies = [voie_id for voie_id in self._voies_par_nom[self._noms[nom_id]]
+                     if self._dans_ville(voie_id, ville)]
+            if voies:
+                return voies
+        return []
+
+    def _dans_ville(self, voie_id: int, ville: str) -> bool:
+        """
+        Voie dans la ville demandée (commune ou code postal). Une commune ou
+        un code postal vide ne correspond à aucune ville.
+        """
+        if not ville:
+            return True
+        commune, code_postal = self._voies[voie_id]
+        if code_postal and ville == code_postal:
+            return True
+        return bool(commune) and (commune.startswith(ville) or ville.startswith(commune))
+
+    def rechercher(self, numero: str = "", rue: str = "", ville: str = "",
+                   pays: str = "France") -> Optional[Tuple[float, float]]:
+        nom = normaliser_voie(rue)
+        if not nom:
+            return None
+
+        ville = normaliser_texte(ville)
+        voies = [voie_id for voie_id in self._voies_par_nom.get(nom, []) if self._dans_ville(voie_id, ville)]
+        if not voies:
+            # Nom inconnu dans cette ville : voie la plus proche de la ville
+            voies = self._voies_approchees(nom, ville)
+            if not voies:
+                return None
+
+        numero = normaliser_texte(numero)
+        for voie_id in voies:
+            coords = self._numeros[voie_id].get(numero)
+            if coords is not None:
+                return coords
+
+        return self._numero_le_plus_proche(voies[0], numero)
+
+    def _numero_le_plus_proche(self, voie_id: int, numero: str) -> Tuple[float, float]:
+        """Numéro le plus proche sur la voie, ou centre de la voie si aucun numéro n'est donné."""
+        numeros = self._numeros[voie_id]
+        chiffres = re.match(r"\d+", numero)
+        if chiffres is None:
+            points = np.array(list(numeros.values()))
+            return (float(points[:, 0].mean()), float(points[:, 1].mean()))
+
+        cible = int(chiffres.group())
+
+        def distance(cle):
+            match = re.match(r"\d+", cle)
+            return abs(int(match.group()) - cible) if match else float('inf')
+
+        return numeros[min(numeros, key=distance)]
@@ -1,15 +1,42 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import pandas as pd
-import joblib
-from adresse import adresse_vers_coordonnees
-from pricing_adjustments import adjust_price, VALID_RENOVATION_STATES
-import uvicorn
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, Callable, Dict, List
+from adresse import geocodeur_async_par_defaut
+from pricing_adjustments import adjust_price, adjust_price_array, VALID_RENOVATION_STATES
+from parametres_comparables import NB_COMPARABLES, NB_MOIS_COMPARABLES, TOLERANCE_SURFACE
+from registre import ModeleActif
+from micro_lots import MicroLots
+from cache_predictions import CachePredictions
+from metriques import DUREE_ETAPES, TYPE_CONTENU, MiddlewareMetriques, metriques
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import threading
+import time
+
+
+# Chargement différé (par défaut) : le serveur ouvre son port immédiatement
+# et charge le modèle et les index dans un thread ; /api/health/ready renvoie
+# 503 jusqu'à la fin du chargement. API_DEMARRAGE_DIFFERE=0 charge tout à
+# l'import du module, avant que le serveur n'accepte de connexions.
+DEMARRAGE_DIFFERE = os.environ.get('API_DEMARRAGE_DIFFERE', '1') == '1'
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DEMARRAGE_DIFFERE:
+        threading.Thread(target=charger_ressources, name="chargement-api", daemon=True).start()
+    yield
+    # Fermer le pool de connexions HTTP du géocodeur (sans le créer s'il n'a pas servi)
+    geocodeur = geocodeur_async_par_defaut(creer=False)
+    if geocodeur is not None:
+        await geocodeur.fermer()
+
 
 # Créer l'application FastAPI
-app = FastAPI(title="RealEstate Price API", version="1.0.0")
+app = FastAPI(title="RealEstate Price API", version="1.0.0", lifespan=lifespan)
 
 # Configuration CORS pour permettre les requêtes depuis React
 app.add_middleware(
@@ -20,17 +47,114 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Charger le modèle et les données
-try:
-    model = joblib.load('Training_set/best_model.pkl')
-    features_list = joblib.load('Training_set/model_features.pkl')
-    df_data = pd.read_csv('DATA/donnees_immobilieres.csv')
-    print("✓ Modèle et données chargés avec succès")
-except Exception as e:
-    print(f"⚠️ Erreur lors du chargement: {e}")
-    model = None
-    features_list = []
-    df_data = None
+# Durée, statut et erreurs de chaque requête, exposés sur /metrics
+app.add_middleware(MiddlewareMetriques)
+
+# Modèle courant du registre (arbres compilés projetés en mémoire), rechargé
+# à chaud quand Training_set/registre/CURRENT change
+modele_actif = ModeleActif(intervalle_verification=float(os.environ.get('INTERVALLE_RECHARGEMENT_MODELE', 5)))
+
+# Ressources renseignées par charger_ressources()
+arbre_transport = None
+index_historique = None
+index_comparables = None
+
+# Avancement du chargement, exposé par /api/health et /api/health/ready
+demarrage = {
+    "debut": time.time(),
+    "termine": False,
+    "duree_s": None,
+    "etapes": {}
+}
+_verrou_demarrage = threading.Lock()
+
+
+def _etape(nom: str, fonction: Callable[[], Any], erreur: str) -> Any:
+    """Exécute une étape du chargement, mesure sa durée et renvoie None en cas d'erreur"""
+    debut = time.perf_counter()
+    demarrage["etapes"][nom] = {"statut": "en_cours", "duree_s": None}
+    try:
+        resultat = fonction()
+        statut = "ok"
+    except Exception as e:
+        print(f"⚠️ {erreur}: {e}")
+        resultat, statut = None, f"erreur: {e}"
+    demarrage["etapes"][nom] = {"statut": statut, "duree_s": round(time.perf_counter() - debut, 3)}
+    return resultat
+
+
+def charger_ressources() -> None:
+    """
+    Charge le modèle, l'arbre des stations de métro et les index dérivés du
+    jeu de données. Sans effet si le chargement a déjà eu lieu ; un appel
+    concurrent attend la fin du chargement en cours.
+    
+    Les modules lourds (pandas, NumPy, scikit-learn, via le modèle, les
+    index et les stations) ne sont importés qu'ici ou dans les endpoints qui
+    s'en servent : importer api_server reste rapide et le port s'ouvre avant
+    leur chargement.
+    """
+    global arbre_transport, index_historique, index_comparables
+    
+    with _verrou_demarrage:
+        if demarrage["termine"]:
+            return
+        debut = time.perf_counter()
+        
+        from comparables import IndexComparables
+        from historique_prix import IndexHistoriquePrix
+        from transport import charger_stations, construire_arbre
+        
+        # Arbre des stations de métro, pour dériver score_transport des coordonnées
+        arbre_transport = _etape("stations", lambda: construire_arbre(charger_stations()),
+                                 "Erreur lors du chargement des stations de métro")
+        
+        if _etape("modele", modele_actif.charger, "Erreur lors du chargement du modèle") is not None:
+            print(f"✓ Modèle {modele_actif.courant().version} chargé avec succès")
+        
+        # Géocodeur (et index d'adresses local s'il est configuré), construit
+        # ici plutôt qu'au premier /api/geocode sur la boucle d'événements
+        _etape("geocodeur", geocodeur_async_par_defaut, "Erreur lors du chargement du géocodeur")
+        
+        # Les index dérivés du jeu de données sont calculés une seule fois puis
+        # sauvegardés (DATA/historique_prix.pkl, DATA/comparables.joblib) : un worker
+        # qui démarre les recharge, projetés en mémoire et partagés avec les autres,
+        # sans relire le jeu de données. Ils ne sont reconstruits (à partir des seules
+        # colonnes utiles, en types compacts) que si le jeu de données a changé.
+        
+        # Index de l'historique des prix par code postal
+        index_historique = _etape("historique", lambda: IndexHistoriquePrix().charger(),
+                                  "Erreur lors de la construction de l'historique")
+        
+        # Index spatial des transactions (un BallTree par type de bien) pour /api/comparables
+        index_comparables = _etape("comparables", lambda: IndexComparables().charger(),
+                                   "Erreur lors de la construction de l'index des comparables")
+        if index_comparables is not None:
+            print(f"✓ Données chargées avec succès ({len(index_comparables):,} transactions, "
+                  f"{index_comparables.memoire_mo():.1f} Mo{', projetées en mémoire' if index_comparables.projete else ''})")
+        
+        demarrage["duree_s"] = round(time.perf_counter() - debut, 3)
+        demarrage["termine"] = True
+        print(f"✓ API prête en {time.time() - demarrage['debut']:.2f}s")
+
+
+def est_pret() -> bool:
+    """Chargement terminé et modèle disponible"""
+    return demarrage["termine"] and modele_actif.courant() is not None
+
+
+def verifier_demarrage() -> None:
+    """503 (à réessayer) tant que le chargement de démarrage n'est pas terminé"""
+    if not demarrage["termine"]:
+        raise HTTPException(
+            status_code=503,
+            detail="API en cours de démarrage (chargement du modèle et des données), réessayez dans quelques secondes",
+            headers={"Retry-After": "1"}
+        )
+
+
+if not DEMARRAGE_DIFFERE:
+    charger_ressources()
 
 
 # Modèles Pydantic pour la validation
@@ -52,6 +176,83 @@ class PredictionRequest(BaseModel):
     etat_renovation: str = "standard"
 
 
+class ComparablesRequest(BaseModel):
+    longitude: float
+    latitude: float
+    code_type_local: int
+    lot1_surface_carrez: float
+    k: int = NB_COMPARABLES
+    nb_mois: int = NB_MOIS_COMPARABLES
+    tolerance_surface: float = TOLERANCE_SURFACE
+
+
+# Taille maximale d'un lot pour /api/predict/batch
+MAX_BATCH_SIZE = 10_000
+
+# Nombre maximal de transactions renvoyées par /api/comparables
+MAX_COMPARABLES = 100
+
+
+def donnees_modele(request: PredictionRequest) -> dict:
+    """Extrait les features du modèle d'une requête de prédiction"""
+    return {
+        "longitude": request.longitude,
+        "latitude": request.latitude,
+        "code_postal": request.code_postal,
+        "code_type_local": request.code_type_local,
+        "lot1_surface_carrez": request.lot1_surface_carrez,
+        "nombre_pieces_principales": request.nombre_pieces_principales
+    }
+
+
+def ajouter_features_derivees(df_input, features: List[str]):
+    """Calcule les features dérivées des coordonnées (DataFrame) si le modèle les utilise"""
+    if 'score_transport' in features and arbre_transport is not None:
+        from transport import scores_transport
+        
+        df_input['score_transport'] = scores_transport(
+            arbre_transport, df_input['latitude'], df_input['longitude']
+        )
+    return df_input
+
+
+def predire_lignes(etat, lignes: List[dict], endpoint: str = "/api/predict"):
+    """Prédiction ML brute (np.ndarray) d'un lot de lignes (dictionnaires de donnees_modele)"""
+    import pandas as pd
+    
+    with DUREE_ETAPES.mesurer(endpoint=endpoint, etape="dataframe"):
+        df_input = ajouter_features_derivees(pd.DataFrame(lignes), etat.features)
+    
+    # Vérifier les features manquantes
+    missing_features = set(etat.features) - set(df_input.columns)
+    if missing_features:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Features manquantes: {list(missing_features)}"
+        )
+    
+    # Réordonner selon le modèle
+    with DUREE_ETAPES.mesurer(endpoint=endpoint, etape="modele"):
+        return etat.modele.predict(df_input[etat.features])
+
+
+# Regroupement des appels concurrents à /api/predict : une seule prédiction
+# vectorisée par fenêtre de collecte (ou dès que le lot est plein)
+micro_lots = MicroLots(
+    predire_lignes,
+    fenetre_s=float(os.environ.get('MICRO_LOTS_FENETRE_MS', 2)) / 1000,
+    taille_max=int(os.environ.get('MICRO_LOTS_TAILLE_MAX', 64))
+)
+
+# Réponses de /api/predict déjà calculées (mêmes biens redemandés par les
+# pages d'annonces), invalidées quand le modèle ou le jeu de données change
+cache_predictions = CachePredictions(
+    taille_max=int(os.environ.get('CACHE_PREDICTIONS_TAILLE', 10_000)),
+    ttl=float(os.environ.get('CACHE_PREDICTIONS_TTL', 3600)),
+    precision=int(os.environ.get('CACHE_PREDICTIONS_PRECISION', 5))
+)
+
+
 @app.get("/")
 def root():
     """Point d'entrée de l'API"""
@@ -61,44 +262,97 @@ def root():
         "endpoints": {
             "geocode": "/api/geocode",
             "predict": "/api/predict",
+            "predict_batch": "/api/predict/batch",
+            "predict_stats": "/api/predict/stats",
+            "comparables": "/api/comparables",
             "features": "/api/features",
-            "health": "/api/health"
+            "health": "/api/health",
+            "live": "/api/health/live",
+            "ready": "/api/health/ready",
+            "metrics": "/metrics"
         }
     }
 
 
 @app.get("/api/health")
 def health_check():
-    """Vérification de l'état de l'API"""
+    """
+    Vérification de l'état de l'API : répond dès l'ouverture du port
+    (vivacité) ; "ready" indique si le modèle et les données sont chargés.
+    """
+    etat = modele_actif.courant()
+    indexes = [index for index in (index_historique, index_comparables) if index is not None]
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "features_count": len(features_list) if features_list else 0
+        "ready": est_pret(),
+        "startup": etat_demarrage(),
+        "model_loaded": etat is not None,
+        "model_version": etat.version if etat else None,
+        "model_load_duration_s": round(etat.duree_chargement_s, 4) if etat else None,
+        "model_loaded_at": etat.charge_le if etat else None,
+        "features_count": len(etat.features) if etat else 0,
+        "data_loaded": index_comparables is not None,
+        "data_memory_mb": round(sum(index.memoire_mo() for index in indexes), 2) if indexes else None,
+        "data_shared": bool(indexes) and all(index.projete for index in indexes)
+    }
+
+
+def etat_demarrage() -> dict:
+    return {
+        "complete": demarrage["termine"],
+        "uptime_s": round(time.time() - demarrage["debut"], 3),
+        "load_duration_s": demarrage["duree_s"],
+        "steps": dict(demarrage["etapes"])
     }
 
 
+@app.get("/api/health/live")
+def liveness():
+    """Vivacité : le processus répond (à utiliser pour redémarrer un worker bloqué)"""
+    return {"status": "alive"}
+
+
+@app.get("/api/health/ready")
+def readiness():
+    """
+    Disponibilité : 200 quand le modèle et les données sont chargés, 503
+    pendant le démarrage (à utiliser pour envoyer du trafic au worker)
+    """
+    pret = est_pret()
+    return JSONResponse(
+        status_code=200 if pret else 503,
+        content={"ready": pret, "startup": etat_demarrage()}
+    )
+
+
 @app.get("/api/features")
 def get_features():
     """Retourne la liste des features nécessaires"""
-    if not features_list:
+    verifier_demarrage()
+    etat = modele_actif.courant()
+    if etat is None:
         raise HTTPException(status_code=500, detail="Modèle non chargé")
     
     return {
         "success": True,
-        "features": features_list
+        "features": etat.features
     }
 
 
 @app.post("/api/geocode")
-def geocode(request: GeocodeRequest):
-    """Convertit une adresse en coordonnées GPS"""
+async def geocode(request: GeocodeRequest):
+    """Convertit une adresse en coordonnées GPS (sans bloquer la boucle d'événements)"""
     try:
-        coords = adresse_vers_coordonnees(
-            numero=request.numero,
-            rue=request.rue,
-            ville=request.ville,
-            pays=request.pays
-        )
+        # Géocodeur pas encore construit (démarrage en cours, ou échec au
+        # démarrage) : construction dans un thread, la boucle reste libre
+        geocodeur = geocodeur_async_par_defaut(creer=False) or await asyncio.to_thread(geocodeur_async_par_defaut)
+        with DUREE_ETAPES.mesurer(endpoint="/api/geocode", etape="geocodage"):
+            coords = await geocodeur.obtenir_coordonnees(
+                numero=request.numero,
+                rue=request.rue,
+                ville=request.ville,
+                pays=request.pays
+            )
         
         if coords:
             return {
@@ -111,6 +365,8 @@ def geocode(request: GeocodeRequest):
                 status_code=404,
                 detail="Adresse non trouvée"
             )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -119,41 +375,25 @@ def geocode(request: GeocodeRequest):
 
 
 @app.post("/api/predict")
-def predict(request: PredictionRequest):
-    """Prédit la valeur foncière d'un bien"""
-    if not model or not features_list:
+async def predict(request: PredictionRequest):
+    """
+    Prédit la valeur foncière d'un bien.
+    
+    La prédiction ML passe par le regroupeur micro_lots : les requêtes
+    concurrentes sont prédites ensemble, en un seul appel au modèle.
+    """
+    verifier_demarrage()
+    
+    # Un seul état (modèle, features) pour toute la requête, même si une
+    # nouvelle version est activée entre-temps
+    etat = modele_actif.courant()
+    if etat is None:
         raise HTTPException(
             status_code=500,
             detail="Modèle non disponible. Veuillez d'abord entraîner le modèle."
         )
     
     try:
-        # Créer un DataFrame avec les données
-        data = {
-            "longitude": request.longitude,
-            "latitude": request.latitude,
-            "code_postal": request.code_postal,
-            "code_type_local": request.code_type_local,
-            "lot1_surface_carrez": request.lot1_surface_carrez,
-            "nombre_pieces_principales": request.nombre_pieces_principales
-        }
-        
-        df_input = pd.DataFrame([data])
-        
-        # Vérifier les features manquantes
-        missing_features = set(features_list) - set(df_input.columns)
-        if missing_features:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Features manquantes: {list(missing_features)}"
-            )
-        
-        # Réordonner selon le modèle
-        df_input = df_input[features_list]
-        
-        # Prédiction ML brute
-        prediction_ml = model.predict(df_input)[0]
-        
         # Validation de l'état de rénovation
         if request.etat_renovation not in VALID_RENOVATION_STATES:
             raise HTTPException(
@@ -161,44 +401,40 @@ def predict(request: PredictionRequest):
                 detail=f"État de rénovation invalide. Valeurs acceptées: {VALID_RENOVATION_STATES}"
             )
         
+        # Réponse déjà calculée pour ce bien, ce modèle et ce jeu de données
+        with DUREE_ETAPES.mesurer(endpoint="/api/predict", etape="cache"):
+            requete = request.model_dump()
+            version_donnees = index_historique.signature() if index_historique is not None else None
+            reponse = cache_predictions.obtenir(etat.version, version_donnees, requete)
+        if reponse is not None:
+            return reponse
+        
+        # Prédiction ML brute (attente du micro-lot comprise)
+        with DUREE_ETAPES.mesurer(endpoint="/api/predict", etape="prediction"):
+            prediction_ml = await micro_lots.soumettre(etat, donnees_modele(request))
+        
         # Appliquer les corrections métier post-prédiction
-        prediction = adjust_price(
-            price_ml=prediction_ml,
-            ascenseur=request.ascenseur,
-            etat_renovation=request.etat_renovation
-        )
+        with DUREE_ETAPES.mesurer(endpoint="/api/predict", etape="ajustement"):
+            prediction = adjust_price(
+                price_ml=prediction_ml,
+                ascenseur=request.ascenseur,
+                etat_renovation=request.etat_renovation
+            )
         
         prix_m2 = prediction / request.lot1_surface_carrez
         
         # Récupérer l'historique des prix pour l'arrondissement
         price_history = []
-        if df_data is not None:
+        historique_complet = True
+        if index_historique is not None:
             try:
-                df_arrondissement = df_data[df_data['code_postal'] == request.code_postal].copy()
-                
-                if not df_arrondissement.empty and 'date_mutation' in df_arrondissement.columns:
-                    df_arrondissement['date_mutation'] = pd.to_datetime(df_arrondissement['date_mutation'], errors='coerce')
-                    df_arrondissement = df_arrondissement.dropna(subset=['date_mutation', 'prix_m_carrez'])
-                    df_arrondissement = df_arrondissement.sort_values('date_mutation')
-                    
-                    # Grouper par mois et calculer le prix moyen
-                    df_arrondissement['mois'] = df_arrondissement['date_mutation'].dt.to_period('M')
-                    prix_par_mois = df_arrondissement.groupby('mois')['prix_m_carrez'].mean()
-                    
-                    # Prendre les 12 derniers mois
-                    prix_par_mois = prix_par_mois.tail(12)
-                    
-                    price_history = [
-                        {
-                            "date": str(mois),
-                            "prix_m2": float(prix)
-                        }
-                        for mois, prix in prix_par_mois.items()
-                    ]
+                with DUREE_ETAPES.mesurer(endpoint="/api/predict", etape="historique"):
+                    price_history = index_historique.historique(request.code_postal)
             except Exception as e:
+                historique_complet = False
                 print(f"Erreur lors de la récupération de l'historique: {e}")
         
-        return {
+        reponse = {
             "success": True,
             "prediction": float(prediction),
             "prediction_formatted": f"{prediction:,.2f} €",
@@ -207,6 +443,10 @@ def predict(request: PredictionRequest):
             "price_history": price_history,
             "code_postal": request.code_postal
         }
+        # Une réponse sans historique (erreur) n'est pas mise en cache
+        if historique_complet:
+            cache_predictions.ajouter(etat.version, version_donnees, requete, reponse)
+        return reponse
         
     except HTTPException:
         raise
@@ -217,9 +457,211 @@ def predict(request: PredictionRequest):
         )
 
 
+
+@app.post("/api/predict/batch")
+def predict_batch(requests: List[Dict[str, Any]]):
+    """
+    Prédit la valeur foncière d'un lot de biens en un seul appel au modèle.
+    
+    Chaque élément est validé individuellement : un élément invalide renvoie
+    son erreur dans les résultats sans faire échouer le reste du lot.
+    L'historique des prix n'est pas inclus dans les réponses du lot.
+    """
+    import numpy as np
+    
+    verifier_demarrage()
+    etat = modele_actif.courant()
+    if etat is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Modèle non disponible. Veuillez d'abord entraîner le modèle."
+        )
+    
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux ({len(requests)} éléments, maximum {MAX_BATCH_SIZE})"
+        )
+    
+    results: List[Dict[str, Any]] = [None] * len(requests)
+    valides = []
+    
+    # Validation élément par élément
+    debut_validation = time.perf_counter()
+    for i, item in enumerate(requests):
+        try:
+            request = PredictionRequest(**item)
+        except ValidationError as e:
+            details = "; ".join(
+                f"{'.'.join(str(loc) for loc in erreur['loc'])}: {erreur['msg']}"
+                for erreur in e.errors()
+            )
+            results[i] = {"index": i, "success": False, "error": f"Requête invalide: {details}"}
+            continue
+        
+        if request.etat_renovation not in VALID_RENOVATION_STATES:
+            results[i] = {
+                "index": i,
+                "success": False,
+                "error": f"État de rénovation invalide. Valeurs acceptées: {VALID_RENOVATION_STATES}"
+            }
+            continue
+        
+        if request.lot1_surface_carrez <= 0:
+            results[i] = {"index": i, "success": False, "error": "La surface Carrez doit être strictement positive"}
+            continue
+        
+        valides.append((i, request))
+    DUREE_ETAPES.observer(time.perf_counter() - debut_validation, endpoint="/api/predict/batch", etape="validation")
+    
+    if valides:
+        try:
+            # Prédiction ML brute pour tout le lot, en une seule matrice de features
+            predictions_ml = predire_lignes(
+                etat, [donnees_modele(request) for _, request in valides], endpoint="/api/predict/batch"
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erreur lors de la prédiction: {str(e)}"
+            )
+        
+        # Appliquer les corrections métier post-prédiction sur tout le tableau
+        with DUREE_ETAPES.mesurer(endpoint="/api/predict/batch", etape="ajustement"):
+            ascenseurs = np.array([request.ascenseur for _, request in valides])
+            etats = np.array([request.etat_renovation for _, request in valides])
+            positifs = predictions_ml > 0
+            predictions = np.full(len(valides), np.nan)
+            predictions[positifs] = adjust_price_array(
+                predictions_ml[positifs],
+                ascenseur=ascenseurs[positifs],
+                etat_renovation=etats[positifs]
+            )
+        
+        for (i, request), prediction_ml, prediction in zip(valides, predictions_ml, predictions):
+            if prediction_ml <= 0:
+                results[i] = {
+                    "index": i,
+                    "success": False,
+                    "error": f"Le prix ML doit être strictement positif (reçu: {prediction_ml})"
+                }
+                continue
+            
+            prix_m2 = prediction / request.lot1_surface_carrez
+            results[i] = {
+                "index": i,
+                "success": True,
+                "prediction": float(prediction),
+                "prediction_formatted": f"{prediction:,.2f} €",
+                "prix_m2": float(prix_m2),
+                "prix_m2_formatted": f"{prix_m2:,.2f} €/m²",
+                "code_postal": request.code_postal
+            }
+    
+    nb_erreurs = sum(1 for result in results if not result["success"])
+    return {
+        "success": nb_erreurs == 0,
+        "count": len(results),
+        "errors": nb_erreurs,
+        "results": results
+    }
+
+
+@app.post("/api/comparables")
+def comparables(request: ComparablesRequest):
+    """
+    Transactions récentes les plus proches d'un bien : même type de bien,
+    surface à ± tolerance_surface, moins de nb_mois, triées par distance.
+    """
+    verifier_demarrage()
+    if index_comparables is None:
+        raise HTTPException(status_code=500, detail="Données des transactions non disponibles")
+    
+    if not 1 <= request.k <= MAX_COMPARABLES:
+        raise HTTPException(status_code=400, detail=f"k doit être compris entre 1 et {MAX_COMPARABLES}")
+    if request.lot1_surface_carrez <= 0:
+        raise HTTPException(status_code=400, detail="La surface Carrez doit être strictement positive")
+    if request.nb_mois <= 0 or not 0 <= request.tolerance_surface < 1:
+        raise HTTPException(
+            status_code=400,
+            detail="nb_mois doit être strictement positif et tolerance_surface comprise entre 0 et 1"
+        )
+    
+    with DUREE_ETAPES.mesurer(endpoint="/api/comparables", etape="recherche"):
+        transactions = index_comparables.rechercher(
+            latitude=request.latitude,
+            longitude=request.longitude,
+            code_type_local=request.code_type_local,
+            surface=request.lot1_surface_carrez,
+            k=request.k,
+            nb_mois=request.nb_mois,
+            tolerance_surface=request.tolerance_surface
+        )
+    
+    return {
+        "success": True,
+        "count": len(transactions),
+        "date_reference": str(index_comparables.date_reference),
+        "comparables": transactions
+    }
+
+
+@app.get("/api/predict/stats")
+def predict_stats():
+    """
+    Statistiques des prédictions : regroupement en micro-lots (taille des
+    lots, attente, débit) et cache des réponses (taux de hits, mémoire).
+    """
+    return {
+        "success": True,
+        "micro_lots": micro_lots.statistiques(),
+        "cache": cache_predictions.statistiques()
+    }
+
+
+def version_servie() -> dict:
+    etat = modele_actif.courant()
+    return {(etat.version,): 1} if etat is not None else {}
+
+
+# Valeurs instantanées lues à chaque exposition de /metrics
+metriques.jauge("api_modele_info", "Version du modèle servi", version_servie, ["version"])
+metriques.jauge(
+    "api_cache_predictions_entrees", "Nombre de réponses dans le cache de prédictions",
+    lambda: len(cache_predictions.memoire)
+)
+metriques.jauge(
+    "api_cache_predictions_requetes_total", "Accès au cache de prédictions par résultat",
+    lambda: {("hit",): cache_predictions.memoire.hits, ("miss",): cache_predictions.memoire.misses},
+    ["resultat"], type="counter"
+)
+metriques.jauge(
+    "api_micro_lots_taille_moyenne", "Taille moyenne des micro-lots de /api/predict",
+    lambda: micro_lots.statistiques()["taille_moyenne_lot"]
+)
+
+
+@app.get("/metrics")
+def metrics():
+    """Métriques au format texte de Prometheus"""
+    return Response(content=metriques.exposer(), media_type=TYPE_CONTENU)
+
+
 if __name__ == "__main__":
-    # Vérifier l'existence du modèle
-    if not os.path.exists('Training_set/best_model.pkl'):
+    import uvicorn
+    
+    nb_workers = int(os.environ.get('API_WORKERS', 1))
+    if nb_workers > 1:
+        # Préchargement : ce processus valide (ou reconstruit) l'artefact du
+        # modèle et les index avant de lancer les workers, qui les projettent
+        # en mémoire sans rien recalculer et partagent leurs pages.
+        charger_ressources()
+    
+    # Vérifier l'existence du modèle (sauf chargement différé : /api/health/ready
+    # signale alors un modèle absent)
+    if demarrage["termine"] and modele_actif.courant() is None:
         print("\n" + "="*60)
         print("⚠️  ERREUR: Le modèle n'existe pas")
         print("="*60)
@@ -236,10 +678,20 @@ if __name__ == "__main__":
     print("Documentation interactive: http://127.0.0.1:8000/docs")
     print("\nEndpoints disponibles:")
     print("  • GET  /api/health   - État de l'API")
+    print("  • GET  /api/health/live  - Vivacité du processus")
+    print("  • GET  /api/health/ready - Modèle et données chargés (503 pendant le démarrage)")
     print("  • GET  /api/features - Liste des features")
     print("  • POST /api/geocode  - Géolocalisation")
     print("  • POST /api/predict  - Prédiction")
+    print("  • POST /api/predict/batch - Prédiction par lot")
+    print("  • GET  /api/predict/stats - Statistiques des micro-lots et du cache")
+    print("  • POST /api/comparables - Transactions comparables")
+    print("  • GET  /metrics      - Métriques Prometheus")
     print("\nAppuyez sur Ctrl+C pour arrêter.")
     print("="*60 + "\n")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    if nb_workers > 1:
+        # Équivalent gunicorn : gunicorn -k uvicorn.workers.UvicornWorker --preload api_server:app
+        uvicorn.run("api_server:app", host="0.0.0.0", port=8000, log_level="info", workers=nb_workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
@@ -1,15 +1,15 @@
 from flask import Flask, render_template, request, jsonify
 import pandas as pd
 import numpy as np
-import joblib
 from adresse import adresse_vers_coordonnees
+from inference import DOSSIER_MODELE
+from registre import charger_modele_courant
 import os
 
 app = Flask(__name__)
 
 # Charger le modèle et les features
-model = joblib.load('Training_set/best_model.pkl')
-features_list = joblib.load('Training_set/model_features.pkl')
+model, features_list, version_modele = charger_modele_courant()
 
 
 @app.route('/')
@@ -102,13 +102,13 @@ def get_features():
 
 if __name__ == '__main__':
     # Vérifier que les fichiers du modèle existent
-    if not os.path.exists('Training_set/best_model.pkl'):
-        print("ERREUR: Le fichier 'Training_set/best_model.pkl' n'existe pas.")
+    if not os.path.exists(os.path.join(DOSSIER_MODELE, 'best_model.pkl')):
+        print(f"ERREUR: Le fichier '{os.path.join(DOSSIER_MODELE, 'best_model.pkl')}' n'existe pas.")
         print("Veuillez d'abord entraîner le modèle avec model/model.py")
         exit(1)
     
-    if not os.path.exists('Training_set/model_features.pkl'):
-        print("ERREUR: Le fichier 'Training_set/model_features.pkl' n'existe pas.")
+    if not os.path.exists(os.path.join(DOSSIER_MODELE, 'model_features.pkl')):
+        print(f"ERREUR: Le fichier '{os.path.join(DOSSIER_MODELE, 'model_features.pkl')}' n'existe pas.")
         print("Veuillez d'abord entraîner le modèle avec model/model.py")
         exit(1)
     
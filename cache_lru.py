@@ -0,0 +1,93 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+_ABSENT = object()
+
+
+def taille_objet(objet: Any) -> int:
+    """Taille mémoire approximative (octets) d'un objet et de son contenu (dict, list, tuple)"""
+    taille = sys.getsizeof(objet)
+    if isinstance(objet, dict):
+        taille += sum(taille_objet(cle) + taille_objet(valeur) for cle, valeur in objet.items())
+    elif isinstance(objet, (list, tuple)):
+        taille += sum(taille_objet(element) for element in objet)
+    return taille
+
+
+class CacheLRU:
+    """
+    Cache en mémoire borné, avec éviction LRU (moins récemment utilisé)
+    et expiration optionnelle des entrées (TTL en secondes).
+
+    Thread-safe : les handlers synchrones de FastAPI tournent dans un pool de threads.
+    """
+
+    def __init__(self, taille_max: int = 1024, ttl: Optional[float] = None):
+        if taille_max <= 0:
+            raise ValueError(f"La taille maximale doit être strictement positive (reçu: {taille_max})")
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obtenir(self, cle: Hashable, defaut: Any = None) -> Any:
+        """Retourne la valeur associée à cle, ou defaut si absente ou expirée."""
+        with self._verrou:
+            entree = self._entrees.get(cle, _ABSENT)
+            if entree is _ABSENT:
+                self.misses += 1
+                return defaut
+
+            valeur, expiration = entree
+            if expiration is not None and expiration <= time.monotonic():
+                del self._entrees[cle]
+                self.misses += 1
+                return defaut
+
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return valeur
+
+    def ajouter(self, cle: Hashable, valeur: Any, ttl: Optional[float] = None) -> None:
+        """Ajoute (ou remplace) une entrée, en évinçant la plus ancienne si le cache est plein."""
+        ttl = self.ttl if ttl is None else ttl
+        expiration = time.monotonic() + ttl if ttl is not None else None
+        with self._verrou:
+            self._entrees[cle] = (valeur, expiration)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    def vider(self) -> None:
+        with self._verrou:
+            self._entrees.clear()
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def taille_memoire(self) -> int:
+        """Mémoire approximative occupée par les clés et valeurs (octets), en O(taille du cache)"""
+        with self._verrou:
+            entrees = list(self._entrees.items())
+        return sys.getsizeof(self._entrees) + sum(
+            taille_objet(cle) + taille_objet(valeur) for cle, (valeur, _) in entrees
+        )
+
+    def statistiques(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "taille": len(self._entrees),
+            "taille_max": self.taille_max,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "taux_hits": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,74 @@
+import threading
+from typing import Any, Hashable, Optional, Tuple
+
+from cache_lru import CacheLRU
+
+
+# Précision des coordonnées dans la clé : 5 décimales ≈ 1 m
+PRECISION_COORDONNEES = 5
+TTL_PREDICTIONS = 3600  # 1 heure
+
+
+def cle_requete(requete: dict, precision: int = PRECISION_COORDONNEES) -> Tuple:
+    """
+    Forme canonique d'une requête de prédiction : champs triés par nom,
+    coordonnées arrondies, types normalisés (75011 et 75011.0 donnent la
+    même clé).
+
+    Exemple:
+        >>> cle_requete({"latitude": 48.861234, "longitude": 2.370001, "code_postal": 75011}, 3)
+        (('code_postal', 75011), ('latitude', 48.861), ('longitude', 2.37))
+    """
+    canonique = []
+    for champ, valeur in sorted(requete.items()):
+        if champ in ('longitude', 'latitude'):
+            valeur = round(float(valeur), precision)
+        elif isinstance(valeur, float) and valeur.is_integer():
+            valeur = int(valeur)
+        canonique.append((champ, valeur))
+    return tuple(canonique)
+
+
+class CachePredictions:
+    """
+    Cache des réponses de /api/predict, indexé par la version du modèle, la
+    signature du jeu de données (historique des prix) et la requête
+    canonique.
+
+    Quand le modèle ou le jeu de données change, le cache est vidé au premier
+    accès suivant : les anciennes réponses ne peuvent plus être servies, et
+    la mémoire est libérée sans attendre l'expiration des entrées.
+    """
+
+    def __init__(self, taille_max: int = 10_000, ttl: Optional[float] = TTL_PREDICTIONS,
+                 precision: int = PRECISION_COORDONNEES):
+        self.precision = precision
+        self.memoire = CacheLRU(taille_max=taille_max, ttl=ttl)
+        self.invalidations = 0
+        self._generation = None
+        self._verrou = threading.Lock()
+
+    def _cle(self, version_modele: Hashable, version_donnees: Hashable, requete: dict) -> Tuple:
+        generation = (version_modele, version_donnees)
+        with self._verrou:
+            if generation != self._generation:
+                if self._generation is not None:
+                    self.memoire.vider()
+                    self.invalidations += 1
+                self._generation = generation
+        return generation + (cle_requete(requete, self.precision),)
+
+    def obtenir(self, version_modele: Hashable, version_donnees: Hashable, requete: dict) -> Optional[Any]:
+        return self.memoire.obtenir(self._cle(version_modele, version_donnees, requete))
+
+    def ajouter(self, version_modele: Hashable, version_donnees: Hashable, requete: dict, reponse: Any) -> None:
+        self.memoire.ajouter(self._cle(version_modele, version_donnees, requete), reponse)
+
+    def statistiques(self) -> dict:
+        return {
+            **self.memoire.statistiques(),
+            "ttl_s": self.memoire.ttl,
+            "precision_coordonnees": self.precision,
+            "invalidations": self.invalidations,
+            "memoire_octets": self.memoire.taille_memoire()
+        }
@@ -0,0 +1,218 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from donnees import CHEMIN_CSV, CHEMIN_PARQUET, RACINE, charger_donnees, chemin_source, compacter, signature_source
+from parametres_comparables import NB_COMPARABLES, NB_MOIS_COMPARABLES, TOLERANCE_SURFACE
+from transport import RAYON_TERRE_KM
+
+
+CHEMIN_INDEX = os.path.join(RACINE, 'DATA', 'comparables.joblib')
+FORMAT_INDEX = 1
+
+
+COLONNES_COMPARABLES = [
+    'date_mutation', 'valeur_fonciere', 'longitude', 'latitude', 'code_postal',
+    'code_type_local', 'lot1_surface_carrez', 'nombre_pieces_principales', 'prix_m_carrez',
+]
+
+# Nombre de voisins demandés au BallTree par comparable attendu ; doublé tant
+# que les filtres date/surface en laissent moins de k
+FACTEUR_CANDIDATS = 8
+# Au-delà (filtres très sélectifs), les filtres sont appliqués d'abord à
+# toutes les transactions et les distances calculées sur les seules retenues
+MAX_CANDIDATS_ARBRE = 4096
+
+
+class IndexComparables:
+    """
+    Transactions comparables (k plus proches voisins) autour d'un point.
+
+    Un BallTree (distance haversine, comme pour les stations de métro dans
+    transport.py) est construit une fois par code_type_local : le filtre
+    sur le type de bien ne coûte rien. Les voisins sont ensuite filtrés sur
+    la date et la surface à partir de tableaux NumPy ; si trop peu passent
+    les filtres, la recherche est relancée avec deux fois plus de candidats.
+
+    Les transactions « récentes » sont celles des nb_mois précédant la
+    mutation la plus récente du jeu de données (et non la date du jour).
+
+    Les arbres et tableaux sont sauvegardés dans DATA/comparables.joblib et
+    rechargés projetés en mémoire (mmap) : les workers de l'API qui
+    démarrent après le premier partagent les mêmes pages physiques au lieu
+    de relire le jeu de données et de reconstruire chacun leur index.
+    """
+
+    def __init__(self, chemin_parquet=CHEMIN_PARQUET, chemin_csv=CHEMIN_CSV, chemin_index=CHEMIN_INDEX):
+        self.chemin_parquet = chemin_parquet
+        self.chemin_csv = chemin_csv
+        self.chemin_index = chemin_index
+        self._arbres = {}
+        self._colonnes = {}
+        self.date_reference = None
+        self.projete = False
+
+    def charger(self, df=None, mmap=True):
+        """
+        Projette en mémoire l'index sauvegardé s'il correspond au fichier de
+        données, sinon le construit (à partir de df si fourni, sinon des
+        seules colonnes utiles, en types compacts) et le sauvegarde.
+        """
+        signature = signature_source(chemin_source(self.chemin_parquet, self.chemin_csv))
+
+        if os.path.exists(self.chemin_index):
+            try:
+                artefact = joblib.load(self.chemin_index, mmap_mode='r' if mmap else None)
+                if artefact['format'] == FORMAT_INDEX and artefact['signature'] == signature:
+                    self._installer(artefact, projete=mmap)
+                    return self
+            except Exception as e:
+                print(f"Index des comparables illisible, reconstruction: {e}")
+
+        if df is None:
+            df = compacter(charger_donnees(colonnes=COLONNES_COMPARABLES,
+                                           chemin_parquet=self.chemin_parquet, chemin_csv=self.chemin_csv))
+        self.construire(df)
+
+        # Écriture à côté puis remplacement atomique : plusieurs workers peuvent
+        # reconstruire en même temps sans qu'aucun ne lise un fichier partiel
+        chemin_tmp = f"{self.chemin_index}.{os.getpid()}.tmp"
+        joblib.dump({
+            'format': FORMAT_INDEX,
+            'signature': signature,
+            'arbres': self._arbres,
+            'colonnes': self._colonnes,
+            'date_reference': self.date_reference,
+        }, chemin_tmp)
+        os.replace(chemin_tmp, self.chemin_index)
+        if mmap:
+            self._installer(joblib.load(self.chemin_index, mmap_mode='r'), projete=True)
+        return self
+
+    def construire(self, df):
+        """
+        Construit les index en mémoire à partir du jeu de données nettoyé.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Doit contenir les colonnes de COLONNES_COMPARABLES
+        """
+        # Import différé (comme dans transport.py) : importer ce module ne
+        # charge pas scikit-learn ; un index projeté l'importe au dépickling
+        from sklearn.neighbors import BallTree
+
+        df = df[COLONNES_COMPARABLES].assign(
+            date_mutation=pd.to_datetime(df['date_mutation'], errors='coerce')
+        ).dropna(subset=['latitude', 'longitude', 'code_type_local', 'lot1_surface_carrez', 'date_mutation'])
+        date_reference = df['date_mutation'].max()
+
+        arbres, colonnes = {}, {}
+        for code_type_local, groupe in df.groupby('code_type_local'):
+            arbres[int(code_type_local)] = BallTree(
+                np.radians(groupe[['latitude', 'longitude']].to_numpy(dtype=np.float64)), metric='haversine'
+            )
+            # Tableaux float32 (entiers exacts, NaN pour les valeurs manquantes) : les
+            # distances sont calculées par le BallTree, qui garde sa propre copie float64
+            colonnes[int(code_type_local)] = {
+                'date_mutation': groupe['date_mutation'].to_numpy().astype('datetime64[D]'),
+                **{
+                    colonne: groupe[colonne].to_numpy(dtype=np.float32, na_value=np.nan)
+                    for colonne in ['valeur_fonciere', 'longitude', 'latitude', 'code_postal',
+                                    'lot1_surface_carrez', 'nombre_pieces_principales', 'prix_m_carrez']
+                },
+            }
+
+        self._arbres, self._colonnes = arbres, colonnes
+        self.date_reference = np.datetime64(date_reference, 'D') if len(df) else None
+        self.projete = False
+        return self
+
+    def _installer(self, artefact, projete):
+        self._arbres = artefact['arbres']
+        self._colonnes = artefact['colonnes']
+        self.date_reference = artefact['date_reference']
+        self.projete = projete
+
+    def __len__(self):
+        return sum(len(colonnes['latitude']) for colonnes in self._colonnes.values())
+
+    def memoire_mo(self):
+        """Taille des tableaux de l'index (Mo), partagés entre workers s'il est projeté"""
+        octets = sum(tableau.nbytes for colonnes in self._colonnes.values() for tableau in colonnes.values())
+        octets += sum(np.asarray(arbre.data).nbytes for arbre in self._arbres.values())
+        return octets / 1024 ** 2
+
+    def rechercher(self, latitude, longitude, code_type_local, surface, k=NB_COMPARABLES,
+                   nb_mois=NB_MOIS_COMPARABLES, tolerance_surface=TOLERANCE_SURFACE):
+        """
+        Les k transactions les plus proches du point, de même type de bien,
+        de surface comprise dans [surface × (1 - tolérance), surface × (1 + tolérance)]
+        et datant de moins de nb_mois.
+
+        Returns:
+        --------
+        list[dict] : transactions triées par distance croissante (distance_m)
+        """
+        arbre = self._arbres.get(int(code_type_local))
+        if arbre is None or k <= 0:
+            return []
+        colonnes = self._colonnes[int(code_type_local)]
+        n = len(colonnes['latitude'])
+
+        date_min = self.date_reference - np.timedelta64(int(round(nb_mois * 30.4375)), 'D')
+        surface_min, surface_max = surface * (1 - tolerance_surface), surface * (1 + tolerance_surface)
+
+        def filtre(indices):
+            return (
+                (colonnes['date_mutation'][indices] >= date_min)
+                & (colonnes['lot1_surface_carrez'][indices] >= surface_min)
+                & (colonnes['lot1_surface_carrez'][indices] <= surface_max)
+            )
+
+        point = np.radians([[latitude, longitude]])
+        nb_candidats = min(n, k * FACTEUR_CANDIDATS)
+        while nb_candidats <= MAX_CANDIDATS_ARBRE:
+            distances, indices = arbre.query(point, k=nb_candidats)
+            distances, indices = distances[0], indices[0]
+            garder = filtre(indices)
+            if garder.sum() >= k or nb_candidats == n:
+                distances, indices = distances[garder][:k], indices[garder][:k]
+                break
+            nb_candidats = min(n, nb_candidats * 2)
+        else:
+            indices = np.flatnonzero(filtre(slice(None)))
+            distances = _distances_haversine(
+                point[0], np.radians(colonnes['latitude'][indices]), np.radians(colonnes['longitude'][indices])
+            )
+            plus_proches = np.argsort(distances, kind='stable')[:k]
+            distances, indices = distances[plus_proches], indices[plus_proches]
+
+        # Arrondis à la précision des tableaux float32 (pas de décimales parasites dans le JSON)
+        return [
+            {
+                "date_mutation": str(colonnes['date_mutation'][i]),
+                "valeur_fonciere": round(float(colonnes['valeur_fonciere'][i]), 2),
+                "prix_m2": round(float(colonnes['prix_m_carrez'][i]), 2),
+                "lot1_surface_carrez": round(float(colonnes['lot1_surface_carrez'][i]), 2),
+                "nombre_pieces_principales": _entier(colonnes['nombre_pieces_principales'][i]),
+                "code_postal": _entier(colonnes['code_postal'][i]),
+                "longitude": round(float(colonnes['longitude'][i]), 6),
+                "latitude": round(float(colonnes['latitude'][i]), 6),
+                "distance_m": round(float(distance * RAYON_TERRE_KM * 1000), 1),
+            }
+            for i, distance in zip(indices, distances)
+        ]
+
+
+def _distances_haversine(point, latitudes, longitudes):
+    """Distances angulaires (radians) entre un point (lat, lon) et des tableaux de coordonnées en radians"""
+    a = (np.sin((latitudes - point[0]) / 2) ** 2
+         + np.cos(point[0]) * np.cos(latitudes) * np.sin((longitudes - point[1]) / 2) ** 2)
+    return 2 * np.arcsin(np.sqrt(a))
+
+
+def _entier(valeur):
+    return None if np.isnan(valeur) else int(valeur)
@@ -0,0 +1,247 @@
+import os
+import shutil
+
+
+# Chemins ancrés sur la racine du dépôt. pandas et pyarrow ne sont importés
+# que par les fonctions qui lisent ou écrivent les données : importer ce
+# module pour ses chemins reste léger (démarrage de l'API).
+RACINE = os.path.dirname(os.path.abspath(__file__))
+CHEMIN_PARQUET = os.path.join(RACINE, 'DATA', 'donnees_immobilieres.parquet')
+CHEMIN_CSV = os.path.join(RACINE, 'DATA', 'donnees_immobilieres.csv')
+DOSSIER_MODELE = os.path.join(RACINE, 'Training_set')
+
+# Ordre des colonnes du jeu de données nettoyé (identique au CSV historique)
+COLONNES_DONNEES = [
+    "date_mutation",
+    "valeur_fonciere",
+    "longitude",
+    "latitude",
+    "code_postal",
+    "code_type_local",
+    "nom_commune",
+    "lot1_surface_carrez",
+    "nombre_pieces_principales",
+    "type_local",
+    "nature_mutation",
+    "prix_m_carrez",
+    "score_transport",
+    "prix_m_carrez_arr",
+]
+
+# Types compacts du jeu de données gardé en mémoire par l'API : entiers et
+# flottants 32 bits (ou moins), chaînes répétées en catégories
+TYPES_COMPACTS = {
+    'valeur_fonciere': 'float32',
+    'longitude': 'float32',
+    'latitude': 'float32',
+    'code_postal': 'int32',
+    'code_type_local': 'int8',
+    'nom_commune': 'category',
+    'lot1_surface_carrez': 'float32',
+    'nombre_pieces_principales': 'int16',
+    'type_local': 'category',
+    'nature_mutation': 'category',
+    'prix_m_carrez': 'float32',
+    'score_transport': 'float32',
+    'prix_m_carrez_arr': 'float32',
+}
+
+# Le dataset Parquet est partitionné par code postal et année de mutation
+COLONNES_PARTITION = ['code_postal', 'annee']
+
+
+def _partitionnement():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(
+        pa.schema([('code_postal', pa.int64()), ('annee', pa.int32())]),
+        flavor='hive'
+    )
+
+
+def chemin_source(chemin_parquet=CHEMIN_PARQUET, chemin_csv=CHEMIN_CSV):
+    """Chemin du jeu de données utilisé par charger_donnees (Parquet si disponible)."""
+    return chemin_parquet if os.path.isdir(chemin_parquet) else chemin_csv
+
+
+def signature_source(chemin):
+    """
+    Signature légère d'un fichier ou d'un dataset Parquet (dates de modification
+    + tailles). Sert à détecter qu'un artefact dérivé n'est plus à jour.
+    """
+    if not os.path.isdir(chemin):
+        stat = os.stat(chemin)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    mtime_max, taille, nb_fichiers = 0, 0, 0
+    for dossier, _, fichiers in os.walk(chemin):
+        for fichier in fichiers:
+            stat = os.stat(os.path.join(dossier, fichier))
+            mtime_max = max(mtime_max, stat.st_mtime_ns)
+            taille += stat.st_size
+            nb_fichiers += 1
+    return (mtime_max, taille, nb_fichiers)
+
+
+def ecrire_parquet(df, chemin=CHEMIN_PARQUET, ajout=False, prefixe='part'):
+    """
+    Écrit le jeu de données nettoyé en Parquet, partitionné par code postal et année.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Jeu de données nettoyé (date_mutation en datetime)
+    ajout : bool
+        Si False, le dataset existant est remplacé ; sinon les fichiers sont ajoutés
+        (écriture incrémentale, un préfixe distinct par appel)
+    prefixe : str
+        Préfixe des fichiers écrits, pour un ordre de lecture déterministe
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not ajout and os.path.isdir(chemin):
+        shutil.rmtree(chemin)
+
+    df = df.assign(annee=pd.to_datetime(df['date_mutation']).dt.year.astype('Int32'))
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        chemin,
+        partitioning=_partitionnement(),
+        basename_template=f"{prefixe}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+
+def enregistrer_donnees(df, chemin_parquet=CHEMIN_PARQUET, chemin_csv=CHEMIN_CSV):
+    """
+    Réécrit le jeu de données nettoyé là où charger_donnees le lit : le
+    dataset Parquet s'il existe (remplacé), sinon le CSV historique.
+    """
+    if os.path.isdir(chemin_parquet):
+        import pandas as pd
+
+        df = df.assign(date_mutation=pd.to_datetime(df['date_mutation'], errors='coerce'))
+        ecrire_parquet(df, chemin_parquet)
+    else:
+        df.to_csv(chemin_csv, index=False, encoding='utf-8')
+
+
+def exporter_csv(chemin_parquet=CHEMIN_PARQUET, chemin_csv=CHEMIN_CSV):
+    """Export CSV du dataset Parquet (format historique DATA/donnees_immobilieres.csv)."""
+    charger_donnees(chemin_parquet=chemin_parquet).to_csv(chemin_csv, index=False, encoding='utf-8')
+
+
+def _appliquer_filtres(df, filtres):
+    operations = {
+        '=': lambda s, v: s == v,
+        '==': lambda s, v: s == v,
+        '!=': lambda s, v: s != v,
+        '<': lambda s, v: s < v,
+        '<=': lambda s, v: s <= v,
+        '>': lambda s, v: s > v,
+        '>=': lambda s, v: s >= v,
+        'in': lambda s, v: s.isin(v),
+        'not in': lambda s, v: ~s.isin(v),
+    }
+    for colonne, operation, valeur in filtres:
+        df = df[operations[operation](df[colonne], valeur).fillna(False).astype(bool)]
+    return df
+
+
+def _charger_csv(chemin_csv, colonnes, filtres):
+    import pandas as pd
+
+    colonnes_filtres = {colonne for colonne, _, _ in filtres or []}
+    usecols = None
+    if colonnes is not None:
+        usecols = list(dict.fromkeys(list(colonnes) + sorted(colonnes_filtres)))
+        if 'annee' in usecols:
+            usecols = list(dict.fromkeys([c for c in usecols if c != 'annee'] + ['date_mutation']))
+
+    df = pd.read_csv(chemin_csv, usecols=usecols)
+    if 'date_mutation' in df.columns:
+        df['date_mutation'] = pd.to_datetime(df['date_mutation'], errors='coerce')
+    if (colonnes is not None and 'annee' in colonnes) or 'annee' in colonnes_filtres:
+        df['annee'] = df['date_mutation'].dt.year.astype('Int32')
+    if filtres:
+        df = _appliquer_filtres(df, filtres)
+    return df
+
+
+def charger_donnees(colonnes=None, filtres=None, chemin_parquet=CHEMIN_PARQUET,
+                    chemin_csv=CHEMIN_CSV, trier=True):
+    """
+    Chargeur commun du jeu de données nettoyé.
+
+    Lit le dataset Parquet s'il existe (sinon le CSV historique) en ne chargeant
+    que les colonnes demandées ; les filtres portant sur code_postal et annee
+    éliminent des partitions entières sans les lire.
+
+    Parameters:
+    -----------
+    colonnes : list ou None
+        Colonnes à charger (toutes par défaut, sans la colonne de partition annee)
+    filtres : list ou None
+        Filtres au format [(colonne, opérateur, valeur), ...], par exemple
+        [('code_postal', '=', 75011), ('annee', '>=', 2023)]
+    trier : bool
+        Remet les lignes dans l'ordre chronologique (tri stable sur date_mutation)
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    if os.path.isdir(chemin_parquet):
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        dataset = ds.dataset(chemin_parquet, format='parquet', partitioning=_partitionnement())
+        filtre = pq.filters_to_expression(filtres) if filtres else None
+        df = dataset.to_table(columns=colonnes, filter=filtre).to_pandas()
+    else:
+        df = _charger_csv(chemin_csv, colonnes, filtres)
+
+    if colonnes is None:
+        ordre = [c for c in COLONNES_DONNEES if c in df.columns]
+        ordre += [c for c in df.columns if c not in ordre and c != 'annee']
+    else:
+        ordre = list(colonnes)
+    df = df[ordre]
+
+    if trier and 'date_mutation' in df.columns:
+        df = df.sort_values('date_mutation', kind='stable')
+    return df.reset_index(drop=True)
+
+
+def compacter(df):
+    """
+    Convertit le jeu de données dans les types de TYPES_COMPACTS (dates en
+    datetime64). Une colonne entière contenant des valeurs manquantes passe
+    dans le type entier nullable correspondant (Int32...).
+
+    Returns:
+    --------
+    pd.DataFrame : nouveau DataFrame, df n'est pas modifié
+    """
+    import pandas as pd
+
+    types = {}
+    for colonne, type_compact in TYPES_COMPACTS.items():
+        if colonne not in df.columns:
+            continue
+        if type_compact.startswith('int') and df[colonne].isna().any():
+            type_compact = type_compact.capitalize()
+        types[colonne] = type_compact
+
+    df = df.astype(types)
+    if 'date_mutation' in df.columns:
+        df['date_mutation'] = pd.to_datetime(df['date_mutation'], errors='coerce')
+    return df
+
+
+def memoire_mo(df):
+    """Mémoire occupée par un DataFrame (Mo), chaînes et catégories comprises"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
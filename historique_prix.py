@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from donnees import CHEMIN_CSV, CHEMIN_PARQUET, RACINE, charger_donnees, chemin_source, signature_source
+
+
+CHEMIN_INDEX = os.path.join(RACINE, 'DATA', 'historique_prix.pkl')
+FORMAT_INDEX = 2
+NB_MOIS_HISTORIQUE = 12
+COLONNES_HISTORIQUE = ['code_postal', 'date_mutation', 'prix_m_carrez']
+
+
+def construire_index(df, nb_mois=NB_MOIS_HISTORIQUE):
+    """
+    Calcule le prix moyen au m² (Carrez) par mois et par code postal.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Doit contenir les colonnes code_postal, date_mutation et prix_m_carrez
+    nb_mois : int
+        Nombre de mois conservés par code postal (les plus récents)
+
+    Returns:
+    --------
+    dict : tableaux NumPy triés par (code_postal, mois)
+        - codes : codes postaux distincts (int64)
+        - debuts : position du premier mois de chaque code postal, suivie du
+          nombre total de mois (les mois de codes[i] sont debuts[i]:debuts[i + 1])
+        - mois : datetime64[M]
+        - prix : prix moyen au m² (float64)
+    """
+    df_hist = df[COLONNES_HISTORIQUE].copy()
+    df_hist['date_mutation'] = pd.to_datetime(df_hist['date_mutation'], errors='coerce')
+    # Moyennes calculées en float64 même si le jeu de données est compacté (float32)
+    df_hist['prix_m_carrez'] = df_hist['prix_m_carrez'].astype('float64')
+    df_hist = df_hist.dropna(subset=['code_postal', 'date_mutation', 'prix_m_carrez'])
+    df_hist['mois'] = df_hist['date_mutation'].dt.to_period('M')
+
+    # Une seule agrégation pour tous les codes postaux, triée par (code_postal, mois)
+    prix_par_mois = df_hist.groupby(['code_postal', 'mois'])['prix_m_carrez'].mean()
+    prix_par_mois = prix_par_mois.groupby(level='code_postal').tail(nb_mois)
+
+    codes_lignes = prix_par_mois.index.get_level_values('code_postal').to_numpy(dtype=np.int64)
+    codes, debuts = np.unique(codes_lignes, return_index=True)
+    mois = prix_par_mois.index.get_level_values('mois').astype(str).to_numpy().astype('datetime64[M]')
+
+    return {
+        'codes': codes,
+        'debuts': np.append(debuts, len(codes_lignes)).astype(np.int64),
+        'mois': mois,
+        'prix': prix_par_mois.to_numpy(dtype=np.float64),
+    }
+
+
+class IndexHistoriquePrix:
+    """
+    Index de l'historique des prix par code postal, calculé une seule fois
+    (ou rechargé depuis DATA/historique_prix.pkl) puis interrogé par
+    recherche dichotomique sur les codes postaux.
+
+    L'index est fait de tableaux NumPy (voir construire_index), rechargés
+    projetés en mémoire (mmap) : comme l'index des comparables, ses pages
+    sont partagées entre les workers de l'API.
+
+    L'index est reconstruit en arrière-plan lorsque le jeu de données change.
+    """
+
+    def __init__(self, chemin_parquet=CHEMIN_PARQUET, chemin_csv=CHEMIN_CSV, chemin_index=CHEMIN_INDEX,
+                 nb_mois=NB_MOIS_HISTORIQUE, intervalle_verification=30.0):
+        self.chemin_parquet = chemin_parquet
+        self.chemin_csv = chemin_csv
+        self.chemin_index = chemin_index
+        self.nb_mois = nb_mois
+        self.intervalle_verification = intervalle_verification
+        self._index = construire_index(pd.DataFrame(columns=COLONNES_HISTORIQUE))
+        self._signature = None
+        self.mmap = True
+        self.projete = False
+        self._derniere_verification = 0.0
+        self._verrou = threading.Lock()
+        self._reconstruction_en_cours = False
+
+    def charger(self, df=None, mmap=True):
+        """
+        Projette en mémoire l'index précalculé s'il correspond au fichier de
+        données, sinon le reconstruit (à partir de df si fourni) et le sauvegarde.
+        """
+        self.mmap = mmap
+        signature = signature_source(self._chemin_source())
+
+        if os.path.exists(self.chemin_index):
+            try:
+                artefact = joblib.load(self.chemin_index, mmap_mode='r' if mmap else None)
+                if (artefact.get('format') == FORMAT_INDEX and artefact['signature'] == signature
+                        and artefact['nb_mois'] == self.nb_mois):
+                    self._installer(artefact['index'], signature, projete=mmap)
+                    return self
+            except Exception as e:
+                print(f"Index d'historique illisible, reconstruction: {e}")
+
+        self._reconstruire(signature, df)
+        return self
+
+    def historique(self, code_postal):
+        """
+        Retourne l'historique des prix (12 derniers mois) pour un code postal.
+        """
+        self._verifier_source()
+        index = self._index
+        i = np.searchsorted(index['codes'], int(code_postal))
+        if i == len(index['codes']) or index['codes'][i] != int(code_postal):
+            return []
+        debut, fin = index['debuts'][i], index['debuts'][i + 1]
+        return [
+            {"date": str(mois), "prix_m2": float(prix)}
+            for mois, prix in zip(index['mois'][debut:fin], index['prix'][debut:fin])
+        ]
+
+    def __len__(self):
+        return len(self._index['codes'])
+
+    def memoire_mo(self):
+        """Taille des tableaux de l'index (Mo), partagés entre workers s'il est projeté"""
+        return sum(tableau.nbytes for tableau in self._index.values()) / 1024 ** 2
+
+    def signature(self):
+        """
+        Signature du jeu de données dont est issu l'index servi (vérifie au
+        passage si la source a changé, comme historique()).
+        """
+        self._verifier_source()
+        return self._signature
+
+    def _chemin_source(self):
+        return chemin_source(self.chemin_parquet, self.chemin_csv)
+
+    def _installer(self, index, signature, projete=False):
+        self._index = index
+        self._signature = signature
+        self.projete = projete
+        self._derniere_verification = time.monotonic()
+
+    def _reconstruire(self, signature, df=None):
+        if df is None:
+            df = charger_donnees(
+                colonnes=COLONNES_HISTORIQUE,
+                chemin_parquet=self.chemin_parquet,
+                chemin_csv=self.chemin_csv,
+                trier=False
+            )
+        index = construire_index(df, self.nb_mois)
+        # Écriture à côté puis remplacement atomique (comme dans comparables.py) :
+        # un worker qui démarre ne lit jamais un fichier à moitié écrit
+        chemin_tmp = f"{self.chemin_index}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(
+            {'format': FORMAT_INDEX, 'signature': signature, 'nb_mois': self.nb_mois, 'index': index},
+            chemin_tmp
+        )
+        os.replace(chemin_tmp, self.chemin_index)
+        if self.mmap:
+            self._installer(joblib.load(self.chemin_index, mmap_mode='r')['index'], signature, projete=True)
+        else:
+            self._installer(index, signature)
+
+    def _verifier_source(self):
+        maintenant = time.monotonic()
+        if maintenant - self._derniere_verification < self.intervalle_verification:
+            return
+
+        with self._verrou:
+            if self._reconstruction_en_cours:
+                return
+            self._derniere_verification = maintenant
+            try:
+                signature = signature_source(self._chemin_source())
+            except OSError:
+                return
+            if signature == self._signature:
+                return
+            self._reconstruction_en_cours = True
+
+        # Reconstruction hors du chemin de la requête : l'ancien index reste servi
+        threading.Thread(target=self._reconstruire_en_arriere_plan, args=(signature,), daemon=True).start()
+
+    def _reconstruire_en_arriere_plan(self, signature):
+        try:
+            self._reconstruire(signature)
+        except Exception as e:
+            print(f"Erreur lors de la reconstruction de l'historique: {e}")
+        finally:
+            self._reconstruction_en_cours = False
+
+
+if __name__ == "__main__":
+    # Précalcule l'index à partir du jeu de données nettoyé
+    debut = time.perf_counter()
+    index_historique = IndexHistoriquePrix().charger()
+    duree = time.perf_counter() - debut
+    print(f"✓ Index d'historique prêt ({len(index_historique)} codes postaux) en {duree:.2f}s")
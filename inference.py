@@ -0,0 +1,447 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from donnees import DOSSIER_MODELE
+
+
+# Artefact compilé : un fichier .npy par tableau + manifest.json
+DOSSIER_COMPILE = os.path.join(DOSSIER_MODELE, 'modele_compile')
+FORMAT_ARTEFACT = 1
+TABLEAUX = ['feature', 'seuil', 'gauche', 'manquant_gauche', 'est_feuille', 'valeur', 'racines']
+
+# Lignes parcourues ensemble par le modèle compilé (mémoire de travail bornée)
+TAILLE_BLOC = 1024
+# Lot à partir duquel predict passe par l'estimateur sklearn, plus rapide en lot
+SEUIL_LOT_ESTIMATEUR = 128
+
+
+class ModeleCompile:
+    """
+    Ensemble d'arbres compilé en tableaux NumPy plats, un élément par nœud
+    (tous les arbres mis bout à bout) :
+    - feature, seuil : test du nœud (x[feature] <= seuil -> gauche)
+    - gauche : indice (global) de l'enfant gauche, l'enfant droit étant gauche + 1
+    - manquant_gauche : direction des valeurs manquantes
+    - est_feuille, valeur : feuilles et leur contribution, déjà multipliée par le learning rate
+
+    Les couples (ligne, arbre) avancent ensemble d'un niveau par itération,
+    autant d'itérations que la profondeur maximale : une feuille pointe sur
+    elle-même et ne bouge plus. Les lignes sont traitées par blocs de
+    TAILLE_BLOC, la mémoire de travail ne dépend pas de la taille du lot.
+    La prédiction est base + somme des feuilles, accumulée dans le même ordre
+    que sklearn (arbre après arbre) : le résultat est identique à model.predict.
+
+    Au-delà de SEUIL_LOT_ESTIMATEUR lignes, la boucle compilée de sklearn est
+    plus rapide : predict passe par l'estimateur d'origine (chemin_estimateur,
+    chargé au premier lot) quand il est disponible.
+    """
+
+    def __init__(self, feature, seuil, gauche, manquant_gauche, est_feuille, valeur, racines,
+                 base, dtype_entree=np.float64, features=None, chemin_estimateur=None):
+        self.feature = feature
+        self.seuil = seuil
+        self.gauche = gauche
+        self.manquant_gauche = manquant_gauche
+        self.est_feuille = est_feuille
+        self.valeur = valeur
+        self.racines = racines
+        self.base = float(base)
+        self.dtype_entree = np.dtype(dtype_entree)
+        self.features = list(features) if features is not None else None
+        self.chemin_estimateur = chemin_estimateur
+        self._estimateur = None
+        self._verrou = threading.Lock()
+
+        # Parcours à profondeur fixe : les feuilles bouclent sur elles-mêmes
+        # (seuil infini, valeurs manquantes à gauche)
+        self._suivant = np.where(est_feuille, np.arange(len(feature)), gauche)
+        self._manquant_gauche = manquant_gauche | est_feuille
+        self.profondeur = self._calculer_profondeur()
+
+    @property
+    def n_arbres(self):
+        return len(self.racines)
+
+    @property
+    def n_noeuds(self):
+        return len(self.feature)
+
+    def _calculer_profondeur(self):
+        niveau, profondeur = self.racines, 0
+        while True:
+            internes = self.gauche[niveau[~self.est_feuille[niveau]]]
+            if not len(internes):
+                return profondeur
+            niveau = np.concatenate([internes, internes + 1])
+            profondeur += 1
+
+    def _matrice(self, X):
+        if isinstance(X, pd.DataFrame):
+            colonnes = self.features if self.features is not None else list(X.columns)
+            X = np.column_stack([X[colonne].to_numpy(dtype=np.float64) for colonne in colonnes])
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        # GradientBoostingRegressor compare les valeurs converties en float32
+        return np.ascontiguousarray(X, dtype=self.dtype_entree)
+
+    def feuilles(self, X):
+        """
+        Indice (global) de la feuille atteinte dans chaque arbre, shape
+        (n_lignes, n_arbres). Mémoire proportionnelle à n_lignes × n_arbres :
+        predict l'appelle bloc par bloc.
+        """
+        X = self._matrice(X)
+        n_lignes, n_features = X.shape
+        valeurs_x = X.ravel()
+        avec_manquants = np.isnan(valeurs_x).any()
+
+        noeuds = np.tile(self.racines, n_lignes)
+        debuts = np.repeat(np.arange(n_lignes) * n_features, self.n_arbres)
+        for _ in range(self.profondeur):
+            x = valeurs_x[debuts + self.feature[noeuds]]
+            aller_droite = x > self.seuil[noeuds]
+            if avec_manquants:
+                aller_droite |= np.isnan(x) & ~self._manquant_gauche[noeuds]
+            noeuds = self._suivant[noeuds] + aller_droite
+
+        return noeuds.reshape(n_lignes, self.n_arbres)
+
+    def predire_arbres(self, X):
+        """Prédiction par le parcours compilé, par blocs de TAILLE_BLOC lignes"""
+        X = self._matrice(X)
+        predictions = np.empty(len(X), dtype=np.float64)
+        for debut in range(0, len(X), TAILLE_BLOC):
+            valeurs = self.valeur[self.feuilles(X[debut:debut + TAILLE_BLOC])]
+            # Somme cumulée : même ordre d'accumulation que sklearn (base, puis arbre 1, 2, ...)
+            termes = np.column_stack([np.full(len(valeurs), self.base), valeurs])
+            predictions[debut:debut + TAILLE_BLOC] = np.cumsum(termes, axis=1)[:, -1]
+        return predictions
+
+    def estimateur(self):
+        """Estimateur sklearn d'origine (chargé au premier appel), None s'il n'est pas disponible"""
+        if self._estimateur is None and self.chemin_estimateur is not None:
+            with self._verrou:
+                if self._estimateur is None and self.chemin_estimateur is not None:
+                    try:
+                        import joblib
+
+                        self._estimateur = joblib.load(self.chemin_estimateur)
+                    except Exception as e:
+                        print(f"⚠️ Estimateur {self.chemin_estimateur} non chargé, parcours compilé conservé: {e}")
+                        self.chemin_estimateur = None
+        return self._estimateur
+
+    def predict(self, X):
+        n_lignes = len(X) if np.ndim(X) == 2 else 1
+        estimateur = self.estimateur() if n_lignes > SEUIL_LOT_ESTIMATEUR else None
+        if estimateur is None:
+            return self.predire_arbres(X)
+
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features] if self.features is not None else X
+        elif hasattr(estimateur, 'feature_names_in_'):
+            X = pd.DataFrame(np.asarray(X, dtype=np.float64), columns=estimateur.feature_names_in_)
+        return estimateur.predict(X)
+
+
+def _renumeroter(gauche, droite):
+    """
+    Ordre en largeur d'un arbre où les deux enfants d'un nœud sont consécutifs.
+
+    Returns:
+    --------
+    np.ndarray : ancien indice de chaque nouveau nœud
+    """
+    ordre = [0]
+    for noeud in ordre:
+        if gauche[noeud] != -1:
+            ordre.extend((int(gauche[noeud]), int(droite[noeud])))
+    return np.array(ordre)
+
+
+def _assembler(arbres, base, dtype_entree, features):
+    """
+    arbres : liste de (feature, seuil, gauche, droite, manquant_gauche, valeur, est_feuille)
+    avec des indices d'enfants locaux à chaque arbre (-1 pour les feuilles).
+    """
+    decalage = 0
+    racines, colonnes = [], [[] for _ in range(6)]
+    for feature, seuil, gauche, droite, manquant_gauche, valeur, est_feuille in arbres:
+        gauche = np.where(est_feuille, -1, np.asarray(gauche, dtype=np.int64))
+        droite = np.asarray(droite, dtype=np.int64)
+        ordre = _renumeroter(gauche, droite)
+        nouvel_indice = np.empty(len(gauche), dtype=np.int64)
+        nouvel_indice[ordre] = np.arange(len(ordre))
+
+        est_feuille = est_feuille[ordre]
+        racines.append(decalage)
+        colonnes[0].append(np.where(est_feuille, 0, feature[ordre]))
+        colonnes[1].append(np.where(est_feuille, np.inf, seuil[ordre]))
+        colonnes[2].append(np.where(est_feuille, 0, nouvel_indice[gauche[ordre]]) + decalage)
+        colonnes[3].append(manquant_gauche[ordre])
+        colonnes[4].append(est_feuille)
+        colonnes[5].append(valeur[ordre])
+        decalage += len(ordre)
+
+    feature, seuil, gauche, manquant_gauche, est_feuille, valeur = (np.concatenate(c) for c in colonnes)
+    return ModeleCompile(
+        feature.astype(np.intp), seuil.astype(np.float64), gauche.astype(np.intp),
+        manquant_gauche.astype(bool), est_feuille.astype(bool), valeur.astype(np.float64),
+        np.array(racines, dtype=np.intp), base, dtype_entree, features
+    )
+
+
+def _compiler_gbr(modele, features):
+    from sklearn.dummy import DummyRegressor
+
+    if not (modele.init_ == 'zero' or isinstance(modele.init_, DummyRegressor)):
+        raise ValueError("Estimateur initial non constant : compilation impossible")
+    if modele.estimators_.shape[1] != 1:
+        raise ValueError("Seule la régression à une sortie est supportée")
+
+    X_vide = np.zeros((1, modele.n_features_in_), dtype=np.float32)
+    base = modele._raw_predict_init(X_vide)[0, 0]
+
+    arbres = []
+    for estimateur in modele.estimators_[:, 0]:
+        tree = estimateur.tree_
+        est_feuille = tree.children_left == -1
+        manquant_gauche = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+        arbres.append((
+            tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            manquant_gauche.astype(bool),
+            # sklearn ajoute learning_rate * valeur de la feuille
+            modele.learning_rate * tree.value[:, 0, 0],
+            est_feuille
+        ))
+    return _assembler(arbres, base, np.float32, features)
+
+
+def _compiler_hgb(modele, features):
+    if modele.is_categorical_ is not None and modele.is_categorical_.any():
+        raise ValueError("Features catégorielles non supportées")
+    if modele.loss != 'squared_error':
+        raise ValueError(f"Fonction de perte non supportée: {modele.loss}")
+
+    arbres = []
+    for predicteurs in modele._predictors:
+        noeuds = predicteurs[0].nodes
+        est_feuille = noeuds['is_leaf'].astype(bool)
+        arbres.append((
+            noeuds['feature_idx'], noeuds['num_threshold'], noeuds['left'], noeuds['right'],
+            noeuds['missing_go_to_left'].astype(bool),
+            # Les valeurs des feuilles incluent déjà le learning rate
+            noeuds['value'],
+            est_feuille
+        ))
+    return _assembler(arbres, np.ravel(modele._baseline_prediction)[0], np.float64, features)
+
+
+def compiler_modele(modele, features=None):
+    """
+    Compile un GradientBoostingRegressor ou HistGradientBoostingRegressor entraîné.
+
+    Parameters:
+    -----------
+    modele : estimateur sklearn entraîné (Training_set/best_model.pkl)
+    features : list ou None
+        Ordre des colonnes attendu (model_features.pkl) ; les DataFrames passés
+        à predict sont réordonnés selon cette liste
+
+    Returns:
+    --------
+    ModeleCompile
+
+    Raises:
+    -------
+    ValueError si le modèle n'est pas supporté
+    """
+    from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+
+    if isinstance(modele, GradientBoostingRegressor):
+        return _compiler_gbr(modele, features)
+    if isinstance(modele, HistGradientBoostingRegressor):
+        return _compiler_hgb(modele, features)
+    raise ValueError(f"Modèle non supporté: {type(modele).__name__}")
+
+
+def moteur_inference(modele, features=None):
+    """Modèle compilé si possible, sinon le modèle sklearn lui-même"""
+    try:
+        return compiler_modele(modele, features)
+    except Exception as e:
+        print(f"⚠️ Modèle non compilé ({e}), utilisation de model.predict")
+        return modele
+
+
+def _signature_fichier(chemin):
+    stat = os.stat(chemin)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def version_modele(modele_compile):
+    """Version d'un modèle compilé : empreinte de ses tableaux et de ses features"""
+    empreinte = hashlib.sha1(json.dumps([modele_compile.features, modele_compile.base]).encode('utf-8'))
+    for nom in TABLEAUX:
+        empreinte.update(np.ascontiguousarray(getattr(modele_compile, nom)).tobytes())
+    return empreinte.hexdigest()[:12]
+
+
+def exporter_modele(modele_compile, dossier=DOSSIER_COMPILE, source=None, infos=None):
+    """
+    Écrit l'artefact compilé : un .npy par tableau et manifest.json (format,
+    version, features, base, type d'entrée). Le dossier est écrit à côté puis
+    renommé, un lecteur ne voit jamais un artefact à moitié écrit.
+
+    Parameters:
+    -----------
+    source : str ou None
+        Fichier best_model.pkl d'origine ; sa signature est notée dans le
+        manifeste pour détecter un artefact plus ancien que le modèle
+    infos : dict ou None
+        Informations ajoutées au manifeste (date de publication, métriques...)
+
+    Returns:
+    --------
+    dict : le manifeste
+    """
+    dossier_tmp = dossier + '.tmp'
+    shutil.rmtree(dossier_tmp, ignore_errors=True)
+    os.makedirs(dossier_tmp)
+
+    for nom in TABLEAUX:
+        np.save(os.path.join(dossier_tmp, f"{nom}.npy"), getattr(modele_compile, nom))
+    manifeste = {
+        'format': FORMAT_ARTEFACT,
+        'version': version_modele(modele_compile),
+        'features': modele_compile.features,
+        'base': modele_compile.base,
+        'dtype_entree': modele_compile.dtype_entree.name,
+        'n_arbres': modele_compile.n_arbres,
+        'n_noeuds': modele_compile.n_noeuds,
+        'source': _signature_fichier(source) if source and os.path.exists(source) else None,
+        **(infos or {}),
+    }
+    with open(os.path.join(dossier_tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f, indent=2)
+
+    if os.path.isdir(dossier):
+        shutil.rmtree(dossier)
+    os.replace(dossier_tmp, dossier)
+    return manifeste
+
+
+def charger_modele_compile(dossier=DOSSIER_COMPILE, mmap=True):
+    """
+    Charge un artefact compilé. Avec mmap, les tableaux sont projetés en
+    mémoire (np.load(mmap_mode='r')) : rien n'est copié au chargement et les
+    pages sont partagées entre les processus via le cache du système.
+
+    Un best_model.pkl présent dans le dossier (version du registre) sert
+    d'estimateur pour les grands lots.
+
+    Returns:
+    --------
+    tuple : (ModeleCompile, manifeste)
+    """
+    with open(os.path.join(dossier, 'manifest.json'), encoding='utf-8') as f:
+        manifeste = json.load(f)
+    if manifeste.get('format') != FORMAT_ARTEFACT:
+        raise ValueError(f"Format d'artefact non supporté: {manifeste.get('format')}")
+
+    tableaux = {
+        # view(np.ndarray) : évite le surcoût de la sous-classe np.memmap à chaque indexation
+        nom: np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode='r' if mmap else None).view(np.ndarray)
+        for nom in TABLEAUX
+    }
+    chemin_pkl = os.path.join(dossier, 'best_model.pkl')
+    modele_compile = ModeleCompile(
+        base=manifeste['base'], dtype_entree=manifeste['dtype_entree'],
+        features=manifeste['features'], chemin_estimateur=chemin_pkl if os.path.exists(chemin_pkl) else None,
+        **tableaux
+    )
+    return modele_compile, manifeste
+
+
+def charger_moteur(dossier=DOSSIER_MODELE):
+    """
+    Modèle de prédiction et liste des features pour l'API et les scripts.
+
+    Utilise l'artefact compilé (dossier/modele_compile) s'il est à jour ;
+    sinon charge best_model.pkl avec joblib, le compile et écrit l'artefact
+    pour les démarrages suivants.
+
+    Returns:
+    --------
+    tuple : (modèle avec une méthode predict, liste des features, version ou None)
+    """
+    chemin_pkl = os.path.join(dossier, 'best_model.pkl')
+    dossier_compile = os.path.join(dossier, 'modele_compile')
+
+    if os.path.exists(os.path.join(dossier_compile, 'manifest.json')):
+        modele_compile, manifeste = charger_modele_compile(dossier_compile)
+        if not os.path.exists(chemin_pkl):
+            return modele_compile, manifeste['features'], manifeste['version']
+        if manifeste['source'] == _signature_fichier(chemin_pkl):
+            modele_compile.chemin_estimateur = chemin_pkl
+            return modele_compile, manifeste['features'], manifeste['version']
+        print("⚠️ Artefact compilé plus ancien que best_model.pkl, recompilation")
+
+    import joblib
+
+    modele = joblib.load(chemin_pkl)
+    features = joblib.load(os.path.join(dossier, 'model_features.pkl'))
+    moteur = moteur_inference(modele, features)
+    if not isinstance(moteur, ModeleCompile):
+        return moteur, features, None
+    moteur.chemin_estimateur = chemin_pkl
+    try:
+        manifeste = exporter_modele(moteur, dossier_compile, source=chemin_pkl)
+        return moteur, features, manifeste['version']
+    except OSError as e:
+        print(f"⚠️ Artefact compilé non écrit: {e}")
+        return moteur, features, version_modele(moteur)
+
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Compilation du modèle en tableaux NumPy")
+    parser.add_argument('--exporter', action='store_true',
+                        help="Écrire l'artefact compilé Training_set/modele_compile")
+    args = parser.parse_args()
+
+    # Vérification : le modèle compilé donne les mêmes prédictions que sklearn
+    model = joblib.load(os.path.join(DOSSIER_MODELE, 'best_model.pkl'))
+    features_list = joblib.load(os.path.join(DOSSIER_MODELE, 'model_features.pkl'))
+    compile_ = compiler_modele(model, features_list)
+
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame({
+        'longitude': rng.uniform(2.25, 2.42, 10_000),
+        'latitude': rng.uniform(48.81, 48.90, 10_000),
+        'code_postal': rng.integers(75001, 75021, 10_000),
+        'code_type_local': 2,
+        'lot1_surface_carrez': rng.uniform(8, 250, 10_000),
+        'nombre_pieces_principales': rng.integers(1, 8, 10_000),
+    })[features_list]
+
+    attendu = model.predict(X)
+    obtenu = compile_.predire_arbres(X)
+    assert np.allclose(attendu, obtenu, rtol=1e-12, atol=1e-6)
+    print(f"✓ {compile_.n_arbres} arbres, {compile_.n_noeuds} nœuds : prédictions identiques "
+          f"(écart max {np.abs(attendu - obtenu).max():.3g})")
+
+    if args.exporter:
+        manifeste = exporter_modele(compile_, source=os.path.join(DOSSIER_MODELE, 'best_model.pkl'))
+        recharge, _ = charger_modele_compile()
+        assert np.array_equal(recharge.predire_arbres(X), obtenu)
+        print(f"✓ Artefact {manifeste['version']} écrit dans {DOSSIER_COMPILE}")
@@ -0,0 +1,226 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+# Bornes des histogrammes de durée (secondes), de 100 µs à 10 s
+BORNES_DUREE = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TYPE_CONTENU = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _echapper(valeur) -> str:
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquettes(noms: Sequence[str], valeurs: Tuple, supplement: str = "") -> str:
+    paires = [f'{nom}="{_echapper(valeur)}"' for nom, valeur in zip(noms, valeurs)]
+    if supplement:
+        paires.append(supplement)
+    return "{" + ",".join(paires) + "}" if paires else ""
+
+
+def _nombre(valeur: float) -> str:
+    if valeur == float('inf'):
+        return "+Inf"
+    return repr(float(valeur)) if not float(valeur).is_integer() else str(int(valeur))
+
+
+class Compteur:
+    """Compteur monotone, une série par combinaison d'étiquettes"""
+
+    type = "counter"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._valeurs: Dict[Tuple, float] = {}
+        self._verrou = threading.Lock()
+
+    def inc(self, valeur: float = 1.0, **etiquettes) -> None:
+        cle = tuple(etiquettes[nom] for nom in self.etiquettes)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0.0) + valeur
+
+    def valeur(self, **etiquettes) -> float:
+        return self._valeurs.get(tuple(etiquettes[nom] for nom in self.etiquettes), 0.0)
+
+    def exposer(self) -> List[str]:
+        with self._verrou:
+            valeurs = sorted(self._valeurs.items())
+        return [f"{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(v)}" for cle, v in valeurs]
+
+
+class Histogramme:
+    """
+    Histogramme à classes fixes (compteurs non cumulés en mémoire, cumulés à
+    l'exposition) : observer() coûte une recherche dichotomique et deux
+    additions sous verrou.
+    """
+
+    type = "histogram"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = (),
+                 bornes: Sequence[float] = BORNES_DUREE):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self.bornes = tuple(sorted(bornes))
+        self._series: Dict[Tuple, list] = {}
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur: float, **etiquettes) -> None:
+        cle = tuple(etiquettes[nom] for nom in self.etiquettes)
+        classe = bisect.bisect_left(self.bornes, valeur)
+        with self._verrou:
+            serie = self._series.get(cle)
+            if serie is None:
+                # [comptes par classe (+ classe +Inf), somme]
+                serie = self._series[cle] = [[0] * (len(self.bornes) + 1), 0.0]
+            serie[0][classe] += 1
+            serie[1] += valeur
+
+    @contextmanager
+    def mesurer(self, **etiquettes):
+        """Observe la durée (secondes) du bloc, même s'il lève une exception"""
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(time.perf_counter() - debut, **etiquettes)
+
+    def exposer(self) -> List[str]:
+        with self._verrou:
+            series = sorted((cle, (list(comptes), somme)) for cle, (comptes, somme) in self._series.items())
+        lignes = []
+        for cle, (comptes, somme) in series:
+            cumul = 0
+            for borne, compte in zip(self.bornes + (float('inf'),), comptes):
+                cumul += compte
+                le = f'le="{_nombre(borne)}"'
+                lignes.append(f"{self.nom}_bucket{_etiquettes(self.etiquettes, cle, le)} {cumul}")
+            lignes.append(f"{self.nom}_sum{_etiquettes(self.etiquettes, cle)} {_nombre(somme)}")
+            lignes.append(f"{self.nom}_count{_etiquettes(self.etiquettes, cle)} {cumul}")
+        return lignes
+
+
+class Jauge:
+    """
+    Valeur lue à l'exposition (taille d'un cache, version servie...).
+    type="counter" pour un total tenu ailleurs (hits d'un CacheLRU).
+    """
+
+    def __init__(self, nom: str, aide: str, fonction: Callable[[], Dict[Tuple, float]],
+                 etiquettes: Sequence[str] = (), type: str = "gauge"):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self.fonction = fonction
+        self.type = type
+
+    def exposer(self) -> List[str]:
+        try:
+            valeurs = self.fonction()
+        except Exception:
+            return []
+        if not isinstance(valeurs, dict):
+            valeurs = {(): valeurs}
+        return [
+            f"{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(v)}"
+            for cle, v in valeurs.items() if v is not None
+        ]
+
+
+class RegistreMetriques:
+    """Ensemble de métriques exposées au format texte de Prometheus"""
+
+    def __init__(self):
+        self._metriques = {}
+
+    def _ajouter(self, metrique):
+        # Réimporter un module ne doit pas dupliquer une métrique
+        return self._metriques.setdefault(metrique.nom, metrique)
+
+    def compteur(self, nom: str, aide: str, etiquettes: Sequence[str] = ()) -> Compteur:
+        return self._ajouter(Compteur(nom, aide, etiquettes))
+
+    def histogramme(self, nom: str, aide: str, etiquettes: Sequence[str] = (),
+                    bornes: Sequence[float] = BORNES_DUREE) -> Histogramme:
+        return self._ajouter(Histogramme(nom, aide, etiquettes, bornes))
+
+    def jauge(self, nom: str, aide: str, fonction: Callable, etiquettes: Sequence[str] = (),
+              type: str = "gauge") -> Jauge:
+        # Une jauge redéclarée remplace la précédente (nouvelle source de valeurs)
+        self._metriques[nom] = Jauge(nom, aide, fonction, etiquettes, type)
+        return self._metriques[nom]
+
+    def exposer(self) -> str:
+        lignes = []
+        for metrique in self._metriques.values():
+            lignes.append(f"# HELP {metrique.nom} {_echapper(metrique.aide)}")
+            lignes.append(f"# TYPE {metrique.nom} {metrique.type}")
+            lignes.extend(metrique.exposer())
+        return "\n".join(lignes) + "\n"
+
+
+# Registre du processus et métriques partagées par l'API et le géocodeur
+metriques = RegistreMetriques()
+
+DUREE_REQUETES = metriques.histogramme(
+    "api_requete_duree_secondes", "Durée des requêtes HTTP par endpoint",
+    ["endpoint", "methode", "statut"]
+)
+DUREE_ETAPES = metriques.histogramme(
+    "api_etape_duree_secondes", "Durée de chaque étape des handlers",
+    ["endpoint", "etape"]
+)
+ERREURS = metriques.compteur(
+    "api_erreurs_total", "Réponses en erreur (statut >= 400) par endpoint",
+    ["endpoint", "statut"]
+)
+APPELS_GEOCODEUR = metriques.compteur(
+    "geocodeur_appels_amont_total", "Appels au géocodeur amont (Nominatim) par résultat",
+    ["backend", "resultat"]
+)
+DUREE_GEOCODEUR = metriques.histogramme(
+    "geocodeur_amont_duree_secondes", "Durée des appels au géocodeur amont (hors attente du limiteur)",
+    ["backend"]
+)
+
+
+class MiddlewareMetriques:
+    """
+    Middleware ASGI : durée et statut de chaque requête HTTP, étiquetées par
+    la route (/api/predict...) et non par l'URL brute, pour borner le nombre
+    de séries. Écrit en ASGI pur, sans le surcoût de BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        statut = [500]
+
+        async def envoyer(message):
+            if message["type"] == "http.response.start":
+                statut[0] = message["status"]
+            await send(message)
+
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "non_route"
+            DUREE_REQUETES.observer(time.perf_counter() - debut, endpoint=endpoint,
+                                    methode=scope["method"], statut=str(statut[0]))
+            if statut[0] >= 400:
+                ERREURS.inc(endpoint=endpoint, statut=str(statut[0]))
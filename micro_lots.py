@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Callable, List, Sequence
+
+
+# Bornes (incluses) des classes de l'histogramme des tailles de lot
+CLASSES_TAILLE_LOT = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+class MicroLots:
+    """
+    Regroupe les prédictions unitaires concurrentes en micro-lots.
+
+    Chaque appel à soumettre() attend dans une file ; la file est vidée
+    quand la fenêtre de collecte (fenetre_s, comptée depuis la première
+    requête en attente) expire ou dès qu'elle atteint taille_max. Le lot est
+    alors traité par un seul appel vectorisé fonction(cle, elements), exécuté
+    dans le pool de threads pour ne pas bloquer la boucle d'événements, et
+    chaque résultat est renvoyé à la coroutine qui l'attendait.
+
+    Les éléments sont regroupés par clé (l'état du modèle servi) : deux
+    requêtes arrivées de part et d'autre d'un rechargement du modèle ne sont
+    jamais prédites ensemble.
+
+    Doit être utilisé depuis une seule boucle d'événements.
+    """
+
+    def __init__(self, fonction: Callable[[Any, List[Any]], Sequence[Any]],
+                 fenetre_s: float = 0.002, taille_max: int = 64):
+        if taille_max <= 0:
+            raise ValueError(f"La taille maximale doit être strictement positive (reçu: {taille_max})")
+        self.fonction = fonction
+        self.fenetre_s = fenetre_s
+        self.taille_max = taille_max
+        self._en_attente = []
+        self._minuteur = None
+
+        # Métriques
+        self.nb_lots = 0
+        self.nb_requetes = 0
+        self.nb_erreurs = 0
+        self.tailles_lots = dict.fromkeys(CLASSES_TAILLE_LOT + [float('inf')], 0)
+        self.attente_totale_s = 0.0
+        self.attente_max_s = 0.0
+        self.duree_prediction_totale_s = 0.0
+        self._debut = None
+
+    async def soumettre(self, cle: Any, element: Any) -> Any:
+        """Ajoute un élément au prochain lot et attend son résultat"""
+        boucle = asyncio.get_running_loop()
+        futur = boucle.create_future()
+        if self._debut is None:
+            self._debut = time.monotonic()
+        self._en_attente.append((cle, element, futur, time.monotonic()))
+
+        if len(self._en_attente) >= self.taille_max:
+            self._vider()
+        elif self._minuteur is None:
+            self._minuteur = boucle.call_later(self.fenetre_s, self._vider)
+        return await futur
+
+    def _vider(self):
+        if self._minuteur is not None:
+            self._minuteur.cancel()
+            self._minuteur = None
+        lot, self._en_attente = self._en_attente, []
+        if lot:
+            asyncio.ensure_future(self._executer(lot))
+
+    async def _executer(self, lot):
+        boucle = asyncio.get_running_loop()
+        debut = time.monotonic()
+        self._enregistrer_lot(lot, debut)
+
+        # Regroupement par identité : la clé (l'état du modèle) n'a pas à être hashable
+        groupes = defaultdict(list)
+        cles = {}
+        for cle, element, futur, _ in lot:
+            groupes[id(cle)].append((element, futur))
+            cles[id(cle)] = cle
+
+        for identifiant, membres in groupes.items():
+            cle = cles[identifiant]
+            elements = [element for element, _ in membres]
+            try:
+                resultats = await boucle.run_in_executor(None, self.fonction, cle, elements)
+            except Exception as e:
+                self.nb_erreurs += len(membres)
+                for _, futur in membres:
+                    if not futur.done():
+                        futur.set_exception(e)
+                continue
+            for (_, futur), resultat in zip(membres, resultats):
+                # La requête a pu être annulée (client déconnecté) pendant la prédiction
+                if not futur.done():
+                    futur.set_result(resultat)
+
+        self.duree_prediction_totale_s += time.monotonic() - debut
+
+    def _enregistrer_lot(self, lot, debut):
+        self.nb_lots += 1
+        self.nb_requetes += len(lot)
+        for borne in self.tailles_lots:
+            if len(lot) <= borne:
+                self.tailles_lots[borne] += 1
+                break
+        for *_, arrivee in lot:
+            attente = debut - arrivee
+            self.attente_totale_s += attente
+            self.attente_max_s = max(self.attente_max_s, attente)
+
+    def statistiques(self) -> dict:
+        duree = time.monotonic() - self._debut if self._debut is not None else 0.0
+        return {
+            "fenetre_ms": self.fenetre_s * 1000,
+            "taille_max": self.taille_max,
+            "lots": self.nb_lots,
+            "requetes": self.nb_requetes,
+            "erreurs": self.nb_erreurs,
+            "en_attente": len(self._en_attente),
+            "taille_moyenne_lot": self.nb_requetes / self.nb_lots if self.nb_lots else 0.0,
+            "histogramme_taille_lot": {
+                (f"<={borne}" if borne != float('inf') else f">{CLASSES_TAILLE_LOT[-1]}"): nombre
+                for borne, nombre in self.tailles_lots.items()
+            },
+            "attente_moyenne_ms": 1000 * self.attente_totale_s / self.nb_requetes if self.nb_requetes else 0.0,
+            "attente_max_ms": 1000 * self.attente_max_s,
+            "prediction_moyenne_ms": 1000 * self.duree_prediction_totale_s / self.nb_lots if self.nb_lots else 0.0,
+            "debit_requetes_s": self.nb_requetes / duree if duree > 0 else 0.0
+        }
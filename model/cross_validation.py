@@ -1,52 +1,136 @@
-import pandas as pd
+import argparse
+import json
+import os
+import sys
+import time
 import numpy as np
-from sklearn.model_selection import cross_val_score, KFold
-from sklearn.ensemble import GradientBoostingRegressor
-import joblib
-
-# Charger les données
-df = pd.read_csv('DATA/donnees_immobilieres.csv')
-df = df.dropna(subset=['latitude', 'longitude', 'valeur_fonciere', 'score_transport', 'prix_m_carrez_arr'])
-
-# Échantillonner 20% des données pour accélérer
-df_sample = df.sample(frac=0.2, random_state=42)
-
-colonnes_a_exclure = ['valeur_fonciere', 'prix_m_carrez']
-X_all = df_sample.drop(columns=colonnes_a_exclure, errors='ignore')
-X = X_all.select_dtypes(include=[np.number])
-y = df_sample['valeur_fonciere']
-
-print("=" * 60)
-print("CROSS-VALIDATION RAPIDE (échantillon 20%)")
-print("=" * 60)
-print(f"Nombre de données: {len(X)}")
-print(f"Nombre de features: {X.shape[1]}")
-print(f"Features: {list(X.columns)}")
-print()
-
-# K-Fold Cross-Validation avec 3 folds (plus rapide que 5)
-print("-" * 60)
-print("K-FOLD CROSS-VALIDATION (3 folds)")
-print("-" * 60)
-
-model = GradientBoostingRegressor(n_estimators=200, learning_rate=0.1, max_depth=5, random_state=42)
-kfold = KFold(n_splits=3, shuffle=True, random_state=42)
-
-# R² scores
-r2_scores = cross_val_score(model, X, y, cv=kfold, scoring='r2')
-print(f"R² scores par fold: {r2_scores}")
-print(f"R² moyen: {r2_scores.mean():.4f} (+/- {r2_scores.std() * 2:.4f})")
-
-# MAE scores
-mae_scores = -cross_val_score(model, X, y, cv=kfold, scoring='neg_mean_absolute_error')
-print(f"MAE moyen: {mae_scores.mean():,.0f} € (+/- {mae_scores.std() * 2:,.0f})")
-
-# RMSE scores
-rmse_scores = np.sqrt(-cross_val_score(model, X, y, cv=kfold, scoring='neg_mean_squared_error'))
-print(f"RMSE moyen: {rmse_scores.mean():,.0f} € (+/- {rmse_scores.std() * 2:,.0f})")
-
-print()
-print("=" * 60)
-print("✓ Cross-validation terminée!")
-print("Les résultats sont cohérents avec le modèle entraîné." if r2_scores.mean() > 0.8 else "Attention: performances plus faibles")
-print("=" * 60)
\ No newline at end of file
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from entrainement import DOSSIER_MODELE, MOTEUR_PAR_DEFAUT, MOTEURS, creer_modele, parametres_retenus, preparer_donnees
+
+
+def evaluer_fold(moteur, X, y, index_train, index_test, num_fold):
+    """
+    Un fold : un seul entraînement et une seule prédiction, dont sont tirées
+    toutes les métriques.
+    """
+    modele = creer_modele(moteur, **parametres_retenus(moteur))
+
+    debut = time.perf_counter()
+    modele.fit(X.iloc[index_train], y.iloc[index_train])
+    temps_fit = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    y_pred = modele.predict(X.iloc[index_test])
+    temps_prediction = time.perf_counter() - debut
+
+    y_test = y.iloc[index_test]
+    return {
+        'fold': num_fold,
+        'n_train': len(index_train),
+        'n_test': len(index_test),
+        'r2': r2_score(y_test, y_pred),
+        'mae': mean_absolute_error(y_test, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'temps_fit_s': temps_fit,
+        'temps_prediction_s': temps_prediction,
+    }
+
+
+def cross_validation(X, y, moteur=MOTEUR_PAR_DEFAUT, n_folds=3, n_jobs=-1):
+    """
+    Cross-validation K-Fold, folds exécutés en parallèle dans un pool de processus.
+
+    Les threads de chaque worker sont limités pour que n_jobs workers
+    multi-threadés n'utilisent pas plus de cœurs que la machine n'en a.
+    n_jobs suit la convention de joblib : None ou -1 pour tous les cœurs,
+    -2 pour tous sauf un, etc. ; 0 lève une ValueError.
+
+    Returns:
+    --------
+    list : résultats par fold (métriques et temps)
+    """
+    kfold = KFold(n_splits=n_folds, shuffle=True, random_state=42)
+    nb_workers = min(n_folds, effective_n_jobs(-1 if n_jobs is None else n_jobs))
+    threads_par_worker = max(1, os.cpu_count() // nb_workers)
+
+    with parallel_config(backend='loky', inner_max_num_threads=threads_par_worker):
+        return Parallel(n_jobs=nb_workers)(
+            delayed(evaluer_fold)(moteur, X, y, index_train, index_test, num_fold)
+            for num_fold, (index_train, index_test) in enumerate(kfold.split(X))
+        )
+
+
+def resume(folds):
+    scores = {}
+    for metrique in ['r2', 'mae', 'rmse']:
+        valeurs = np.array([f[metrique] for f in folds])
+        scores[metrique] = {'moyenne': float(valeurs.mean()), 'ecart_type': float(valeurs.std())}
+    return scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validation du modèle de prix")
+    parser.add_argument('--moteur', choices=list(MOTEURS), default=MOTEUR_PAR_DEFAUT, help="Moteur d'entraînement")
+    parser.add_argument('--folds', type=int, default=3, help="Nombre de folds")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Folds en parallèle (-1: tous les cœurs)")
+    parser.add_argument('--frac', type=float, default=1.0, help="Fraction des données utilisée")
+    parser.add_argument('--sortie', default=os.path.join(DOSSIER_MODELE, 'cv_resultats.json'),
+                        help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    # Charger les données : mêmes features que le modèle entraîné
+    # (entrainement.preparer_donnees). L'ancienne version de ce script gardait
+    # aussi prix_m_carrez_arr et score_transport : ses scores ne sont pas
+    # comparables à ceux-ci.
+    X, y = preparer_donnees()
+    if args.frac < 1.0:
+        X = X.sample(frac=args.frac, random_state=42)
+        y = y.loc[X.index]
+
+    print("=" * 60)
+    print(f"CROSS-VALIDATION ({args.folds} folds, moteur {args.moteur})")
+    print("=" * 60)
+    print(f"Nombre de données: {len(X)}")
+    print(f"Nombre de features: {X.shape[1]}")
+    print(f"Features: {list(X.columns)}")
+    print()
+
+    debut = time.perf_counter()
+    folds = cross_validation(X, y, args.moteur, args.folds, args.n_jobs)
+    duree_totale = time.perf_counter() - debut
+    scores = resume(folds)
+
+    print("-" * 60)
+    for f in folds:
+        print(f"Fold {f['fold']}: R² {f['r2']:.4f} | MAE {f['mae']:,.0f} € | RMSE {f['rmse']:,.0f} € "
+              f"| fit {f['temps_fit_s']:.1f}s")
+    print("-" * 60)
+    print(f"R² moyen: {scores['r2']['moyenne']:.4f} (+/- {scores['r2']['ecart_type'] * 2:.4f})")
+    print(f"MAE moyen: {scores['mae']['moyenne']:,.0f} € (+/- {scores['mae']['ecart_type'] * 2:,.0f})")
+    print(f"RMSE moyen: {scores['rmse']['moyenne']:,.0f} € (+/- {scores['rmse']['ecart_type'] * 2:,.0f})")
+    print(f"Durée totale: {duree_totale:.1f}s")
+
+    os.makedirs(os.path.dirname(args.sortie), exist_ok=True)
+    with open(args.sortie, 'w', encoding='utf-8') as f:
+        json.dump({
+            'moteur': args.moteur,
+            'n_folds': args.folds,
+            'n_jobs': args.n_jobs,
+            'n_lignes': len(X),
+            'features': list(X.columns),
+            'duree_totale_s': duree_totale,
+            'scores': scores,
+            'folds': folds,
+        }, f, indent=2, ensure_ascii=False)
+
+    print()
+    print("=" * 60)
+    print("✓ Cross-validation terminée!")
+    print("Les résultats sont cohérents avec le modèle entraîné." if scores['r2']['moyenne'] > 0.8 else "Attention: performances plus faibles")
+    print(f"Résultats: {args.sortie}")
+    print("=" * 60)
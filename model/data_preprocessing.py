@@ -1,11 +1,18 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
 import pandas as pd
-import numpy as np
-from sklearn.neighbors import BallTree
 
-df_v1 = pd.read_csv('DATA/dvf.csv', encoding='utf-8')
-print(df_v1.columns)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-df_clean = df_v1[[
+from transport import charger_stations, construire_arbre, scores_transport
+from donnees import CHEMIN_CSV, CHEMIN_PARQUET, ecrire_parquet
+
+
+COLONNES = [
     "date_mutation",
     "valeur_fonciere",
     "longitude",
@@ -17,64 +24,253 @@ df_clean = df_v1[[
     "nombre_pieces_principales",
     "type_local",
     "nature_mutation",
-]]
+]
 
-df_clean = df_clean.drop_duplicates()
-necessary_data = ["valeur_fonciere", "longitude", "latitude", "lot1_surface_carrez", "nombre_pieces_principales"]
-df_clean = df_clean.dropna(subset=necessary_data)
-df_clean = df_clean[df_clean["nombre_pieces_principales"] != 0]
+# Types explicites pour la lecture par morceaux (identiques à l'inférence de pandas sur le DVF)
+DTYPES = {
+    "date_mutation": "str",
+    "valeur_fonciere": "float64",
+    "longitude": "float64",
+    "latitude": "float64",
+    "code_postal": "float64",
+    "code_type_local": "float64",
+    "nom_commune": "str",
+    "lot1_surface_carrez": "float64",
+    "nombre_pieces_principales": "float64",
+    "type_local": "str",
+    "nature_mutation": "str",
+}
 
+necessary_data = ["valeur_fonciere", "longitude", "latitude", "lot1_surface_carrez", "nombre_pieces_principales"]
 cols_float = ["valeur_fonciere", "longitude", "latitude", "lot1_surface_carrez"]
-df_clean[cols_float] = df_clean[cols_float].apply(pd.to_numeric, errors="coerce")
-
 cols_int = ["nombre_pieces_principales", "code_type_local", "code_postal"]
-df_clean[cols_int] = df_clean[cols_int].apply(pd.to_numeric, errors='coerce').astype('Int64')
-
-df_clean["date_mutation"] = pd.to_datetime(df_clean["date_mutation"], errors="coerce")
-
-df_clean['prix_m_carrez'] = df_clean['valeur_fonciere'] / df_clean['lot1_surface_carrez']
-df_clean = df_clean.sort_values('date_mutation')
-df_clean = df_clean[~df_clean['code_type_local'].isin([1, 3, 4])]
-
-df_metro = pd.read_csv('DATA/metro-france.csv', encoding='utf-8')
-df_metro = df_metro[df_metro['Commune nom'].str.contains("Paris")]
-df_metro_clean = df_metro.rename(columns={
-    "Libelle Line": "ligne",
-    "Libelle station": "station",
-    "Commune nom": "commune"
-})[["ligne", "station", "Longitude", "Latitude", "commune"]]
-
-coords = np.radians(df_metro_clean[["Latitude", "Longitude"]].to_numpy())
-tree = BallTree(coords, metric="haversine")
-
-def score_transport(lat, lon):
-    point = np.radians([[lat, lon]])
-    dist, _ = tree.query(point, k=1)  
-    d_km = dist[0][0] * 6371 
-    if d_km < 0.150: 
-        return 5
-    if d_km < 0.400: 
-        return 4
-    if d_km < 0.800: 
-        return 3
-    if d_km < 1.500: 
-        return 2
-    return 1
-
-df_clean['score_transport'] = np.nan
-mask = df_clean['latitude'].notna() & df_clean['longitude'].notna()
-df_clean.loc[mask, 'score_transport'] = df_clean[mask].apply(lambda row: score_transport(row['latitude'], row['longitude']), axis=1)
-
-prix_moyen_par_arrondissement = df_clean.groupby('code_postal')['prix_m_carrez'].mean().to_dict()
-df_clean['prix_m_carrez_arr'] = df_clean['code_postal'].map(prix_moyen_par_arrondissement)
 
 # Suppression des prix exorbitants (>50% de la moyenne de l'arrondissement)
 seuil_max = 1.50  # 150% de la moyenne de l'arrondissement
-df_clean['ratio_prix'] = df_clean['prix_m_carrez'] / df_clean['prix_m_carrez_arr']
-nb_avant = len(df_clean)
-df_clean = df_clean[df_clean['ratio_prix'] <= seuil_max]
-df_clean = df_clean.drop(columns=['ratio_prix'])
 
 
-print(df_clean["score_transport"].value_counts())
-df_clean.to_csv('DATA/donnees_immobilieres.csv', index=False, encoding='utf-8')
+def filtrer_lignes(df_clean):
+    """Suppression des lignes inutilisables (étapes indépendantes d'une ligne à l'autre)"""
+    df_clean = df_clean.dropna(subset=necessary_data)
+    df_clean = df_clean[df_clean["nombre_pieces_principales"] != 0].copy()
+    df_clean[cols_float] = df_clean[cols_float].apply(pd.to_numeric, errors="coerce")
+    return df_clean
+
+
+def convertir_types(df_clean):
+    """Conversion des types, calcul du prix au m² et tri chronologique"""
+    df_clean[cols_int] = df_clean[cols_int].apply(pd.to_numeric, errors='coerce').astype('Int64')
+    df_clean["date_mutation"] = pd.to_datetime(df_clean["date_mutation"], errors="coerce")
+
+    df_clean['prix_m_carrez'] = df_clean['valeur_fonciere'] / df_clean['lot1_surface_carrez']
+    # Tri stable : à date égale, l'ordre du fichier source est conservé
+    df_clean = df_clean.sort_values('date_mutation', kind='stable')
+    return df_clean[~df_clean['code_type_local'].isin([1, 3, 4])]
+
+
+def prix_moyens_par_arrondissement(df_clean):
+    return df_clean.groupby('code_postal')['prix_m_carrez'].mean().to_dict()
+
+
+def filtrer_prix_exorbitants(df_clean, prix_moyen_par_arrondissement):
+    df_clean['prix_m_carrez_arr'] = df_clean['code_postal'].map(prix_moyen_par_arrondissement)
+
+    ratio_prix = df_clean['prix_m_carrez'] / df_clean['prix_m_carrez_arr']
+    return df_clean[ratio_prix <= seuil_max]
+
+
+def preparer_dvf(chemin_source='DATA/dvf.csv', chemin_parquet=CHEMIN_PARQUET, chemin_csv=None):
+    """
+    Préparation en mémoire : tout le fichier DVF est chargé d'un coup.
+    Écrit le dataset Parquet partitionné, et le CSV si chemin_csv est fourni.
+    """
+    df_v1 = pd.read_csv(chemin_source, encoding='utf-8')
+    print(df_v1.columns)
+
+    df_clean = df_v1[COLONNES]
+    df_clean = df_clean.drop_duplicates()
+    df_clean = convertir_types(filtrer_lignes(df_clean))
+
+    tree = construire_arbre(charger_stations())
+
+    # Une seule requête sur le BallTree pour toutes les lignes
+    df_clean['score_transport'] = scores_transport(tree, df_clean['latitude'], df_clean['longitude'])
+
+    df_clean = filtrer_prix_exorbitants(df_clean, prix_moyens_par_arrondissement(df_clean))
+
+    print(df_clean["score_transport"].value_counts())
+    ecrire_parquet(df_clean, chemin_parquet)
+    if chemin_csv:
+        df_clean.to_csv(chemin_csv, index=False, encoding='utf-8')
+
+
+def _cle_mois(dates):
+    mois = pd.to_datetime(dates, errors="coerce").dt.strftime('%Y-%m')
+    return mois.fillna('NaT')
+
+
+def lire_par_morceaux(chemin_source, taille_chunk=500_000):
+    """Lecture du DVF (CSV) par morceaux, avec colonnes et types explicites"""
+    return pd.read_csv(chemin_source, encoding='utf-8', usecols=COLONNES,
+                       dtype=DTYPES, chunksize=taille_chunk)
+
+
+def repartir_par_mois(morceaux, dossier, prefixe=''):
+    """
+    Passe 1 : filtrage ligne à ligne de chaque morceau et répartition des
+    lignes restantes par mois de mutation dans dossier/<mois>/<prefixe><n° de morceau>.pkl.
+
+    Returns:
+    --------
+    tuple : (nombre de lignes lues, nombre de lignes conservées)
+    """
+    nb_lues, nb_gardees = 0, 0
+    for num_chunk, chunk in enumerate(morceaux):
+        nb_lues += len(chunk)
+        chunk = filtrer_lignes(chunk[COLONNES])
+        nb_gardees += len(chunk)
+        for mois, df_mois in chunk.groupby(_cle_mois(chunk['date_mutation']), sort=False):
+            os.makedirs(os.path.join(dossier, mois), exist_ok=True)
+            df_mois.to_pickle(os.path.join(dossier, mois, f"{prefixe}{num_chunk:06d}.pkl"))
+    return nb_lues, nb_gardees
+
+
+def _mois_tries(dossier):
+    # Ordre chronologique, dates invalides (NaT) en dernier comme sort_values
+    return sorted(os.listdir(dossier), key=lambda mois: (mois == 'NaT', mois))
+
+
+def _nettoyer_mois(dossier_mois, chemin_nettoye):
+    """Passe 2 pour un mois : dédoublonnage, conversion et tri"""
+    morceaux = sorted(os.listdir(dossier_mois))
+    df_mois = pd.concat(
+        [pd.read_pickle(os.path.join(dossier_mois, morceau)) for morceau in morceaux],
+        ignore_index=True
+    )
+    df_mois = convertir_types(df_mois.drop_duplicates())
+    df_mois.to_pickle(chemin_nettoye)
+    return df_mois['code_postal'], df_mois['prix_m_carrez']
+
+
+_arbre_stations = None
+
+
+def _finaliser_mois(chemin_nettoye, prix_moyen_par_arrondissement, chemin_parquet, prefixe,
+                    chemin_csv_partiel, entete_csv):
+    """Passe 3 pour un mois : score de transport, filtre des prix exorbitants et écriture"""
+    global _arbre_stations
+    if _arbre_stations is None:
+        _arbre_stations = construire_arbre(charger_stations())
+
+    df_mois = pd.read_pickle(chemin_nettoye)
+    df_mois['score_transport'] = scores_transport(_arbre_stations, df_mois['latitude'], df_mois['longitude'])
+    df_mois = filtrer_prix_exorbitants(df_mois, prix_moyen_par_arrondissement)
+
+    ecrire_parquet(df_mois, chemin_parquet, ajout=True, prefixe=prefixe)
+    if chemin_csv_partiel is not None:
+        df_mois.to_csv(chemin_csv_partiel, index=False, header=entete_csv)
+    os.remove(chemin_nettoye)
+    return df_mois['score_transport'].value_counts()
+
+
+def finaliser_par_mois(dossier, chemin_parquet=CHEMIN_PARQUET, chemin_csv=None, executor=None):
+    """
+    Passes 2 et 3 sur les lignes réparties par mois :
+    - passe 2 : dédoublonnage, conversion et tri de chaque mois ; seuls le code
+      postal et le prix au m² sont gardés en mémoire pour les moyennes
+    - passe 3 : score de transport, filtre des prix exorbitants et écriture
+      incrémentale du dataset Parquet (et du CSV si chemin_csv est fourni)
+
+    Les doublons ont la même date de mutation : ils tombent toujours dans le
+    même mois, le dédoublonnage par mois équivaut donc au dédoublonnage global.
+
+    Chaque mois est traité indépendamment : avec un executor (pool de processus),
+    les mois sont répartis entre les workers et les résultats fusionnés dans
+    l'ordre chronologique, le résultat est donc identique.
+    """
+    carte = executor.map if executor is not None else map
+    dossier_mois = os.path.join(dossier, 'mois')
+    dossier_nettoye = os.path.join(dossier, 'nettoye')
+    dossier_csv = os.path.join(dossier, 'csv')
+    os.makedirs(dossier_nettoye, exist_ok=True)
+    os.makedirs(dossier_csv, exist_ok=True)
+
+    # Passe 2
+    mois_tries = _mois_tries(dossier_mois)
+    fichiers_nettoyes = [os.path.join(dossier_nettoye, f"{mois}.pkl") for mois in mois_tries]
+    resultats = list(carte(
+        _nettoyer_mois,
+        [os.path.join(dossier_mois, mois) for mois in mois_tries],
+        fichiers_nettoyes
+    ))
+
+    # Les valeurs sont agrégées dans le même ordre que le préprocessing en mémoire
+    df_prix = pd.DataFrame({
+        'code_postal': pd.concat([r[0] for r in resultats], ignore_index=True) if resultats else pd.Series(dtype='Int64'),
+        'prix_m_carrez': pd.concat([r[1] for r in resultats], ignore_index=True) if resultats else pd.Series(dtype='float64'),
+    })
+    prix_moyen_par_arrondissement = prix_moyens_par_arrondissement(df_prix)
+    del df_prix, resultats
+
+    # Passe 3
+    if os.path.isdir(chemin_parquet):
+        shutil.rmtree(chemin_parquet)
+    prefixes = [f"{i:06d}" for i in range(len(fichiers_nettoyes))]
+    fichiers_csv = [os.path.join(dossier_csv, f"{prefixe}.csv") if chemin_csv else None for prefixe in prefixes]
+    comptes = carte(
+        _finaliser_mois,
+        fichiers_nettoyes,
+        [prix_moyen_par_arrondissement] * len(fichiers_nettoyes),
+        [chemin_parquet] * len(fichiers_nettoyes),
+        prefixes,
+        fichiers_csv,
+        [i == 0 for i in range(len(fichiers_nettoyes))]
+    )
+    comptes_transport = pd.Series(dtype='int64')
+    for compte in comptes:
+        comptes_transport = comptes_transport.add(compte, fill_value=0)
+
+    if chemin_csv:
+        with open(chemin_csv, 'wb') as sortie:
+            for fichier in fichiers_csv:
+                with open(fichier, 'rb') as partie:
+                    shutil.copyfileobj(partie, sortie)
+
+    print(comptes_transport.astype('int64').sort_values(ascending=False))
+
+
+def preparer_dvf_streaming(chemin_source='DATA/dvf.csv', chemin_parquet=CHEMIN_PARQUET, chemin_csv=None,
+                           taille_chunk=500_000, dossier_tmp=None):
+    """
+    Préparation en streaming à mémoire bornée : même résultat que preparer_dvf,
+    mais le fichier DVF n'est jamais chargé en entier. La mémoire utilisée
+    dépend de la taille d'un morceau et du mois le plus volumineux.
+    """
+    print(pd.read_csv(chemin_source, encoding='utf-8', nrows=0).columns)
+
+    dossier = tempfile.mkdtemp(prefix='dvf_', dir=dossier_tmp)
+    try:
+        repartir_par_mois(lire_par_morceaux(chemin_source, taille_chunk), os.path.join(dossier, 'mois'))
+        finaliser_par_mois(dossier, chemin_parquet, chemin_csv)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nettoyage du fichier DVF")
+    parser.add_argument('--source', default='DATA/dvf.csv', help="Fichier DVF (CSV)")
+    parser.add_argument('--parquet', default=CHEMIN_PARQUET, help="Dataset Parquet nettoyé (partitionné)")
+    parser.add_argument('--export-csv', nargs='?', const=CHEMIN_CSV, default=None,
+                        help="Exporter aussi le CSV nettoyé (par défaut DATA/donnees_immobilieres.csv)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lecture par morceaux à mémoire bornée (gros fichiers multi-années)")
+    parser.add_argument('--taille-chunk', type=int, default=500_000, help="Lignes par morceau en streaming")
+    parser.add_argument('--dossier-tmp', default=None, help="Dossier des fichiers intermédiaires")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    if args.streaming:
+        preparer_dvf_streaming(args.source, args.parquet, args.export_csv, args.taille_chunk, args.dossier_tmp)
+    else:
+        preparer_dvf(args.source, args.parquet, args.export_csv)
+    print(f"✓ Préparation terminée en {time.perf_counter() - debut:.1f}s")
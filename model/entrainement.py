@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from donnees import RACINE, charger_donnees
+from inference import compiler_modele, exporter_modele
+from registre import Registre
+
+
+DOSSIER_MODELE = os.path.join(RACINE, 'Training_set')
+# Paramètres retenus par model/recherche_hyperparametres.py
+CHEMIN_PARAMETRES = os.path.join(DOSSIER_MODELE, 'meilleurs_parametres.json')
+
+# Colonnes liées au prix : elles ne doivent pas être des features d'entrée
+COLONNES_A_EXCLURE = ['valeur_fonciere', 'prix_m_carrez', 'prix_m_carrez_arr', 'score_transport']
+
+# Moteurs d'entraînement disponibles et leurs paramètres par défaut
+MOTEURS = {
+    # Modèle historique : arbres exacts, un seul cœur
+    'gbr': (GradientBoostingRegressor, {
+        'n_estimators': 200,
+        'learning_rate': 0.1,
+        'max_depth': 5,
+        'random_state': 42,
+    }),
+    # Arbres sur histogrammes, multi-threadé (OpenMP), arrêt anticipé sur un jeu de validation
+    'hgb': (HistGradientBoostingRegressor, {
+        'max_iter': 1000,
+        'learning_rate': 0.1,
+        'max_leaf_nodes': 63,
+        'min_samples_leaf': 20,
+        'early_stopping': True,
+        'validation_fraction': 0.1,
+        'n_iter_no_change': 20,
+        'random_state': 42,
+    }),
+}
+
+MOTEUR_PAR_DEFAUT = 'hgb'
+
+
+def preparer_donnees(df=None):
+    """
+    Features et cible à partir du jeu de données nettoyé.
+
+    Returns:
+    --------
+    tuple : (X, y) avec X les features numériques (float64)
+    """
+    if df is None:
+        df = charger_donnees()
+    df = df.dropna(subset=['latitude', 'longitude', 'valeur_fonciere', 'score_transport', 'prix_m_carrez_arr'])
+
+    X_all = df.drop(columns=COLONNES_A_EXCLURE, errors='ignore')
+    X = X_all.select_dtypes(include=[np.number]).astype('float64')
+    y = df['valeur_fonciere']
+    return X, y
+
+
+def parametres_retenus(moteur, chemin=CHEMIN_PARAMETRES):
+    """Paramètres trouvés par la recherche d'hyperparamètres pour ce moteur ({} sinon)"""
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin, encoding='utf-8') as f:
+        resultat = json.load(f)
+    return resultat['params'] if resultat.get('moteur') == moteur else {}
+
+
+def creer_modele(moteur=MOTEUR_PAR_DEFAUT, **params):
+    """Instancie le modèle d'un moteur, les paramètres donnés remplaçant ceux par défaut"""
+    if moteur not in MOTEURS:
+        raise ValueError(f"Moteur inconnu: {moteur} (disponibles: {', '.join(MOTEURS)})")
+    classe, params_defaut = MOTEURS[moteur]
+    return classe(**{**params_defaut, **params})
+
+
+def evaluer(modele, X_test, y_test):
+    y_pred = modele.predict(X_test)
+    return {
+        'r2': r2_score(y_test, y_pred),
+        'mae': mean_absolute_error(y_test, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+    }
+
+
+def entrainer(moteur, X_train, y_train, X_test=None, y_test=None, **params):
+    """
+    Entraîne un modèle et mesure le temps d'apprentissage.
+
+    Returns:
+    --------
+    tuple : (modèle entraîné, dict des résultats : moteur, temps, métriques sur le jeu de test)
+    """
+    modele = creer_modele(moteur, **params)
+    debut = time.perf_counter()
+    modele.fit(X_train, y_train)
+    resultats = {'moteur': moteur, 'temps_fit_s': time.perf_counter() - debut}
+
+    if X_test is not None:
+        resultats.update(evaluer(modele, X_test, y_test))
+    if hasattr(modele, 'n_iter_'):
+        resultats['n_arbres'] = int(modele.n_iter_)
+    elif hasattr(modele, 'n_estimators_'):
+        resultats['n_arbres'] = int(modele.n_estimators_)
+    return modele, resultats
+
+
+def sauvegarder(modele, features, dossier=DOSSIER_MODELE):
+    """
+    Sauvegarde au format chargé par api_server.py, prediction.py et app.py,
+    et publie le modèle dans le registre (nouvelle version courante, chargée
+    à chaud par l'API).
+
+    Returns:
+    --------
+    str ou None : version publiée
+    """
+    os.makedirs(dossier, exist_ok=True)
+    chemin_modele = os.path.join(dossier, 'best_model.pkl')
+    joblib.dump(modele, chemin_modele)
+    joblib.dump(list(features), os.path.join(dossier, 'model_features.pkl'))
+
+    # Artefact compilé (tableaux .npy + manifest.json), chargé sans unpickling par l'API
+    try:
+        modele_compile = compiler_modele(modele, list(features))
+    except ValueError as e:
+        print(f"⚠️ Artefact compilé non écrit: {e}")
+        return None
+    exporter_modele(modele_compile, os.path.join(dossier, 'modele_compile'), source=chemin_modele)
+    return Registre(os.path.join(dossier, 'registre')).publier(modele_compile, dossier)
+
+
+def afficher_comparaison(resultats):
+    print("=" * 60)
+    print(f"{'Moteur':<8} {'Fit (s)':>10} {'Arbres':>8} {'R²':>8} {'MAE (€)':>12} {'RMSE (€)':>12}")
+    print("-" * 60)
+    for r in resultats:
+        print(f"{r['moteur']:<8} {r['temps_fit_s']:>10.2f} {r.get('n_arbres', 0):>8} "
+              f"{r['r2']:>8.4f} {r['mae']:>12,.0f} {r['rmse']:>12,.0f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraînement du modèle de prix")
+    parser.add_argument('--moteur', choices=list(MOTEURS), default=MOTEUR_PAR_DEFAUT,
+                        help="Moteur sauvegardé dans Training_set/")
+    parser.add_argument('--comparer', action='store_true',
+                        help="Entraîner aussi les autres moteurs sur le même découpage et comparer")
+    parser.add_argument('--frac', type=float, default=1.0, help="Fraction des données utilisée")
+    parser.add_argument('--threads', type=int, default=None, help="Nombre de threads (défaut: tous les cœurs)")
+    parser.add_argument('--sans-sauvegarde', action='store_true', help="Ne pas écrire Training_set/")
+    args = parser.parse_args()
+
+    X, y = preparer_donnees()
+    if args.frac < 1.0:
+        X = X.sample(frac=args.frac, random_state=42)
+        y = y.loc[X.index]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    print(f"Entraînement sur {len(X_train):,} lignes, test sur {len(X_test):,} lignes")
+
+    moteurs = [args.moteur] + ([m for m in MOTEURS if m != args.moteur] if args.comparer else [])
+
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(limits=args.threads):
+        resultats = []
+        for moteur in moteurs:
+            modele, res = entrainer(moteur, X_train, y_train, X_test, y_test, **parametres_retenus(moteur))
+            resultats.append(res)
+            if moteur == args.moteur:
+                modele_retenu = modele
+
+    afficher_comparaison(resultats)
+
+    if not args.sans_sauvegarde:
+        version = sauvegarder(modele_retenu, X.columns)
+        print(f"✓ Modèle '{args.moteur}' sauvegardé dans {DOSSIER_MODELE} (version {version})")
@@ -0,0 +1,132 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data_preprocessing import finaliser_par_mois, lire_par_morceaux, repartir_par_mois
+from donnees import CHEMIN_CSV, CHEMIN_PARQUET
+
+
+def est_fichier_brut(chemin):
+    """
+    Fichier brut de la DGFiP (valeursfoncieres-AAAA.txt, séparateur "|")
+    plutôt que CSV géolocalisé. Seul le séparateur de la première ligne est
+    examiné : comme dans PLUS/convert_data/convert_txt_to_csv.py, elle n'est
+    pas supposée être un en-tête.
+    """
+    with open(chemin, encoding='utf-8', errors='replace') as f:
+        return '|' in f.readline()
+
+
+def convertir_fichier(chemin, dossier_mois, prefixe, taille_chunk):
+    """
+    Tâche d'un worker : lecture, conversion et filtrage d'un fichier source,
+    réparti par mois dans dossier_mois.
+    """
+    debut = time.perf_counter()
+    nb_lues, nb_gardees = repartir_par_mois(lire_par_morceaux(chemin, taille_chunk), dossier_mois, prefixe)
+    return {
+        "fichier": chemin,
+        "lignes_lues": nb_lues,
+        "lignes_conservees": nb_gardees,
+        "duree_s": round(time.perf_counter() - debut, 3),
+    }
+
+
+def lister_fichiers(motifs):
+    """Fichiers correspondant aux motifs glob, triés pour une fusion déterministe"""
+    fichiers = set()
+    for motif in motifs:
+        fichiers.update(glob.glob(motif))
+    return sorted(os.path.abspath(fichier) for fichier in fichiers)
+
+
+def ingerer(motifs, chemin_parquet=CHEMIN_PARQUET, chemin_csv=None, nb_workers=None,
+            taille_chunk=500_000, dossier_tmp=None, chemin_rapport=None):
+    """
+    Ingestion parallèle de plusieurs fichiers DVF (années, départements).
+
+    Chaque fichier est converti et filtré dans un processus du pool, puis les
+    mois sont dédoublonnés, triés et écrits en parallèle. L'ordre de fusion
+    (fichiers triés par chemin, puis morceaux, puis mois) ne dépend pas du
+    nombre de workers : le résultat est celui du préprocessing des fichiers
+    concaténés dans cet ordre.
+    """
+    fichiers = lister_fichiers(motifs)
+    if not fichiers:
+        raise FileNotFoundError(f"Aucun fichier ne correspond à {motifs}")
+
+    # Les fichiers bruts de la DGFiP n'ont pas de coordonnées : toutes leurs
+    # lignes seraient écartées par le nettoyage (longitude/latitude requises)
+    bruts = [fichier for fichier in fichiers if est_fichier_brut(fichier)]
+    if bruts:
+        raise ValueError(
+            f"Fichiers DVF bruts de la DGFiP (séparateur '|') non pris en charge: {bruts}. "
+            "Ils ne contiennent pas de longitude/latitude, indispensables au modèle : "
+            "utiliser les fichiers DVF géolocalisés (geo-dvf, CSV)."
+        )
+
+    nb_workers = nb_workers or os.cpu_count()
+    rapport = {"workers": nb_workers, "fichiers": []}
+    debut = time.perf_counter()
+
+    dossier = tempfile.mkdtemp(prefix='ingestion_', dir=dossier_tmp)
+    try:
+        dossier_mois = os.path.join(dossier, 'mois')
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            rapport["fichiers"] = list(executor.map(
+                convertir_fichier,
+                fichiers,
+                [dossier_mois] * len(fichiers),
+                [f"{i:04d}-" for i in range(len(fichiers))],
+                [taille_chunk] * len(fichiers)
+            ))
+            rapport["duree_conversion_s"] = round(time.perf_counter() - debut, 3)
+
+            debut_finalisation = time.perf_counter()
+            if os.path.isdir(dossier_mois):
+                finaliser_par_mois(dossier, chemin_parquet, chemin_csv, executor=executor)
+            rapport["duree_finalisation_s"] = round(time.perf_counter() - debut_finalisation, 3)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+    rapport["duree_totale_s"] = round(time.perf_counter() - debut, 3)
+    rapport["lignes_lues"] = sum(f["lignes_lues"] for f in rapport["fichiers"])
+
+    if chemin_rapport:
+        with open(chemin_rapport, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+    return rapport
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion parallèle de fichiers DVF")
+    parser.add_argument('motifs', nargs='+', help="Motifs glob des fichiers DVF géolocalisés (CSV)")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut: nb de cœurs)")
+    parser.add_argument('--parquet', default=CHEMIN_PARQUET, help="Dataset Parquet nettoyé (partitionné)")
+    parser.add_argument('--export-csv', nargs='?', const=CHEMIN_CSV, default=None,
+                        help="Exporter aussi le CSV nettoyé (par défaut DATA/donnees_immobilieres.csv)")
+    parser.add_argument('--taille-chunk', type=int, default=500_000, help="Lignes par morceau")
+    parser.add_argument('--dossier-tmp', default=None, help="Dossier des fichiers intermédiaires")
+    parser.add_argument('--rapport', default='DATA/ingestion_rapport.json', help="Rapport JSON (temps, lignes)")
+    args = parser.parse_args()
+
+    rapport = ingerer(args.motifs, args.parquet, args.export_csv, args.workers,
+                      args.taille_chunk, args.dossier_tmp, args.rapport)
+
+    print("=" * 60)
+    print(f"INGESTION ({len(rapport['fichiers'])} fichiers, {rapport['workers']} workers)")
+    print("=" * 60)
+    for f in rapport["fichiers"]:
+        print(f"{os.path.basename(f['fichier']):<30} {f['lignes_lues']:>12,} lignes "
+              f"{f['lignes_conservees']:>12,} conservées {f['duree_s']:>8.1f}s")
+    print(f"Conversion: {rapport['duree_conversion_s']:.1f}s | "
+          f"Finalisation: {rapport['duree_finalisation_s']:.1f}s | "
+          f"Total: {rapport['duree_totale_s']:.1f}s")
@@ -0,0 +1,243 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data_preprocessing import COLONNES, convertir_types, filtrer_lignes, lire_par_morceaux, seuil_max
+from donnees import CHEMIN_CSV, CHEMIN_PARQUET, RACINE, charger_donnees, ecrire_parquet, exporter_csv
+from transport import charger_stations, construire_arbre, scores_transport
+
+
+DOSSIER_ETAT = os.path.join(RACINE, 'DATA', 'preprocessing_etat')
+
+
+def hash_lignes(df):
+    """Empreinte (uint64) du contenu de chaque ligne source"""
+    return pd.util.hash_pandas_object(df[COLONNES], index=False).to_numpy()
+
+
+class EtatIncremental:
+    """
+    État du préprocessing incrémental, conservé dans dossier/etat.pkl :
+    - watermark : date de mutation la plus récente déjà traitée
+    - hashes : empreintes triées des lignes source déjà vues
+    - sommes, comptes : somme et nombre de prix au m² par code postal,
+      d'où sont tirées les moyennes prix_m_carrez_arr
+
+    Les lignes nettoyées avant le filtre des prix exorbitants sont gardées
+    dans dossier/base (Parquet partitionné par code postal et année) : quand
+    la moyenne d'un code postal bouge, le filtre est réappliqué sur ses lignes.
+    """
+
+    def __init__(self, dossier=DOSSIER_ETAT):
+        self.dossier = dossier
+        self.chemin_base = os.path.join(dossier, 'base')
+        self.watermark = None
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.sommes = pd.Series(dtype='float64')
+        self.comptes = pd.Series(dtype='int64')
+
+    @property
+    def chemin(self):
+        return os.path.join(self.dossier, 'etat.pkl')
+
+    def existe(self):
+        return os.path.exists(self.chemin) and os.path.isdir(self.chemin_base)
+
+    def charger(self):
+        etat = joblib.load(self.chemin)
+        self.watermark = etat['watermark']
+        self.hashes = etat['hashes']
+        self.sommes = etat['sommes']
+        self.comptes = etat['comptes']
+        return self
+
+    def sauvegarder(self):
+        os.makedirs(self.dossier, exist_ok=True)
+        chemin_tmp = self.chemin + '.tmp'
+        joblib.dump({
+            'watermark': self.watermark,
+            'hashes': self.hashes,
+            'sommes': self.sommes,
+            'comptes': self.comptes,
+        }, chemin_tmp)
+        os.replace(chemin_tmp, self.chemin)
+
+    def moyennes(self):
+        return (self.sommes / self.comptes).to_dict()
+
+
+def nouvelles_lignes(morceaux, etat, marge_jours=None):
+    """
+    Lignes source pas encore traitées, filtrées ligne à ligne.
+
+    Une ligne est nouvelle si son empreinte n'a jamais été vue. Avec
+    marge_jours, les lignes antérieures au watermark moins cette marge sont
+    ignorées sans calcul d'empreinte (publications DVF en retard limitées).
+
+    Returns:
+    --------
+    tuple : (lignes nouvelles, empreintes de ces lignes, nombre de lignes lues)
+    """
+    limite = None
+    if marge_jours is not None and etat.watermark is not None:
+        limite = (etat.watermark - pd.Timedelta(days=marge_jours)).strftime('%Y-%m-%d')
+
+    nouvelles, empreintes, nb_lues = [], [], 0
+    for chunk in morceaux:
+        nb_lues += len(chunk)
+        chunk = filtrer_lignes(chunk[COLONNES])
+        if limite is not None:
+            chunk = chunk[~(chunk['date_mutation'] < limite)]
+
+        h = hash_lignes(chunk)
+        # Recherche dichotomique dans les empreintes triées de l'état
+        position = np.searchsorted(etat.hashes, h).clip(max=max(len(etat.hashes) - 1, 0))
+        deja_vue = etat.hashes[position] == h if len(etat.hashes) else np.zeros(len(h), dtype=bool)
+        nouvelles.append(chunk[~deja_vue])
+        empreintes.append(h[~deja_vue])
+
+    if not nouvelles:
+        return pd.DataFrame(columns=COLONNES), np.empty(0, dtype=np.uint64), nb_lues
+
+    df_nouv = pd.concat(nouvelles, ignore_index=True)
+    h = np.concatenate(empreintes)
+    # Doublons à l'intérieur des nouvelles lignes (même règle que drop_duplicates)
+    _, premieres = np.unique(h, return_index=True)
+    garder = np.zeros(len(h), dtype=bool)
+    garder[premieres] = True
+    return df_nouv[garder].reset_index(drop=True), h[garder], nb_lues
+
+
+def remplacer_partitions(df, chemin, codes_postaux):
+    """
+    Réécrit les partitions code_postal=<code> du dataset Parquet : les
+    nouvelles partitions sont écrites à côté puis substituées aux anciennes.
+    """
+    os.makedirs(chemin, exist_ok=True)
+    dossier_tmp = tempfile.mkdtemp(prefix='partitions_', dir=os.path.dirname(os.path.abspath(chemin)))
+    try:
+        if len(df):
+            ecrire_parquet(df, dossier_tmp)
+        for code in codes_postaux:
+            cible = os.path.join(chemin, f"code_postal={code}")
+            source = os.path.join(dossier_tmp, f"code_postal={code}")
+            if os.path.isdir(cible):
+                shutil.rmtree(cible)
+            if os.path.isdir(source):
+                os.replace(source, cible)
+    finally:
+        shutil.rmtree(dossier_tmp, ignore_errors=True)
+
+
+def mettre_a_jour(chemin_source='DATA/dvf.csv', chemin_parquet=CHEMIN_PARQUET, dossier_etat=DOSSIER_ETAT,
+                  taille_chunk=500_000, marge_jours=None, chemin_csv=None, initialiser=False):
+    """
+    Préprocessing incrémental : seules les nouvelles lignes du DVF sont
+    nettoyées et reçoivent un score de transport, les moyennes par code postal
+    sont mises à jour à partir des sommes et effectifs, et le filtre des prix
+    exorbitants n'est réappliqué qu'aux codes postaux dont la moyenne a bougé.
+    Seules les partitions de ces codes postaux sont réécrites.
+
+    Sans état existant, toutes les lignes sont nouvelles : le premier passage
+    équivaut au préprocessing complet de chemin_source et initialise l'état.
+    Il remplace alors le dataset Parquet : s'il en existe déjà un, le passage
+    est refusé sauf avec initialiser=True (chemin_source doit contenir tout
+    l'historique, pas seulement le dernier fichier mensuel).
+
+    Returns:
+    --------
+    dict : nombre de lignes lues, nouvelles, codes postaux mis à jour
+    """
+    etat = EtatIncremental(dossier_etat)
+    premier_passage = not etat.existe()
+    if premier_passage and os.path.isdir(chemin_parquet) and not initialiser:
+        raise FileExistsError(
+            f"Aucun état incrémental dans {dossier_etat} mais un dataset existe déjà ({chemin_parquet}) : "
+            f"le premier passage le reconstruirait à partir de {chemin_source} seul. Relancer avec "
+            "--initialiser (et un fichier source contenant tout l'historique) pour initialiser l'état."
+        )
+    if premier_passage:
+        shutil.rmtree(dossier_etat, ignore_errors=True)
+        if os.path.isdir(chemin_parquet):
+            shutil.rmtree(chemin_parquet)
+    else:
+        etat.charger()
+
+    df_nouv, empreintes, nb_lues = nouvelles_lignes(lire_par_morceaux(chemin_source, taille_chunk), etat, marge_jours)
+    resume = {"lignes_lues": nb_lues, "lignes_nouvelles": len(df_nouv), "codes_postaux": []}
+    if df_nouv.empty:
+        return resume
+
+    df_nouv = convertir_types(df_nouv)
+    df_nouv = df_nouv[df_nouv['code_postal'].notna()]
+
+    # Score de transport des nouvelles lignes uniquement
+    tree = construire_arbre(charger_stations())
+    df_nouv['score_transport'] = scores_transport(tree, df_nouv['latitude'], df_nouv['longitude'])
+
+    # Sommes et effectifs par code postal
+    groupes = df_nouv.groupby('code_postal')['prix_m_carrez']
+    etat.sommes = etat.sommes.add(groupes.sum(), fill_value=0)
+    etat.comptes = etat.comptes.add(groupes.count(), fill_value=0).astype('int64')
+    codes_modifies = sorted(int(code) for code in groupes.size().index)
+
+    # Lignes existantes des codes postaux concernés, complétées et retriées
+    if premier_passage:
+        df_base = df_nouv
+    else:
+        df_existant = charger_donnees(filtres=[('code_postal', 'in', codes_modifies)],
+                                      chemin_parquet=etat.chemin_base)
+        df_existant['code_postal'] = df_existant['code_postal'].astype('Int64')
+        df_base = pd.concat([df_existant, df_nouv], ignore_index=True)
+        df_base = df_base.sort_values('date_mutation', kind='stable')
+
+    # Filtre des prix exorbitants avec les nouvelles moyennes
+    df_final = df_base.copy()
+    df_final['prix_m_carrez_arr'] = df_final['code_postal'].map(etat.moyennes())
+    df_final = df_final[df_final['prix_m_carrez'] / df_final['prix_m_carrez_arr'] <= seuil_max]
+
+    remplacer_partitions(df_base, etat.chemin_base, codes_modifies)
+    remplacer_partitions(df_final, chemin_parquet, codes_modifies)
+
+    etat.hashes = np.union1d(etat.hashes, empreintes)
+    watermark = df_nouv['date_mutation'].max()
+    if pd.notna(watermark) and (etat.watermark is None or watermark > etat.watermark):
+        etat.watermark = watermark
+    etat.sauvegarder()
+
+    if chemin_csv:
+        exporter_csv(chemin_parquet, chemin_csv)
+
+    resume["codes_postaux"] = codes_modifies
+    return resume
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Préprocessing incrémental du fichier DVF")
+    parser.add_argument('--source', default='DATA/dvf.csv', help="Fichier DVF (CSV)")
+    parser.add_argument('--parquet', default=CHEMIN_PARQUET, help="Dataset Parquet nettoyé (partitionné)")
+    parser.add_argument('--etat', default=DOSSIER_ETAT, help="Dossier de l'état incrémental")
+    parser.add_argument('--taille-chunk', type=int, default=500_000, help="Lignes par morceau")
+    parser.add_argument('--marge-jours', type=int, default=None,
+                        help="Ignorer les lignes antérieures au watermark moins cette marge")
+    parser.add_argument('--export-csv', nargs='?', const=CHEMIN_CSV, default=None,
+                        help="Exporter aussi le CSV nettoyé (par défaut DATA/donnees_immobilieres.csv)")
+    parser.add_argument('--initialiser', action='store_true',
+                        help="Sans état incrémental, reconstruire le dataset existant à partir de --source")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    resume = mettre_a_jour(args.source, args.parquet, args.etat, args.taille_chunk,
+                           args.marge_jours, args.export_csv, args.initialiser)
+    print(f"Lignes lues: {resume['lignes_lues']:,} | nouvelles: {resume['lignes_nouvelles']:,} | "
+          f"codes postaux mis à jour: {len(resume['codes_postaux'])}")
+    print(f"✓ Mise à jour terminée en {time.perf_counter() - debut:.1f}s")
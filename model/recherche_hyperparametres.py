@@ -0,0 +1,320 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from donnees import chemin_source, signature_source
+from entrainement import (
+    CHEMIN_PARAMETRES, DOSSIER_MODELE, MOTEUR_PAR_DEFAUT, MOTEURS,
+    creer_modele, preparer_donnees, sauvegarder
+)
+
+
+DOSSIER_RECHERCHE = os.path.join(DOSSIER_MODELE, 'recherche')
+
+# Espaces de recherche : (loi, borne basse, borne haute)
+ESPACES = {
+    'hgb': {
+        'learning_rate': ('log', 0.02, 0.3),
+        'max_leaf_nodes': ('log_int', 15, 255),
+        'min_samples_leaf': ('log_int', 5, 200),
+        'l2_regularization': ('log', 1e-4, 10.0),
+        'max_features': ('uniforme', 0.5, 1.0),
+    },
+    'gbr': {
+        'learning_rate': ('log', 0.02, 0.3),
+        'max_depth': ('int', 3, 8),
+        'min_samples_leaf': ('log_int', 1, 100),
+        'subsample': ('uniforme', 0.5, 1.0),
+    },
+}
+
+# Paramètre donnant le nombre d'arbres de chaque moteur
+PARAMETRE_ARBRES = {'hgb': 'max_iter', 'gbr': 'n_estimators'}
+
+
+def tirer_configurations(moteur, n, graine):
+    """Tirage aléatoire (reproductible) de n configurations dans l'espace du moteur"""
+    rng = np.random.default_rng(graine)
+    configurations = []
+    for _ in range(n):
+        config = {}
+        for nom, (loi, bas, haut) in ESPACES[moteur].items():
+            if loi == 'log':
+                config[nom] = float(np.exp(rng.uniform(np.log(bas), np.log(haut))))
+            elif loi == 'log_int':
+                config[nom] = int(round(np.exp(rng.uniform(np.log(bas), np.log(haut)))))
+            elif loi == 'int':
+                config[nom] = int(rng.integers(bas, haut + 1))
+            else:
+                config[nom] = float(rng.uniform(bas, haut))
+        configurations.append(config)
+    return configurations
+
+
+def paliers(n_lignes_max, n_arbres_max, eta, n_paliers):
+    """
+    Ressources de chaque palier : la taille des données et le nombre d'arbres
+    sont multipliés par eta d'un palier au suivant, le dernier palier utilisant
+    toutes les lignes et n_arbres_max arbres.
+    """
+    resultats = []
+    for k in range(n_paliers):
+        fraction = eta ** (k - n_paliers + 1)
+        resultats.append((
+            max(int(n_lignes_max * fraction), min(n_lignes_max, 1000)),
+            max(int(n_arbres_max * fraction), min(n_arbres_max, 20)),
+        ))
+    return resultats
+
+
+# Données d'un worker, transmises une seule fois à son démarrage
+_donnees_worker = None
+
+
+def _initialiser_worker(X_train, y_train, X_val, y_val):
+    global _donnees_worker
+    _donnees_worker = (X_train, y_train, X_val, y_val)
+
+
+def evaluer_essai(moteur, params, n_lignes, n_arbres):
+    """
+    Entraîne une configuration sur les n_lignes premières lignes d'apprentissage
+    (sous-ensembles emboîtés d'un palier à l'autre) et l'évalue sur le jeu de validation.
+    """
+    from threadpoolctl import threadpool_limits
+
+    X_train, y_train, X_val, y_val = _donnees_worker
+    modele = creer_modele(moteur, **params, **{PARAMETRE_ARBRES[moteur]: n_arbres})
+
+    debut = time.perf_counter()
+    # Un cœur par essai : le parallélisme vient des essais simultanés
+    with threadpool_limits(limits=1):
+        modele.fit(X_train.iloc[:n_lignes], y_train.iloc[:n_lignes])
+        y_pred = modele.predict(X_val)
+
+    return {
+        'r2': r2_score(y_val, y_pred),
+        'mae': mean_absolute_error(y_val, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_val, y_pred))),
+        'temps_s': time.perf_counter() - debut,
+    }
+
+
+def cle_essai(moteur, params, n_lignes, n_arbres, features=(), version_donnees=None):
+    """
+    Clé d'un essai dans essais.jsonl : les features et la signature du jeu de
+    données en font partie, un essai fait sur d'anciennes données n'est
+    donc pas repris.
+    """
+    texte = json.dumps([moteur, params, n_lignes, n_arbres, list(features), version_donnees], sort_keys=True)
+    return hashlib.sha1(texte.encode('utf-8')).hexdigest()
+
+
+class RechercheHyperparametres:
+    """
+    Recherche d'hyperparamètres par successive halving (ou Hyperband) sur la
+    taille des données et le nombre d'arbres.
+
+    Chaque palier évalue les configurations restantes en parallèle (un essai
+    par cœur) et ne garde que le meilleur tiers (eta = 3) au sens du RMSE de
+    validation. Chaque essai terminé est ajouté à dossier/essais.jsonl :
+    une recherche interrompue reprend là où elle s'était arrêtée, les essais
+    déjà faits étant relus au lieu d'être recalculés.
+
+    Les essais repris doivent porter sur les mêmes features et le même jeu
+    de données (version_donnees, par exemple donnees.signature_source) ;
+    après une mise à jour des données, ils sont recalculés.
+
+    La recherche s'arrête après budget_s secondes (plus la fin des essais déjà
+    en cours) : la meilleure configuration du palier le plus élevé atteint est
+    alors retenue.
+    """
+
+    def __init__(self, moteur=MOTEUR_PAR_DEFAUT, n_configurations=27, eta=3, n_paliers=4,
+                 n_arbres_max=1000, hyperband=False, budget_s=1800, n_jobs=None,
+                 graine=42, dossier=DOSSIER_RECHERCHE, version_donnees=None):
+        self.moteur = moteur
+        self.n_configurations = n_configurations
+        self.eta = eta
+        self.n_paliers = n_paliers
+        self.n_arbres_max = n_arbres_max
+        self.hyperband = hyperband
+        self.budget_s = budget_s
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.graine = graine
+        self.dossier = dossier
+        self.version_donnees = version_donnees
+        self.features = []
+        self.essais = {}
+
+    @property
+    def chemin_essais(self):
+        return os.path.join(self.dossier, 'essais.jsonl')
+
+    def _charger_essais(self):
+        """Relit les essais faits sur les mêmes features et le même jeu de données"""
+        nb_perimes = 0
+        if os.path.exists(self.chemin_essais):
+            with open(self.chemin_essais, encoding='utf-8') as f:
+                for ligne in f:
+                    try:
+                        essai = json.loads(ligne)
+                    except json.JSONDecodeError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    if essai.get('features') != self.features or essai.get('version_donnees') != self.version_donnees:
+                        nb_perimes += 1
+                        continue
+                    self.essais[essai['cle']] = essai
+        return len(self.essais), nb_perimes
+
+    def _enregistrer(self, essai):
+        self.essais[essai['cle']] = essai
+        with open(self.chemin_essais, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(essai) + '\n')
+
+    def _crochets(self):
+        """(configurations, palier de départ) de chaque crochet Hyperband, ou un seul successive halving"""
+        if not self.hyperband:
+            return [(tirer_configurations(self.moteur, self.n_configurations, self.graine), 0)]
+
+        s_max = self.n_paliers - 1
+        crochets = []
+        for s in range(s_max, -1, -1):
+            n = math.ceil((s_max + 1) / (s + 1) * self.eta ** s)
+            crochets.append((tirer_configurations(self.moteur, n, self.graine + s), s_max - s))
+        return crochets
+
+    def _evaluer_palier(self, executor, configurations, n_lignes, n_arbres, echeance):
+        """Évalue les configurations d'un palier ; None si l'échéance est atteinte avant la fin"""
+        resultats = [None] * len(configurations)
+        en_cours = {}
+        for i, params in enumerate(configurations):
+            cle = cle_essai(self.moteur, params, n_lignes, n_arbres, self.features, self.version_donnees)
+            if cle in self.essais:
+                resultats[i] = self.essais[cle]
+            else:
+                future = executor.submit(evaluer_essai, self.moteur, params, n_lignes, n_arbres)
+                en_cours[future] = (i, cle, params)
+
+        while en_cours:
+            restant = echeance - time.perf_counter()
+            termines, _ = wait(en_cours, timeout=max(restant, 0), return_when=FIRST_COMPLETED)
+            if not termines:
+                for future in en_cours:
+                    future.cancel()
+                return None
+            for future in termines:
+                i, cle, params = en_cours.pop(future)
+                essai = {'cle': cle, 'params': params, 'n_lignes': n_lignes, 'n_arbres': n_arbres,
+                         'features': self.features, 'version_donnees': self.version_donnees,
+                         **future.result()}
+                self._enregistrer(essai)
+                resultats[i] = essai
+        return resultats
+
+    def executer(self, X_train, y_train, X_val, y_val):
+        """
+        Lance (ou reprend) la recherche.
+
+        Returns:
+        --------
+        dict : meilleur essai du palier le plus élevé atteint
+        """
+        os.makedirs(self.dossier, exist_ok=True)
+        self.features = list(X_train.columns)
+        nb_repris, nb_perimes = self._charger_essais()
+        if nb_repris:
+            print(f"✓ {nb_repris} essais repris depuis {self.chemin_essais}")
+        if nb_perimes:
+            print(f"⚠️ {nb_perimes} essais ignorés (autres features ou autre version du jeu de données)")
+
+        ressources = paliers(len(X_train), self.n_arbres_max, self.eta, self.n_paliers)
+        echeance = time.perf_counter() + self.budget_s
+        meilleurs = []  # (palier, essai)
+
+        executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_initialiser_worker,
+                                       initargs=(X_train, y_train, X_val, y_val))
+        try:
+            for num_crochet, (configurations, depart) in enumerate(self._crochets()):
+                for palier in range(depart, self.n_paliers):
+                    n_lignes, n_arbres = ressources[palier]
+                    resultats = self._evaluer_palier(executor, configurations, n_lignes, n_arbres, echeance)
+                    if resultats is None:
+                        print("⚠️ Budget de temps atteint, recherche arrêtée")
+                        return self._meilleur(meilleurs)
+
+                    ordre = np.argsort([essai['rmse'] for essai in resultats], kind='stable')
+                    meilleurs.append((palier, resultats[ordre[0]]))
+                    print(f"Crochet {num_crochet} | palier {palier}: {len(configurations)} configurations, "
+                          f"{n_lignes:,} lignes, {n_arbres} arbres, meilleur RMSE {resultats[ordre[0]]['rmse']:,.0f} €")
+                    configurations = [configurations[i] for i in ordre[:max(1, len(configurations) // self.eta)]]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return self._meilleur(meilleurs)
+
+    @staticmethod
+    def _meilleur(meilleurs):
+        if not meilleurs:
+            raise RuntimeError("Aucun essai terminé dans le budget de temps")
+        palier_max = max(palier for palier, _ in meilleurs)
+        return min((essai for palier, essai in meilleurs if palier == palier_max), key=lambda e: e['rmse'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres (successive halving / Hyperband)")
+    parser.add_argument('--moteur', choices=list(MOTEURS), default=MOTEUR_PAR_DEFAUT, help="Moteur d'entraînement")
+    parser.add_argument('--configurations', type=int, default=27, help="Configurations du successive halving")
+    parser.add_argument('--eta', type=int, default=3, help="Facteur de réduction entre paliers")
+    parser.add_argument('--paliers', type=int, default=4, help="Nombre de paliers")
+    parser.add_argument('--arbres-max', type=int, default=1000, help="Nombre d'arbres au dernier palier")
+    parser.add_argument('--hyperband', action='store_true', help="Hyperband (plusieurs crochets) au lieu d'un seul halving")
+    parser.add_argument('--budget-min', type=float, default=30, help="Durée maximale de la recherche (minutes)")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Essais en parallèle (défaut: nb de cœurs)")
+    parser.add_argument('--dossier', default=DOSSIER_RECHERCHE, help="Dossier des points de reprise")
+    args = parser.parse_args()
+
+    X, y = preparer_donnees()
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    recherche = RechercheHyperparametres(
+        args.moteur, args.configurations, args.eta, args.paliers, args.arbres_max,
+        args.hyperband, args.budget_min * 60, args.n_jobs, dossier=args.dossier,
+        version_donnees=list(signature_source(chemin_source()))
+    )
+    debut = time.perf_counter()
+    try:
+        meilleur = recherche.executer(X_train, y_train, X_val, y_val)
+    except RuntimeError as e:
+        print(f"⚠️ {e} : relancer la commande pour reprendre la recherche")
+        sys.exit(1)
+    print(f"Recherche terminée en {time.perf_counter() - debut:.1f}s")
+
+    params = {**meilleur['params'], PARAMETRE_ARBRES[args.moteur]: meilleur['n_arbres']}
+    print("=" * 60)
+    print(f"Meilleure configuration (R² {meilleur['r2']:.4f}, MAE {meilleur['mae']:,.0f} €, "
+          f"RMSE {meilleur['rmse']:,.0f} €)")
+    for nom, valeur in params.items():
+        print(f"  {nom}: {valeur}")
+    print("=" * 60)
+
+    # Modèle final sur toutes les données avec la meilleure configuration
+    modele = creer_modele(args.moteur, **params)
+    modele.fit(X, y)
+    sauvegarder(modele, X.columns)
+    with open(CHEMIN_PARAMETRES, 'w', encoding='utf-8') as f:
+        json.dump({'moteur': args.moteur, 'params': params, 'validation': {
+            'r2': meilleur['r2'], 'mae': meilleur['mae'], 'rmse': meilleur['rmse']
+        }}, f, indent=2)
+    print(f"✓ Modèle sauvegardé dans {DOSSIER_MODELE}, paramètres dans {CHEMIN_PARAMETRES}")
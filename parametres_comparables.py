@@ -0,0 +1,6 @@
+# Paramètres par défaut de la recherche de comparables, dans un module sans
+# dépendance : l'API s'en sert pour ses valeurs par défaut sans importer
+# comparables (NumPy, pandas, joblib) avant d'ouvrir son port
+NB_COMPARABLES = 10
+NB_MOIS_COMPARABLES = 24
+TOLERANCE_SURFACE = 0.25  # ± 25 % autour de la surface demandée
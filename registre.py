@@ -0,0 +1,330 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from donnees import DOSSIER_MODELE
+
+# NumPy, pandas et inference ne sont importés qu'au chargement d'un modèle :
+# l'API importe ce module avant d'ouvrir son port
+
+
+DOSSIER_REGISTRE = os.path.join(DOSSIER_MODELE, 'registre')
+FICHIER_COURANT = 'CURRENT'
+
+
+class Registre:
+    """
+    Registre des modèles : Training_set/registre/<version>/ contient
+    l'artefact compilé (tableaux .npy + manifest.json) et, si disponibles,
+    best_model.pkl et model_features.pkl d'origine.
+
+    Le fichier CURRENT contient la version servie ; il est remplacé
+    atomiquement (écriture à côté puis os.replace).
+    """
+
+    def __init__(self, dossier: str = DOSSIER_REGISTRE):
+        self.dossier = dossier
+
+    @property
+    def chemin_courant(self) -> str:
+        return os.path.join(self.dossier, FICHIER_COURANT)
+
+    def chemin_version(self, version: str) -> str:
+        return os.path.join(self.dossier, version)
+
+    def versions(self) -> List[str]:
+        """Versions publiées, de la plus ancienne à la plus récente"""
+        if not os.path.isdir(self.dossier):
+            return []
+        # Les dossiers de publication en cours (.publication-*) sont ignorés
+        versions = [
+            nom for nom in os.listdir(self.dossier)
+            if not nom.startswith('.') and os.path.exists(os.path.join(self.dossier, nom, 'manifest.json'))
+        ]
+        return sorted(versions, key=lambda v: os.path.getmtime(os.path.join(self.dossier, v, 'manifest.json')))
+
+    def version_courante(self) -> Optional[str]:
+        try:
+            with open(self.chemin_courant, encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activer(self, version: str):
+        """Fait pointer CURRENT sur une version publiée"""
+        if not os.path.exists(os.path.join(self.chemin_version(version), 'manifest.json')):
+            raise ValueError(f"Version inconnue: {version}")
+        chemin_tmp = f"{self.chemin_courant}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(chemin_tmp, 'w', encoding='utf-8') as f:
+            f.write(version + '\n')
+        os.replace(chemin_tmp, self.chemin_courant)
+
+    def publier(self, modele_compile, dossier_source: Optional[str] = None, activer: bool = True,
+                infos: Optional[dict] = None) -> str:
+        """
+        Ajoute un modèle compilé au registre (la version est l'empreinte de ses
+        tableaux : republier le même modèle ne crée pas de doublon).
+
+        Parameters:
+        -----------
+        dossier_source : str ou None
+            Dossier contenant best_model.pkl et model_features.pkl, copiés avec l'artefact
+        activer : bool
+            Faire pointer CURRENT sur la nouvelle version
+
+        Returns:
+        --------
+        str : la version publiée
+        """
+        from inference import exporter_modele
+
+        os.makedirs(self.dossier, exist_ok=True)
+        chemin_pkl = os.path.join(dossier_source, 'best_model.pkl') if dossier_source else None
+        # Dossier de publication propre à cet appel : deux publications
+        # concurrentes ne s'écrasent pas
+        dossier_publication = tempfile.mkdtemp(prefix='.publication-', dir=self.dossier)
+        try:
+            manifeste = exporter_modele(
+                modele_compile, dossier_publication, source=chemin_pkl,
+                infos={'publie_le': datetime.now().isoformat(timespec='seconds'), **(infos or {})}
+            )
+            version = manifeste['version']
+
+            if dossier_source:
+                for fichier in ['best_model.pkl', 'model_features.pkl']:
+                    if os.path.exists(os.path.join(dossier_source, fichier)):
+                        shutil.copy2(os.path.join(dossier_source, fichier),
+                                     os.path.join(dossier_publication, fichier))
+
+            if not os.path.isdir(self.chemin_version(version)):
+                try:
+                    os.replace(dossier_publication, self.chemin_version(version))
+                except OSError:
+                    # Même version publiée entre-temps par un autre appel
+                    if not os.path.isdir(self.chemin_version(version)):
+                        raise
+        finally:
+            shutil.rmtree(dossier_publication, ignore_errors=True)
+
+        if activer:
+            self.activer(version)
+        return version
+
+    def manifeste(self, version: str) -> dict:
+        with open(os.path.join(self.chemin_version(version), 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def charger(self, version: Optional[str] = None):
+        """
+        Returns:
+        --------
+        tuple : (ModeleCompile projeté en mémoire, manifeste)
+        """
+        from inference import charger_modele_compile
+
+        version = version or self.version_courante()
+        if version is None:
+            raise FileNotFoundError(f"Aucune version courante dans {self.dossier}")
+        return charger_modele_compile(self.chemin_version(version))
+
+
+def publier_modele_recent(registre: Registre, dossier_modele: str = DOSSIER_MODELE) -> Optional[str]:
+    """
+    Publie et active dossier_modele/best_model.pkl s'il a été réentraîné hors
+    de sauvegarder (notebook, script) : fichier plus récent que la version
+    courante et publié dans aucune version. Sans cela, le registre
+    continuerait de servir l'ancienne version après un redémarrage.
+
+    Un best_model.pkl déjà publié n'est pas republié : un retour arrière
+    (registre activer) est conservé.
+
+    Returns:
+    --------
+    str ou None : version publiée
+    """
+    chemin_pkl = os.path.join(dossier_modele, 'best_model.pkl')
+    courante = registre.version_courante()
+    if courante is None or not os.path.exists(chemin_pkl):
+        return None
+
+    stat = os.stat(chemin_pkl)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    publie_le = os.stat(os.path.join(registre.chemin_version(courante), 'manifest.json')).st_mtime_ns
+    if stat.st_mtime_ns <= publie_le or any(
+            registre.manifeste(version).get('source') == signature for version in registre.versions()):
+        return None
+
+    try:
+        import joblib
+
+        from inference import compiler_modele
+
+        modele = joblib.load(chemin_pkl)
+        features = joblib.load(os.path.join(dossier_modele, 'model_features.pkl'))
+        version = registre.publier(compiler_modele(modele, features), dossier_modele)
+    except Exception as e:
+        print(f"⚠️ {chemin_pkl} plus récent que la version {courante} mais non publié, "
+              f"la version {courante} reste servie: {e}")
+        return None
+    if version != courante:
+        print(f"✓ {chemin_pkl} plus récent que la version {courante} : publié et activé (version {version})")
+    return version
+
+
+def charger_modele_courant(dossier_modele: str = DOSSIER_MODELE):
+    """
+    Version courante du registre si elle existe (après publication d'un
+    best_model.pkl réentraîné, voir publier_modele_recent), sinon le modèle
+    de Training_set/ (artefact compilé ou best_model.pkl).
+
+    Returns:
+    --------
+    tuple : (modèle, liste des features, version)
+    """
+    from inference import charger_moteur
+
+    registre = Registre(os.path.join(dossier_modele, 'registre'))
+    publier_modele_recent(registre, dossier_modele)
+    if registre.version_courante() is not None:
+        modele_compile, manifeste = registre.charger()
+        return modele_compile, manifeste['features'], manifeste['version']
+    return charger_moteur(dossier_modele)
+
+
+class EtatModele(NamedTuple):
+    """Modèle servi et ses métadonnées, remplacés d'un seul bloc"""
+    modele: Any
+    features: List[str]
+    version: Optional[str]
+    duree_chargement_s: float
+    charge_le: str
+
+
+def prechauffer(modele, features):
+    """Prédiction de contrôle avant de servir un modèle"""
+    import numpy as np
+    import pandas as pd
+
+    prediction = modele.predict(pd.DataFrame(np.zeros((1, len(features))), columns=features))
+    if not np.all(np.isfinite(prediction)):
+        raise ValueError(f"Prédiction de contrôle invalide: {prediction}")
+
+
+class ModeleActif:
+    """
+    Modèle servi par l'API, rechargé à chaud quand le pointeur CURRENT du
+    registre change.
+
+    Le pointeur est relu au plus toutes les intervalle_verification secondes
+    lors d'un appel à courant(). La nouvelle version est chargée et
+    préchauffée dans un thread : l'ancienne reste servie pendant ce temps,
+    puis l'état (modèle, features, version) est remplacé en une seule
+    affectation. Une requête utilise toujours un état cohérent.
+    """
+
+    def __init__(self, dossier_modele: str = DOSSIER_MODELE, intervalle_verification: float = 5.0):
+        self.dossier_modele = dossier_modele
+        self.registre = Registre(os.path.join(dossier_modele, 'registre'))
+        self.intervalle_verification = intervalle_verification
+        self._etat: Optional[EtatModele] = None
+        self._derniere_verification = 0.0
+        self._verrou = threading.Lock()
+        self._rechargement_en_cours = False
+        self._version_refusee = None
+
+    def charger(self):
+        """Chargement initial (synchrone), après publication d'un best_model.pkl réentraîné"""
+        publier_modele_recent(self.registre, self.dossier_modele)
+        self._etat = self._construire_etat(self.registre.version_courante())
+        self._derniere_verification = time.monotonic()
+        return self
+
+    def courant(self) -> Optional[EtatModele]:
+        self._verifier_pointeur()
+        return self._etat
+
+    def _construire_etat(self, version):
+        from inference import ModeleCompile, charger_moteur
+
+        debut = time.perf_counter()
+        if version is None:
+            modele, features, version = charger_moteur(self.dossier_modele)
+        else:
+            modele, manifeste = self.registre.charger(version)
+            features = manifeste['features']
+        prechauffer(modele, features)
+        if isinstance(modele, ModeleCompile):
+            # Estimateur des grands lots chargé ici, pas à la première requête
+            modele.estimateur()
+        return EtatModele(
+            modele=modele,
+            features=list(features),
+            version=version,
+            duree_chargement_s=time.perf_counter() - debut,
+            charge_le=datetime.now().isoformat(timespec='seconds'),
+        )
+
+    def _verifier_pointeur(self):
+        maintenant = time.monotonic()
+        if maintenant - self._derniere_verification < self.intervalle_verification:
+            return
+
+        with self._verrou:
+            if self._rechargement_en_cours:
+                return
+            self._derniere_verification = maintenant
+            version = self.registre.version_courante()
+            actuelle = self._etat.version if self._etat is not None else None
+            if version is None or version == actuelle or version == self._version_refusee:
+                return
+            self._rechargement_en_cours = True
+
+        threading.Thread(target=self._recharger_en_arriere_plan, args=(version,), daemon=True).start()
+
+    def _recharger_en_arriere_plan(self, version):
+        try:
+            self._etat = self._construire_etat(version)
+            print(f"✓ Modèle {version} activé ({self._etat.duree_chargement_s * 1000:.1f} ms)")
+        except Exception as e:
+            # La version défaillante n'est pas retentée tant que CURRENT ne change pas
+            self._version_refusee = version
+            print(f"⚠️ Modèle {version} non activé, version précédente conservée: {e}")
+        finally:
+            self._rechargement_en_cours = False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Registre des modèles")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    sous_commandes.add_parser('lister', help="Lister les versions publiées")
+    publier = sous_commandes.add_parser('publier', help="Publier Training_set/best_model.pkl")
+    publier.add_argument('--sans-activer', action='store_true', help="Ne pas changer la version courante")
+    activer = sous_commandes.add_parser('activer', help="Changer la version courante (déploiement ou retour arrière)")
+    activer.add_argument('version')
+    args = parser.parse_args()
+
+    registre = Registre()
+    if args.commande == 'lister':
+        courante = registre.version_courante()
+        for version in registre.versions():
+            print(f"{'*' if version == courante else ' '} {version}")
+    elif args.commande == 'publier':
+        import joblib
+
+        from inference import compiler_modele
+
+        modele = joblib.load(os.path.join(DOSSIER_MODELE, 'best_model.pkl'))
+        features = joblib.load(os.path.join(DOSSIER_MODELE, 'model_features.pkl'))
+        version = registre.publier(compiler_modele(modele, features), DOSSIER_MODELE,
+                                   activer=not args.sans_activer)
+        print(f"✓ Version {version} publiée" + ("" if args.sans_activer else " et activée"))
+    else:
+        registre.activer(args.version)
+        print(f"✓ Version {args.version} activée")
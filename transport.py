@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from donnees import RACINE
+
+
+CHEMIN_METRO = os.path.join(RACINE, 'DATA', 'metro-france.csv')
+RAYON_TERRE_KM = 6371
+
+# Seuils de distance (km) à la station la plus proche : < 150 m -> 5, ..., >= 1,5 km -> 1
+SEUILS_KM = np.array([0.150, 0.400, 0.800, 1.500])
+
+
+def charger_stations(chemin=CHEMIN_METRO, commune="Paris"):
+    """
+    Charge les stations de métro d'une commune.
+
+    Returns:
+    --------
+    pd.DataFrame : colonnes ligne, station, Longitude, Latitude, commune
+    """
+    df_metro = pd.read_csv(chemin, encoding='utf-8')
+    df_metro = df_metro[df_metro['Commune nom'].str.contains(commune)]
+
+    return df_metro.rename(columns={
+        "Libelle Line": "ligne",
+        "Libelle station": "station",
+        "Commune nom": "commune"
+    })[["ligne", "station", "Longitude", "Latitude", "commune"]]
+
+
+def construire_arbre(df_stations):
+    """BallTree (distance haversine) sur les coordonnées des stations."""
+    # Import différé : scikit-learn n'est chargé que lorsqu'un arbre est construit
+    from sklearn.neighbors import BallTree
+
+    coords = np.radians(df_stations[["Latitude", "Longitude"]].to_numpy())
+    return BallTree(coords, metric="haversine")
+
+
+def scores_depuis_distances(d_km):
+    """Convertit des distances (km) en scores de 1 à 5 avec np.digitize."""
+    return (len(SEUILS_KM) + 1 - np.digitize(d_km, SEUILS_KM)).astype(np.float64)
+
+
+def scores_transport(tree, latitudes, longitudes):
+    """
+    Score de transport (1 à 5) pour un ensemble de points, en une seule
+    requête sur le BallTree.
+
+    Parameters:
+    -----------
+    tree : BallTree construit avec construire_arbre
+    latitudes, longitudes : array-like de float
+
+    Returns:
+    --------
+    np.ndarray (float64) : scores, NaN pour les coordonnées manquantes
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+
+    scores = np.full(latitudes.shape, np.nan)
+    mask = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    if mask.any():
+        points = np.radians(np.column_stack([latitudes[mask], longitudes[mask]]))
+        dist, _ = tree.query(points, k=1)
+        scores[mask] = scores_depuis_distances(dist[:, 0] * RAYON_TERRE_KM)
+    return scores
+
+
+def score_transport(tree, lat, lon):
+    """Score de transport d'un seul point."""
+    return int(scores_transport(tree, [lat], [lon])[0])